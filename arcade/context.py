@@ -1,16 +1,74 @@
 from pathlib import Path
 from typing import Optional, Union
 
-from arcade.gl import Context, Program
+from arcade.gl import Context, Program, UniformBlockWriter
+from arcade.math import Mat4
 
 
 class ArcadeContext(Context):
+    #: The name of the uniform block holding the frame globals
+    FRAME_GLOBALS = "FrameGlobals"
+    #: Declaration of the frame globals block to paste into shaders
+    FRAME_GLOBALS_GLSL = """layout(std140) uniform FrameGlobals {
+    mat4 projection;
+    mat4 view;
+    vec2 viewport_size;
+    float time;
+    int frame;
+};"""
+
     def __init__(self, window):
         super().__init__(window.canvas)
+        self._window = window
 
         self.enable(self.BLEND)
         self.blend_func = self.BLEND_DEFAULT
 
+        # Projection, view, time and viewport data shared by all programs.
+        # Programs declaring the block are bound to it when linked.
+        self.frame_globals_binding = self.limits.MAX_UNIFORM_BUFFER_BINDINGS - 1
+        self._frame_globals = UniformBlockWriter.std140(
+            [
+                ("projection", "mat4"),
+                ("view", "mat4"),
+                ("viewport_size", "vec2"),
+                ("time", "float"),
+                ("frame", "int"),
+            ]
+        )
+        self._frame_globals_buffer = self.buffer(
+            reserve=self._frame_globals.size, usage="dynamic"
+        )
+        self.projection_matrix = Mat4.orthogonal_projection(
+            0, window.width, 0, window.height, -100, 100
+        )
+        self.view_matrix = Mat4()
+
+    def _program_linked(self, program: Program) -> None:
+        block = program.uniform_blocks.get(self.FRAME_GLOBALS)
+        if block is not None:
+            block.binding = self.frame_globals_binding
+
+    def update_frame_globals(self, time: float) -> None:
+        """
+        Upload the frame globals block. Called once per frame by the window
+        before drawing, so changes to :py:attr:`projection_matrix` and
+        :py:attr:`view_matrix` made while drawing apply from the next frame.
+
+        :param float time: The time in seconds
+        """
+        data = self._frame_globals.pack(
+            {
+                "projection": self.projection_matrix,
+                "view": self.view_matrix,
+                "viewport_size": (self._window.width, self._window.height),
+                "time": time,
+                "frame": self.stats.frame,
+            }
+        )
+        self._frame_globals_buffer.write(data)
+        self._frame_globals_buffer.bind_to_uniform_block(self.frame_globals_binding)
+
     def load_program(
         self,
         *,
@@ -1,6 +1,15 @@
-from .buffer import Buffer
+from .arena import ArenaSlice, VertexArena
+from .buffer import Buffer, BufferRead, GrowableBuffer
 from .constants import *
 from .context import Context
 from .framebuffer import DefaultFrameBuffer, Framebuffer
+from .ktx2 import KTX2File, select_ktx2
+from .mirrored_buffer import MirroredBuffer
 from .program import Program
+from .render_bundle import RenderBundle
+from .ring_buffer import RingBuffer
+from .texture import Texture
+from .texture_atlas import AtlasRegion, TextureAtlas
 from .types import BufferDescription, GLTypes
+from .uniform import UniformBlock, UniformBlockMember, UniformBlockWriter
+from .uniform_arena import UniformArena, UniformSlice
@@ -0,0 +1,315 @@
+"""
+Suballocation of many small meshes from one vertex buffer.
+
+Every buffer needs its own vertex array, and switching between them costs
+a bind per draw. A :py:class:`VertexArena` keeps the vertices of many
+meshes with the same format in a single buffer instead. All of them are
+drawn through the same :py:class:`~arcade.gl.vertex_array.Geometry`, using
+the ``first`` vertex of each mesh's :py:class:`ArenaSlice`.
+"""
+from array import array
+from bisect import bisect_left
+from typing import TYPE_CHECKING, Iterable, List, Optional, Sequence
+
+from arcade.arcade_types import BufferProtocol
+
+from .buffer import Buffer
+from .interop import as_bytes
+from .program import Program
+from .types import BufferDescription
+from .vertex_array import Geometry
+
+if TYPE_CHECKING:
+    from arcade.gl import Context
+
+
+class ArenaSlice:
+    """
+    A range of vertices allocated from a :py:class:`VertexArena`.
+
+    The range can move when the arena is compacted, so ``first`` should
+    be read when drawing rather than stored.
+    """
+
+    __slots__ = ("arena", "first", "count")
+
+    def __init__(self, arena: "VertexArena", first: int, count: int):
+        self.arena = arena
+        self.first = first
+        self.count = count
+
+    @property
+    def buffer(self) -> Buffer:
+        """The buffer holding the vertices"""
+        return self.arena.buffer
+
+    @property
+    def offset(self) -> int:
+        """Byte offset of the first vertex in the buffer"""
+        return self.first * self.arena.stride
+
+    def write(self, data: BufferProtocol, vertex_offset: int = 0) -> None:
+        """
+        Write vertex data into the slice.
+
+        :param data: The vertex data in the format of the arena
+        :param int vertex_offset: The vertex in the slice to start writing at
+        """
+        view = as_bytes(data)
+        stride = self.arena.stride
+        if vertex_offset < 0 or view.nbytes + vertex_offset * stride > (
+            self.count * stride
+        ):
+            raise ValueError("Attempting to write outside the slice")
+        self.arena.buffer.write(view, offset=(self.first + vertex_offset) * stride)
+
+    def render(
+        self, program: Program, *, mode: Optional[int] = None, instances: int = 1
+    ) -> None:
+        """
+        Render the vertices in this slice. Empty and freed slices draw
+        nothing.
+
+        :param Program program: The program to render with
+        :param int mode: Override the primitive mode of the arena
+        :param int instances: Number of instances to render
+        """
+        # Geometry.render would read a count of 0 as all vertices
+        if self.count == 0:
+            return
+        self.arena.geometry.render(
+            program,
+            mode=mode,
+            first=self.first,
+            vertices=self.count,
+            instances=instances,
+        )
+
+    def free(self) -> None:
+        """Return the vertices to the arena"""
+        self.arena.free(self)
+
+
+class VertexArena:
+    """
+    A single vertex buffer shared by many small meshes of the same format.
+
+    Ranges of vertices are handed out as :py:class:`ArenaSlice` objects by a
+    first fit allocator. Freed ranges are merged with their neighbours. When
+    no free range is large enough but the total free space is,
+    the arena is compacted automatically. :py:meth:`compact` can also be
+    called directly, for example when :py:attr:`fragmentation` is high.
+
+    Since every slice is drawn through the same geometry, drawing many
+    slices in a row needs no vertex array changes, and
+    :py:meth:`render_multi` draws any number of slices with one call.
+
+    :param Context ctx: The context the arena belongs to
+    :param str formats: The vertex format, see :py:class:`~arcade.gl.BufferDescription`
+    :param attributes: The attribute names
+    :param int vertices: The number of vertices the arena can hold
+    :param normalized: Attributes that should be normalized
+    :param int mode: The primitive mode slices are drawn with
+    :param str usage: The usage hint of the buffer
+    """
+
+    def __init__(
+        self,
+        ctx: "Context",
+        formats: str,
+        attributes: Sequence[str],
+        *,
+        vertices: int = 65536,
+        normalized: Optional[Iterable[str]] = None,
+        mode: Optional[int] = None,
+        usage: str = "static",
+    ):
+        if vertices <= 0:
+            raise ValueError("An arena must hold at least one vertex")
+        self._ctx = ctx
+        _, self._stride = BufferDescription._parse_formats(formats, attributes)
+        self._capacity = vertices
+        self._buffer = Buffer(ctx, reserve=vertices * self._stride, usage=usage)
+        self._geometry = Geometry(
+            ctx,
+            [
+                BufferDescription(
+                    self._buffer, formats, attributes, normalized=normalized
+                )
+            ],
+            mode=mode,
+        )
+        # Free ranges as [first, count], sorted by first
+        self._free: List[List[int]] = [[0, vertices]]
+        self._slices: List[ArenaSlice] = []
+        self._compactions = 0
+
+    @property
+    def buffer(self) -> Buffer:
+        """The buffer holding the vertices of all slices"""
+        return self._buffer
+
+    @property
+    def geometry(self) -> Geometry:
+        """The geometry all slices are drawn through"""
+        return self._geometry
+
+    @property
+    def stride(self) -> int:
+        """Bytes per vertex"""
+        return self._stride
+
+    @property
+    def capacity(self) -> int:
+        """The number of vertices the arena can hold"""
+        return self._capacity
+
+    @property
+    def used(self) -> int:
+        """The number of allocated vertices"""
+        return self._capacity - self.available
+
+    @property
+    def available(self) -> int:
+        """The number of free vertices"""
+        return sum(count for _, count in self._free)
+
+    @property
+    def fragmentation(self) -> float:
+        """
+        How scattered the free space is. 0.0 when all free vertices are in one
+        range, approaching 1.0 as the free space is split into small ranges.
+        """
+        available = self.available
+        if available == 0:
+            return 0.0
+        return 1.0 - max(count for _, count in self._free) / available
+
+    @property
+    def compactions(self) -> int:
+        """The number of times the arena has been compacted"""
+        return self._compactions
+
+    def allocate(
+        self,
+        data: Optional[BufferProtocol] = None,
+        *,
+        vertices: Optional[int] = None,
+    ) -> ArenaSlice:
+        """
+        Allocate a range of vertices.
+
+        :param data: Vertex data to write into the slice
+        :param int vertices: The number of vertices. Defaults to the
+                             number of vertices in ``data``
+        """
+        view = None if data is None else as_bytes(data)
+        if vertices is None:
+            if view is None:
+                raise ValueError("Either data or vertices must be given")
+            if view.nbytes % self._stride != 0:
+                raise ValueError(f"Data size must align by {self._stride} bytes")
+            vertices = view.nbytes // self._stride
+        if vertices <= 0:
+            raise ValueError("A slice must have at least one vertex")
+
+        first = self._find_free(vertices)
+        if first is None and vertices <= self.available:
+            self.compact()
+            first = self._find_free(vertices)
+        if first is None:
+            raise ValueError(
+                f"Arena is out of space. {vertices} vertices requested, "
+                f"{self.available} of {self._capacity} available"
+            )
+
+        arena_slice = ArenaSlice(self, first, vertices)
+        self._slices.append(arena_slice)
+        if view is not None:
+            arena_slice.write(view)
+        return arena_slice
+
+    def free(self, arena_slice: ArenaSlice) -> None:
+        """
+        Return a slice's vertices to the arena.
+
+        :param ArenaSlice arena_slice: The slice to free
+        """
+        if arena_slice.arena is not self or arena_slice.count == 0:
+            raise ValueError("The slice is not allocated from this arena")
+        self._slices.remove(arena_slice)
+
+        first, count = arena_slice.first, arena_slice.count
+        arena_slice.count = 0
+        index = bisect_left(self._free, [first, count])
+
+        # Merge with the following range, then the preceding one
+        if index < len(self._free) and self._free[index][0] == first + count:
+            count += self._free.pop(index)[1]
+        if index > 0 and sum(self._free[index - 1]) == first:
+            self._free[index - 1][1] += count
+        else:
+            self._free.insert(index, [first, count])
+
+    def compact(self) -> None:
+        """
+        Move all slices to the start of the buffer so the free space is one
+        range. The vertices are copied on the GPU through a temporary buffer.
+        """
+        slices = sorted(self._slices, key=lambda s: s.first)
+        used = sum(s.count for s in slices)
+        stride = self._stride
+
+        if used > 0:
+            staging = Buffer(self._ctx, reserve=used * stride, usage="stream")
+            position = 0
+            for arena_slice in slices:
+                staging.copy_from_buffer(
+                    self._buffer,
+                    size=arena_slice.count * stride,
+                    offset=position * stride,
+                    source_offset=arena_slice.offset,
+                )
+                arena_slice.first = position
+                position += arena_slice.count
+            self._buffer.copy_from_buffer(staging, size=used * stride)
+            staging.delete()
+
+        self._free = [[used, self._capacity - used]] if used < self._capacity else []
+        self._compactions += 1
+        # Render bundles recorded the old positions of the slices
+        self._geometry._version += 1
+
+    def render_multi(
+        self,
+        program: Program,
+        slices: Sequence[ArenaSlice],
+        *,
+        mode: Optional[int] = None,
+        instances: int = 1,
+    ) -> None:
+        """
+        Render several slices with a single draw call when ``WEBGL_multi_draw``
+        is available. See :py:meth:`Geometry.render_multi`.
+
+        :param Program program: The program to render with
+        :param slices: The slices to render
+        :param int mode: Override the primitive mode of the arena
+        :param int instances: Number of instances to render of each slice
+        """
+        firsts = array("i", [s.first for s in slices])
+        counts = array("i", [s.count for s in slices])
+        per_draw = None if instances == 1 else array("i", [instances] * len(slices))
+        self._geometry.render_multi(program, firsts, counts, per_draw, mode=mode)
+
+    def _find_free(self, vertices: int) -> Optional[int]:
+        for index, free_range in enumerate(self._free):
+            first, count = free_range
+            if count >= vertices:
+                if count == vertices:
+                    del self._free[index]
+                else:
+                    free_range[0] += vertices
+                    free_range[1] -= vertices
+                return first
+        return None
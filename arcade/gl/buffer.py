@@ -1,13 +1,17 @@
-from typing import TYPE_CHECKING
-
-import js
+import asyncio
+import weakref
+from typing import TYPE_CHECKING, Optional
 
 from arcade.arcade_types import BufferProtocol
 from arcade.gl import constants
 
+from .interop import as_bytes, buffer_data, buffer_sub_data, get_buffer_sub_data
+
 if TYPE_CHECKING:
     from arcade.gl import Context
 
+    from .vertex_array import Geometry
+
 
 class Buffer:
 
@@ -20,23 +24,35 @@ class Buffer:
     def __init__(
         self,
         ctx: "Context",
-        data: BufferProtocol,
+        data: Optional[BufferProtocol] = None,
         buffer_type: int = constants.ARRAY_BUFFER,
         usage: str = "static",
+        index_element_size: Optional[int] = None,
+        reserve: int = 0,
     ):
+        if data is not None and reserve > 0:
+            raise ValueError("data and reserve can not be combined")
+        if reserve < 0:
+            raise ValueError("reserve can not be negative")
+
         self._ctx = ctx
-        gl = self._ctx.gl
-        self._glo = gl.createBuffer()
+        self._glo = self._ctx.dispatch.createBuffer()
         self._usage = Buffer._usages[usage]
         self._buffer_type = buffer_type
+        self._index_element_size = index_element_size
+        # Incremented when the size or the WebGL object of the buffer changes
+        self._version = 0
 
-        self._size = len(data) * data.itemsize
-
-        js_array_buffer = js.ArrayBuffer.new(self._size)
-        js_array_buffer.assign(data)
-
-        gl.bindBuffer(buffer_type, self._glo)
-        gl.bufferData(buffer_type, js_array_buffer, self._usage)
+        self._bind()
+        if data is None:
+            self._size = reserve
+            self._ctx.dispatch.bufferData(buffer_type, reserve, self._usage)
+        else:
+            view = as_bytes(data)
+            self._size = view.nbytes
+            buffer_data(
+                self._ctx.gl, buffer_type, view, self._usage, self._ctx.staging_uploads
+            )
 
     @property
     def glo(self):
@@ -46,13 +62,124 @@ class Buffer:
     def size(self) -> int:
         return self._size
 
+    @property
+    def index_element_size(self) -> Optional[int]:
+        """Byte size of one index for buffers created by ``ctx.index_buffer()``"""
+        return self._index_element_size
+
+    def orphan(self, new_size: Optional[int] = None) -> None:
+        """
+        Re-specify the buffer storage, leaving its contents undefined.
+        The old storage is released once the GPU is done with it, so
+        writing into the buffer right after does not wait for draws still
+        reading the old contents. The WebGL buffer object is kept, so
+        geometries using this buffer stay valid.
+
+        :param int new_size: The new size in bytes. Defaults to the current size
+        """
+        if new_size is None:
+            new_size = self._size
+        if new_size < 0:
+            raise ValueError("new_size can not be negative")
+
+        self._bind()
+        self._ctx.dispatch.bufferData(self._buffer_type, new_size, self._usage)
+        if new_size != self._size:
+            self._size = new_size
+            self._version += 1
+
+    def delete(self) -> None:
+        """Delete the underlying WebGL buffer"""
+        if self._glo is not None:
+            self._ctx.dispatch.deleteBuffer(self._glo)
+            self._glo = None
+
+    def _bind(self) -> None:
+        # The element array binding is part of the vertex array state,
+        # so binding it with a vertex array bound would change that array
+        if self._buffer_type == constants.ELEMENT_ARRAY_BUFFER:
+            self._ctx.bind_vertex_array(None)
+        self._ctx.bind_buffer(self._buffer_type, self._glo)
+
     def write(self, data: BufferProtocol, offset: int = 0) -> None:
-        self._ctx.gl.bindBuffer(self._buffer_type, self._glo)
+        """
+        Write data into the buffer. The data is uploaded straight from the
+        Python memory, so a ``memoryview`` slice can be passed to upload
+        part of a larger array without creating a temporary copy.
+
+        :param data: Any object supporting the buffer protocol
+        :param int offset: Byte offset in this buffer to write to
+        """
+        view = as_bytes(data)
+        if offset < 0 or offset + view.nbytes > self._size:
+            raise ValueError("Attempting to write outside the buffer size")
+
+        self._bind()
+        buffer_sub_data(
+            self._ctx.gl, self._buffer_type, offset, view, self._ctx.staging_uploads
+        )
+
+    def read(self, size: int = -1, offset: int = 0) -> bytes:
+        """
+        Read data from the buffer. This waits for the GPU to finish all
+        work writing to the buffer, use :py:meth:`read_async` to avoid
+        stalling.
+
+        :param int size: Number of bytes to read. ``-1`` reads to the end
+        :param int offset: Byte offset in this buffer to read from
+        """
+        size = self._read_size(size, offset)
+        data = bytearray(size)
+        if size > 0:
+            self._ctx.bind_buffer(constants.COPY_READ_BUFFER, self._glo)
+            get_buffer_sub_data(self._ctx.gl, constants.COPY_READ_BUFFER, offset, data)
+        return bytes(data)
+
+    def read_async(
+        self,
+        data: Optional[BufferProtocol] = None,
+        *,
+        size: int = -1,
+        offset: int = 0,
+    ) -> "BufferRead":
+        """
+        Start reading data from the buffer without waiting for the GPU.
+
+        The range is copied to a staging buffer on the GPU right away, so
+        the buffer can be written again immediately. A fence placed after
+        the copy is polled once per frame by :py:meth:`Context.new_frame`
+        and the data is fetched once the GPU has passed it. The returned
+        :py:class:`BufferRead` can be polled or awaited::
+
+            data = await buffer.read_async()
+
+        :param data: A writable object to read into, such as a ``bytearray``
+                     or ``memoryview``. A new ``bytearray`` is created if not
+                     given
+        :param int size: Number of bytes to read. Defaults to the size of
+                         ``data``, or the rest of the buffer
+        :param int offset: Byte offset in this buffer to read from
+        """
+        if data is not None:
+            view = as_bytes(data)
+            if view.readonly:
+                raise ValueError("data must be writable")
+            if size == -1:
+                size = view.nbytes
+            elif size > view.nbytes:
+                raise ValueError("data is smaller than the requested size")
 
-        js_array_buffer = js.ArrayBuffer.new(len(data) * data.itemsize)
-        js_array_buffer.assign(data)
+        size = self._read_size(size, offset)
+        if data is None:
+            data = bytearray(size)
+        return BufferRead(self, data, size, offset)
 
-        self._ctx.gl.bufferSubData(self._buffer_type, offset, js_array_buffer)
+    def _read_size(self, size: int, offset: int) -> int:
+        if size == -1:
+            size = self._size - offset
+        if offset < 0 or size < 0 or offset + size > self._size:
+            raise ValueError("Attempting to read outside the buffer size")
+        return size
 
     def copy_from_buffer(
         self, source: "Buffer", size: int = -1, offset: int = 0, source_offset: int = 0
@@ -66,9 +193,9 @@ class Buffer:
         if size + offset > self._size:
             raise ValueError("Attempting to write outside the buffer size")
 
-        self._ctx.gl.bindBuffer(constants.COPY_READ_BUFFER, source._glo)
-        self._ctx.gl.bindBuffer(constants.COPY_WRITE_BUFFER, self._glo)
-        self._ctx.gl.copyBufferSubData(
+        self._ctx.bind_buffer(constants.COPY_READ_BUFFER, source._glo)
+        self._ctx.bind_buffer(constants.COPY_WRITE_BUFFER, self._glo)
+        self._ctx.dispatch.copyBufferSubData(
             constants.COPY_READ_BUFFER,
             constants.COPY_WRITE_BUFFER,
             source_offset,
@@ -77,9 +204,183 @@ class Buffer:
         )
 
     def bind_to_uniform_block(self, binding: int = 0, offset: int = 0, size: int = 0):
-        if size < 0:
-            size = self.size
+        """
+        Bind a range of the buffer to a uniform block binding point.
+
+        :param int binding: The binding point
+        :param int offset: Byte offset of the block data in this buffer
+        :param int size: Bytes to bind. Defaults to the rest of the buffer
+        """
+        if size <= 0:
+            size = self._size - offset
 
-        self._ctx.gl.bindBufferRange(
+        self._ctx.bind_buffer_range(
             constants.UNIFORM_BUFFER, binding, self._glo, offset, size
         )
+
+
+class BufferRead:
+    """
+    A pending read started by :py:meth:`Buffer.read_async`.
+
+    The read completes in :py:meth:`Context.new_frame` once the GPU has
+    finished the copy, or earlier if :py:meth:`poll` is called. Await the
+    object in a coroutine to get the data when it is ready.
+
+    :param Buffer buffer: The buffer to read from
+    :param data: A writable object receiving the data
+    :param int size: Number of bytes to read
+    :param int offset: Byte offset in the buffer to read from
+    """
+
+    def __init__(self, buffer: Buffer, data: BufferProtocol, size: int, offset: int):
+        self._ctx = buffer._ctx
+        self._data = data
+        self._size = size
+        self._future: Optional[asyncio.Future] = None
+        self._done = False
+
+        gl = self._ctx.dispatch
+        self._staging = Buffer(self._ctx, reserve=size, usage="stream")
+        if size > 0:
+            self._staging.copy_from_buffer(buffer, size, source_offset=offset)
+        self._sync = gl.fenceSync(constants.SYNC_GPU_COMMANDS_COMPLETE, 0)
+        # Submit the fence so it can be signaled while we wait for it
+        gl.flush()
+        self._ctx._pending_reads.append(self)
+
+    @property
+    def data(self) -> BufferProtocol:
+        """The object the data is read into"""
+        return self._data
+
+    def done(self) -> bool:
+        """True when the data has been read"""
+        return self._done
+
+    def poll(self) -> bool:
+        """
+        Fetch the data if the GPU has finished the copy.
+
+        :returns: True when the data has been read
+        """
+        if self._done:
+            return True
+
+        gl = self._ctx.dispatch
+        status = gl.getSyncParameter(self._sync, constants.SYNC_STATUS)
+        if status != constants.SIGNALED:
+            return False
+
+        if self._size > 0:
+            self._ctx.bind_buffer(constants.COPY_READ_BUFFER, self._staging.glo)
+            get_buffer_sub_data(
+                self._ctx.gl,
+                constants.COPY_READ_BUFFER,
+                0,
+                as_bytes(self._data)[: self._size],
+            )
+        gl.deleteSync(self._sync)
+        self._staging.delete()
+        self._sync = None
+        self._staging = None
+        self._done = True
+
+        if self._future is not None and not self._future.done():
+            self._future.set_result(self._data)
+        return True
+
+    def result(self) -> BufferProtocol:
+        """The data read from the buffer. Raises RuntimeError if not done"""
+        if not self._done:
+            raise RuntimeError("The buffer read has not completed")
+        return self._data
+
+    def __await__(self):
+        if self._future is None:
+            self._future = asyncio.get_running_loop().create_future()
+            if self._done:
+                self._future.set_result(self._data)
+        return self._future.__await__()
+
+
+class GrowableBuffer(Buffer):
+    """
+    A buffer that grows when data is written past its end.
+
+    The capacity is doubled until the data fits. A new WebGL buffer is
+    created and the old contents are copied over on the GPU with
+    ``copyBufferSubData``. Geometries using the buffer are notified and
+    rebuild their vertex arrays. Their vertex count is not updated, so
+    pass ``vertices`` when rendering.
+
+    :param Context ctx: The context this buffer belongs to
+    :param data: Initial data
+    :param int reserve: Initial capacity in bytes when no data is given
+    :param int buffer_type: The buffer binding target
+    :param str usage: The usage hint
+    """
+
+    def __init__(
+        self,
+        ctx: "Context",
+        data: Optional[BufferProtocol] = None,
+        *,
+        reserve: int = 0,
+        buffer_type: int = constants.ARRAY_BUFFER,
+        usage: str = "dynamic",
+    ):
+        super().__init__(
+            ctx, data, buffer_type=buffer_type, usage=usage, reserve=reserve
+        )
+        self._reallocations = 0
+        # Geometries whose vertex arrays reference the WebGL buffer
+        self._geometries: "weakref.WeakSet[Geometry]" = weakref.WeakSet()
+
+    @property
+    def reallocations(self) -> int:
+        """The number of times the buffer has grown"""
+        return self._reallocations
+
+    def write(self, data: BufferProtocol, offset: int = 0) -> None:
+        """
+        Write data into the buffer, growing it first if needed.
+
+        :param data: Any object supporting the buffer protocol
+        :param int offset: Byte offset in this buffer to write to
+        """
+        view = as_bytes(data)
+        self.reserve(offset + view.nbytes)
+        super().write(view, offset)
+
+    def reserve(self, size: int) -> None:
+        """
+        Make sure the buffer can hold at least ``size`` bytes. The contents
+        are kept.
+
+        :param int size: The needed capacity in bytes
+        """
+        if size <= self._size:
+            return
+
+        new_size = max(self._size, 64)
+        while new_size < size:
+            new_size *= 2
+
+        ctx = self._ctx
+        old_glo, old_size = self._glo, self._size
+        self._glo = ctx.dispatch.createBuffer()
+        self._bind()
+        ctx.dispatch.bufferData(self._buffer_type, new_size, self._usage)
+        if old_size > 0:
+            ctx.bind_buffer(constants.COPY_READ_BUFFER, old_glo)
+            ctx.dispatch.copyBufferSubData(
+                constants.COPY_READ_BUFFER, self._buffer_type, 0, 0, old_size
+            )
+        ctx.dispatch.deleteBuffer(old_glo)
+
+        self._size = new_size
+        self._version += 1
+        self._reallocations += 1
+        for geometry in self._geometries:
+            geometry.flush()
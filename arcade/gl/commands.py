@@ -0,0 +1,566 @@
+"""
+Recording of WebGL commands for batched execution.
+
+Every WebGL call made from Python crosses the Pyodide FFI boundary. When
+command recording is enabled on the :py:class:`~arcade.gl.Context`, state
+changes, uniform uploads and draw calls are encoded into a compact list of
+integer opcodes instead, and the whole list is executed by a small
+JavaScript interpreter in a single call.
+
+WebGL objects referenced by commands are stored in an object table and
+referenced by index. Float arguments such as uniform values are stored in a
+separate float array.
+"""
+import math
+from array import array
+from typing import Any, Dict, List
+
+from pyodide.code import run_js
+from pyodide.ffi import to_js
+
+USE_PROGRAM = 1  # program
+BIND_VERTEX_ARRAY = 2  # vao
+BIND_BUFFER = 3  # target, buffer
+ACTIVE_TEXTURE = 4  # texture enum
+BIND_TEXTURE = 5  # target, texture
+BIND_FRAMEBUFFER = 6  # target, framebuffer
+VIEWPORT = 7  # x, y, width, height
+SCISSOR = 8  # x, y, width, height
+DEPTH_MASK = 9  # flag
+ENABLE = 10  # capability
+DISABLE = 11  # capability
+BLEND_FUNC = 12  # src, dst
+BLEND_FUNC_SEPARATE = 13  # src_rgb, dst_rgb, src_alpha, dst_alpha
+DRAW_ARRAYS = 14  # mode, first, count, instances
+DRAW_ELEMENTS = 15  # mode, count, type, offset, instances
+UNIFORM_INT = 16  # setter, location, value
+UNIFORM_FLOAT = 17  # setter, location, float index
+UNIFORM_INT_VEC = 18  # setter, location, n, value * n
+UNIFORM_FLOAT_VEC = 19  # setter, location, n, float index
+UNIFORM_MATRIX = 20  # setter, location, n, float index
+CLEAR = 21  # mask, float index of rgba color
+BIND_BUFFER_BASE = 22  # target, index, buffer
+BIND_BUFFER_RANGE = 23  # target, index, buffer, offset, size
+BEGIN_TRANSFORM_FEEDBACK = 24  # primitive mode
+END_TRANSFORM_FEEDBACK = 25
+# ext, mode, n, instanced, firsts * n, counts * n, instances * n if instanced
+MULTI_DRAW_ARRAYS = 26
+# ext, mode, n, instanced, type, element size,
+# firsts * n, counts * n, instances * n if instanced
+MULTI_DRAW_ELEMENTS = 27
+
+_interpreter = run_js(
+    """
+(gl, opsProxy, floatsProxy, objs, start) => {
+    const opsBuf = opsProxy.getBuffer("i32");
+    const floatsBuf = floatsProxy.getBuffer("f32");
+    try {
+        const ops = opsBuf.data;
+        const f = floatsBuf.data;
+        const n = ops.length;
+        let i = start;
+        while (i < n) {
+            switch (ops[i]) {
+                case 1: gl.useProgram(objs[ops[i + 1]] ?? null); i += 2; break;
+                case 2: gl.bindVertexArray(objs[ops[i + 1]] ?? null); i += 2; break;
+                case 3: gl.bindBuffer(ops[i + 1], objs[ops[i + 2]] ?? null); i += 3; break;
+                case 4: gl.activeTexture(ops[i + 1]); i += 2; break;
+                case 5: gl.bindTexture(ops[i + 1], objs[ops[i + 2]] ?? null); i += 3; break;
+                case 6: gl.bindFramebuffer(ops[i + 1], objs[ops[i + 2]] ?? null); i += 3; break;
+                case 7: gl.viewport(ops[i + 1], ops[i + 2], ops[i + 3], ops[i + 4]); i += 5; break;
+                case 8: gl.scissor(ops[i + 1], ops[i + 2], ops[i + 3], ops[i + 4]); i += 5; break;
+                case 9: gl.depthMask(ops[i + 1] !== 0); i += 2; break;
+                case 10: gl.enable(ops[i + 1]); i += 2; break;
+                case 11: gl.disable(ops[i + 1]); i += 2; break;
+                case 12: gl.blendFunc(ops[i + 1], ops[i + 2]); i += 3; break;
+                case 13: gl.blendFuncSeparate(ops[i + 1], ops[i + 2], ops[i + 3], ops[i + 4]); i += 5; break;
+                case 14: gl.drawArraysInstanced(ops[i + 1], ops[i + 2], ops[i + 3], ops[i + 4]); i += 5; break;
+                case 15: gl.drawElementsInstanced(ops[i + 1], ops[i + 2], ops[i + 3], ops[i + 4], ops[i + 5]); i += 6; break;
+                case 16: objs[ops[i + 1]].call(gl, objs[ops[i + 2]], ops[i + 3]); i += 4; break;
+                case 17: objs[ops[i + 1]].call(gl, objs[ops[i + 2]], f[ops[i + 3]]); i += 4; break;
+                case 18: {
+                    const count = ops[i + 3];
+                    objs[ops[i + 1]].call(gl, objs[ops[i + 2]], ops.slice(i + 4, i + 4 + count));
+                    i += 4 + count;
+                    break;
+                }
+                case 19: {
+                    const start = ops[i + 4];
+                    objs[ops[i + 1]].call(gl, objs[ops[i + 2]], f.slice(start, start + ops[i + 3]));
+                    i += 5;
+                    break;
+                }
+                case 20: {
+                    const start = ops[i + 4];
+                    objs[ops[i + 1]].call(gl, objs[ops[i + 2]], false, f.slice(start, start + ops[i + 3]));
+                    i += 5;
+                    break;
+                }
+                case 21: {
+                    const start = ops[i + 2];
+                    gl.clearColor(f[start], f[start + 1], f[start + 2], f[start + 3]);
+                    gl.clear(ops[i + 1]);
+                    i += 3;
+                    break;
+                }
+                case 22: gl.bindBufferBase(ops[i + 1], ops[i + 2], objs[ops[i + 3]] ?? null); i += 4; break;
+                case 23: gl.bindBufferRange(ops[i + 1], ops[i + 2], objs[ops[i + 3]] ?? null, ops[i + 4], ops[i + 5]); i += 6; break;
+                case 24: gl.beginTransformFeedback(ops[i + 1]); i += 2; break;
+                case 25: gl.endTransformFeedback(); i += 1; break;
+                case 26: {
+                    const ext = objs[ops[i + 1]];
+                    const count = ops[i + 3];
+                    const at = i + 5;
+                    const firsts = ops.subarray(at, at + count);
+                    const counts = ops.subarray(at + count, at + 2 * count);
+                    if (ops[i + 4]) {
+                        const instances = ops.subarray(at + 2 * count, at + 3 * count);
+                        ext.multiDrawArraysInstancedWEBGL(ops[i + 2], firsts, 0, counts, 0, instances, 0, count);
+                        i = at + 3 * count;
+                    } else {
+                        ext.multiDrawArraysWEBGL(ops[i + 2], firsts, 0, counts, 0, count);
+                        i = at + 2 * count;
+                    }
+                    break;
+                }
+                case 27: {
+                    const ext = objs[ops[i + 1]];
+                    const count = ops[i + 3];
+                    const size = ops[i + 6];
+                    const at = i + 7;
+                    const offsets = ops.subarray(at, at + count).map((first) => first * size);
+                    const counts = ops.subarray(at + count, at + 2 * count);
+                    if (ops[i + 4]) {
+                        const instances = ops.subarray(at + 2 * count, at + 3 * count);
+                        ext.multiDrawElementsInstancedWEBGL(ops[i + 2], counts, 0, ops[i + 5], offsets, 0, instances, 0, count);
+                        i = at + 3 * count;
+                    } else {
+                        ext.multiDrawElementsWEBGL(ops[i + 2], counts, 0, ops[i + 5], offsets, 0, count);
+                        i = at + 2 * count;
+                    }
+                    break;
+                }
+                default:
+                    throw new Error(`Unknown arcade.gl command opcode ${ops[i]} at ${i}`);
+            }
+        }
+    } finally {
+        opsBuf.release();
+        floatsBuf.release();
+    }
+}
+"""
+)
+
+
+def _js_number(value) -> str:
+    """Format a number as a JavaScript literal"""
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "Infinity" if value > 0 else "-Infinity"
+    return repr(value)
+
+
+class CommandList:
+    """
+    A list of recorded WebGL commands.
+
+    Commands are appended with the methods on this class and executed in
+    order by :py:meth:`execute`. The list is normally owned by the context,
+    see :py:attr:`Context.record_commands`.
+    """
+
+    def __init__(self):
+        self.ops = array("i")
+        self.floats = array("f")
+        self.objects: List[Any] = []
+        self._object_ids: Dict[int, int] = {}
+        self._commands = 0
+        # Offset into ops of the first command not executed yet
+        self._executed = 0
+
+    def __len__(self) -> int:
+        """Number of recorded commands"""
+        return self._commands
+
+    @property
+    def pending(self) -> bool:
+        """True if there are commands that have not been executed yet"""
+        return len(self.ops) > self._executed
+
+    def clear(self) -> None:
+        del self.ops[:]
+        del self.floats[:]
+        self.objects = []
+        self._object_ids = {}
+        self._commands = 0
+        self._executed = 0
+
+    def execute(self, gl) -> None:
+        """
+        Run all commands recorded since the last call with a single call
+        into JavaScript. The commands are kept until :py:meth:`clear`.
+        """
+        if not self.pending:
+            return
+        _interpreter(gl, self.ops, self.floats, to_js(self.objects), self._executed)
+        self._executed = len(self.ops)
+
+    def to_js_source(self) -> str:
+        """
+        Generate the source of a JavaScript function replaying all commands.
+        The source evaluates to a function taking the object table and
+        returning a function that takes the WebGL context, so constant
+        arrays are only created once.
+        """
+        ops = self.ops
+        f = self.floats
+        consts: List[str] = []
+        lines: List[str] = []
+
+        def const(kind: str, values) -> str:
+            name = f"c{len(consts)}"
+            consts.append(
+                f"const {name} = new {kind}([{', '.join(map(_js_number, values))}]);"
+            )
+            return name
+
+        i = 0
+        n = len(ops)
+        while i < n:
+            op = ops[i]
+            if op == USE_PROGRAM:
+                lines.append(f"gl.useProgram(o[{ops[i + 1]}] ?? null);")
+                i += 2
+            elif op == BIND_VERTEX_ARRAY:
+                lines.append(f"gl.bindVertexArray(o[{ops[i + 1]}] ?? null);")
+                i += 2
+            elif op == BIND_BUFFER:
+                lines.append(f"gl.bindBuffer({ops[i + 1]}, o[{ops[i + 2]}] ?? null);")
+                i += 3
+            elif op == ACTIVE_TEXTURE:
+                lines.append(f"gl.activeTexture({ops[i + 1]});")
+                i += 2
+            elif op == BIND_TEXTURE:
+                lines.append(f"gl.bindTexture({ops[i + 1]}, o[{ops[i + 2]}] ?? null);")
+                i += 3
+            elif op == BIND_FRAMEBUFFER:
+                lines.append(
+                    f"gl.bindFramebuffer({ops[i + 1]}, o[{ops[i + 2]}] ?? null);"
+                )
+                i += 3
+            elif op in (VIEWPORT, SCISSOR):
+                name = "viewport" if op == VIEWPORT else "scissor"
+                lines.append(f"gl.{name}({', '.join(map(str, ops[i + 1:i + 5]))});")
+                i += 5
+            elif op == DEPTH_MASK:
+                lines.append(f"gl.depthMask({'true' if ops[i + 1] else 'false'});")
+                i += 2
+            elif op in (ENABLE, DISABLE):
+                name = "enable" if op == ENABLE else "disable"
+                lines.append(f"gl.{name}({ops[i + 1]});")
+                i += 2
+            elif op == BLEND_FUNC:
+                lines.append(f"gl.blendFunc({ops[i + 1]}, {ops[i + 2]});")
+                i += 3
+            elif op == BLEND_FUNC_SEPARATE:
+                lines.append(
+                    f"gl.blendFuncSeparate({', '.join(map(str, ops[i + 1:i + 5]))});"
+                )
+                i += 5
+            elif op == DRAW_ARRAYS:
+                lines.append(
+                    f"gl.drawArraysInstanced({', '.join(map(str, ops[i + 1:i + 5]))});"
+                )
+                i += 5
+            elif op == DRAW_ELEMENTS:
+                lines.append(
+                    f"gl.drawElementsInstanced({', '.join(map(str, ops[i + 1:i + 6]))});"
+                )
+                i += 6
+            elif op == UNIFORM_INT:
+                lines.append(
+                    f"o[{ops[i + 1]}].call(gl, o[{ops[i + 2]}], {ops[i + 3]});"
+                )
+                i += 4
+            elif op == UNIFORM_FLOAT:
+                value = _js_number(f[ops[i + 3]])
+                lines.append(f"o[{ops[i + 1]}].call(gl, o[{ops[i + 2]}], {value});")
+                i += 4
+            elif op == UNIFORM_INT_VEC:
+                count = ops[i + 3]
+                name = const("Int32Array", ops[i + 4:i + 4 + count])
+                lines.append(f"o[{ops[i + 1]}].call(gl, o[{ops[i + 2]}], {name});")
+                i += 4 + count
+            elif op in (UNIFORM_FLOAT_VEC, UNIFORM_MATRIX):
+                start = ops[i + 4]
+                name = const("Float32Array", f[start:start + ops[i + 3]])
+                transpose = "false, " if op == UNIFORM_MATRIX else ""
+                lines.append(
+                    f"o[{ops[i + 1]}].call(gl, o[{ops[i + 2]}], {transpose}{name});"
+                )
+                i += 5
+            elif op == CLEAR:
+                start = ops[i + 2]
+                color = ", ".join(map(_js_number, f[start:start + 4]))
+                lines.append(f"gl.clearColor({color});")
+                lines.append(f"gl.clear({ops[i + 1]});")
+                i += 3
+            elif op == BIND_BUFFER_BASE:
+                lines.append(
+                    f"gl.bindBufferBase({ops[i + 1]}, {ops[i + 2]}, "
+                    f"o[{ops[i + 3]}] ?? null);"
+                )
+                i += 4
+            elif op == BIND_BUFFER_RANGE:
+                lines.append(
+                    f"gl.bindBufferRange({ops[i + 1]}, {ops[i + 2]}, "
+                    f"o[{ops[i + 3]}] ?? null, {ops[i + 4]}, {ops[i + 5]});"
+                )
+                i += 6
+            elif op == BEGIN_TRANSFORM_FEEDBACK:
+                lines.append(f"gl.beginTransformFeedback({ops[i + 1]});")
+                i += 2
+            elif op == END_TRANSFORM_FEEDBACK:
+                lines.append("gl.endTransformFeedback();")
+                i += 1
+            elif op == MULTI_DRAW_ARRAYS:
+                ext, mode, count, instanced = ops[i + 1:i + 5]
+                at = i + 5
+                firsts = const("Int32Array", ops[at:at + count])
+                counts = const("Int32Array", ops[at + count:at + 2 * count])
+                if instanced:
+                    instances = const("Int32Array", ops[at + 2 * count:at + 3 * count])
+                    lines.append(
+                        f"o[{ext}].multiDrawArraysInstancedWEBGL({mode}, {firsts}, 0, "
+                        f"{counts}, 0, {instances}, 0, {count});"
+                    )
+                    i = at + 3 * count
+                else:
+                    lines.append(
+                        f"o[{ext}].multiDrawArraysWEBGL({mode}, {firsts}, 0, "
+                        f"{counts}, 0, {count});"
+                    )
+                    i = at + 2 * count
+            elif op == MULTI_DRAW_ELEMENTS:
+                ext, mode, count, instanced, index_type, size = ops[i + 1:i + 7]
+                at = i + 7
+                offsets = const(
+                    "Int32Array", [first * size for first in ops[at:at + count]]
+                )
+                counts = const("Int32Array", ops[at + count:at + 2 * count])
+                if instanced:
+                    instances = const("Int32Array", ops[at + 2 * count:at + 3 * count])
+                    lines.append(
+                        f"o[{ext}].multiDrawElementsInstancedWEBGL({mode}, "
+                        f"{counts}, 0, {index_type}, {offsets}, 0, "
+                        f"{instances}, 0, {count});"
+                    )
+                    i = at + 3 * count
+                else:
+                    lines.append(
+                        f"o[{ext}].multiDrawElementsWEBGL({mode}, {counts}, 0, "
+                        f"{index_type}, {offsets}, 0, {count});"
+                    )
+                    i = at + 2 * count
+            else:
+                raise ValueError(f"Unknown command opcode {op} at {i}")
+
+        body = "\n        ".join(lines)
+        return (
+            "(o) => {\n    "
+            + "\n    ".join(consts)
+            + "\n    return (gl) => {\n        "
+            + body
+            + "\n    };\n}"
+        )
+
+    def compile(self):
+        """Compile the commands into a JavaScript function taking the WebGL context"""
+        return run_js(self.to_js_source())(to_js(self.objects))
+
+    def _obj(self, obj) -> int:
+        key = id(obj)
+        index = self._object_ids.get(key)
+        if index is None:
+            index = len(self.objects)
+            self.objects.append(obj)
+            self._object_ids[key] = index
+        return index
+
+    def _floats(self, values) -> int:
+        start = len(self.floats)
+        if isinstance(values, array) and values.typecode != "f":
+            values = values.tolist()
+        self.floats.extend(values)
+        return start
+
+    def use_program(self, glo) -> None:
+        self._commands += 1
+        self.ops.extend((USE_PROGRAM, self._obj(glo)))
+
+    def bind_vertex_array(self, glo) -> None:
+        self._commands += 1
+        self.ops.extend((BIND_VERTEX_ARRAY, self._obj(glo)))
+
+    def bind_buffer(self, target: int, glo) -> None:
+        self._commands += 1
+        self.ops.extend((BIND_BUFFER, target, self._obj(glo)))
+
+    def active_texture(self, texture: int) -> None:
+        self._commands += 1
+        self.ops.extend((ACTIVE_TEXTURE, texture))
+
+    def bind_texture(self, target: int, glo) -> None:
+        self._commands += 1
+        self.ops.extend((BIND_TEXTURE, target, self._obj(glo)))
+
+    def bind_framebuffer(self, target: int, glo) -> None:
+        self._commands += 1
+        self.ops.extend((BIND_FRAMEBUFFER, target, self._obj(glo)))
+
+    def viewport(self, x: int, y: int, width: int, height: int) -> None:
+        self._commands += 1
+        self.ops.extend((VIEWPORT, x, y, width, height))
+
+    def scissor(self, x: int, y: int, width: int, height: int) -> None:
+        self._commands += 1
+        self.ops.extend((SCISSOR, x, y, width, height))
+
+    def depth_mask(self, flag: bool) -> None:
+        self._commands += 1
+        self.ops.extend((DEPTH_MASK, 1 if flag else 0))
+
+    def enable(self, cap: int) -> None:
+        self._commands += 1
+        self.ops.extend((ENABLE, cap))
+
+    def disable(self, cap: int) -> None:
+        self._commands += 1
+        self.ops.extend((DISABLE, cap))
+
+    def blend_func(self, *factors: int) -> None:
+        self._commands += 1
+        if len(factors) == 2:
+            self.ops.extend((BLEND_FUNC, *factors))
+        else:
+            self.ops.extend((BLEND_FUNC_SEPARATE, *factors))
+
+    def draw_arrays(self, mode: int, first: int, count: int, instances: int) -> None:
+        self._commands += 1
+        self.ops.extend((DRAW_ARRAYS, mode, first, count, instances))
+
+    def draw_elements(
+        self, mode: int, count: int, index_type: int, offset: int, instances: int
+    ) -> None:
+        self._commands += 1
+        self.ops.extend((DRAW_ELEMENTS, mode, count, index_type, offset, instances))
+
+    def bind_buffer_base(self, target: int, index: int, glo) -> None:
+        self._commands += 1
+        self.ops.extend((BIND_BUFFER_BASE, target, index, self._obj(glo)))
+
+    def bind_buffer_range(
+        self, target: int, index: int, glo, offset: int, size: int
+    ) -> None:
+        self._commands += 1
+        self.ops.extend(
+            (BIND_BUFFER_RANGE, target, index, self._obj(glo), offset, size)
+        )
+
+    def begin_transform_feedback(self, mode: int) -> None:
+        self._commands += 1
+        self.ops.extend((BEGIN_TRANSFORM_FEEDBACK, mode))
+
+    def end_transform_feedback(self) -> None:
+        self._commands += 1
+        self.ops.append(END_TRANSFORM_FEEDBACK)
+
+    def multi_draw_arrays(self, ext, mode: int, firsts, counts, instances) -> None:
+        """
+        Record a ``WEBGL_multi_draw`` draw. The per draw values are
+        stored in the command list, so the inputs can be reused at once.
+
+        :param ext: The ``WEBGL_multi_draw`` extension object
+        :param int mode: The primitive mode
+        :param firsts: 32 bit integers with the first vertex of each draw
+        :param counts: 32 bit integers with the vertex count of each draw
+        :param instances: 32 bit integers with the instance count of each
+                          draw or None
+        """
+        self._commands += 1
+        instanced = instances is not None
+        self.ops.extend(
+            (MULTI_DRAW_ARRAYS, self._obj(ext), mode, len(firsts), int(instanced))
+        )
+        self.ops.frombytes(firsts.cast("B"))
+        self.ops.frombytes(counts.cast("B"))
+        if instanced:
+            self.ops.frombytes(instances.cast("B"))
+
+    def multi_draw_elements(
+        self, ext, mode: int, counts, index_type: int, firsts, size: int, instances
+    ) -> None:
+        """
+        Record an indexed ``WEBGL_multi_draw`` draw.
+        See :py:meth:`multi_draw_arrays`.
+        """
+        self._commands += 1
+        instanced = instances is not None
+        self.ops.extend(
+            (
+                MULTI_DRAW_ELEMENTS,
+                self._obj(ext),
+                mode,
+                len(firsts),
+                int(instanced),
+                index_type,
+                size,
+            )
+        )
+        self.ops.frombytes(firsts.cast("B"))
+        self.ops.frombytes(counts.cast("B"))
+        if instanced:
+            self.ops.frombytes(instances.cast("B"))
+
+    def uniform(self, setter, location, value, is_float: bool, is_matrix: bool):
+        """
+        Record a uniform upload.
+
+        :param setter: The WebGL uniform function, such as ``gl.uniform3fv``
+        :param location: The uniform location
+        :param value: A number or a sequence of numbers
+        :param bool is_float: Store the value as floats rather than integers
+        :param bool is_matrix: The setter takes a transpose argument
+        """
+        self._commands += 1
+        setter_index = self._obj(setter)
+        location_index = self._obj(location)
+
+        if is_matrix:
+            start = self._floats(value)
+            self.ops.extend(
+                (UNIFORM_MATRIX, setter_index, location_index, len(value), start)
+            )
+        elif isinstance(value, (int, float)):
+            if is_float:
+                self.floats.append(value)
+                self.ops.extend(
+                    (UNIFORM_FLOAT, setter_index, location_index, len(self.floats) - 1)
+                )
+            else:
+                self.ops.extend((UNIFORM_INT, setter_index, location_index, int(value)))
+        elif is_float:
+            start = self._floats(value)
+            self.ops.extend(
+                (UNIFORM_FLOAT_VEC, setter_index, location_index, len(value), start)
+            )
+        else:
+            self.ops.extend((UNIFORM_INT_VEC, setter_index, location_index, len(value)))
+            self.ops.extend(int(v) for v in value)
+
+    def clear_framebuffer(self, mask: int, color) -> None:
+        self._commands += 1
+        start = self._floats(color)
+        self.ops.extend((CLEAR, mask, start))
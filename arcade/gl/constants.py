@@ -632,7 +632,7 @@ UNMASKED_RENDERER_WEBGL = 37446
 
 # EXT_texture_filter_anisotropic
 MAX_TEXTURE_MAX_ANISOTROPY_EXT = 34047
-TEXTURE_MAX_ANISOTROPY_EXT = 34048
+TEXTURE_MAX_ANISOTROPY_EXT = 34046
 
 # WEBGL_compressed_texture_s3tc
 COMPRESSED_RGB_S3TC_DXT1_EXT = 33776
@@ -640,6 +640,54 @@ COMPRESSED_RGBA_S3TC_DXT1_EXT = 33777
 COMPRESSED_RGBA_S3TC_DXT3_EXT = 33778
 COMPRESSED_RGBA_S3TC_DXT5_EXT = 33779
 
+# WEBGL_compressed_texture_s3tc_srgb
+COMPRESSED_SRGB_S3TC_DXT1_EXT = 35916
+COMPRESSED_SRGB_ALPHA_S3TC_DXT1_EXT = 35917
+COMPRESSED_SRGB_ALPHA_S3TC_DXT3_EXT = 35918
+COMPRESSED_SRGB_ALPHA_S3TC_DXT5_EXT = 35919
+
+# EXT_texture_compression_rgtc
+COMPRESSED_RED_RGTC1_EXT = 36283
+COMPRESSED_SIGNED_RED_RGTC1_EXT = 36284
+COMPRESSED_RED_GREEN_RGTC2_EXT = 36285
+COMPRESSED_SIGNED_RED_GREEN_RGTC2_EXT = 36286
+
+# EXT_texture_compression_bptc
+COMPRESSED_RGBA_BPTC_UNORM_EXT = 36492
+COMPRESSED_SRGB_ALPHA_BPTC_UNORM_EXT = 36493
+COMPRESSED_RGB_BPTC_SIGNED_FLOAT_EXT = 36494
+COMPRESSED_RGB_BPTC_UNSIGNED_FLOAT_EXT = 36495
+
+# WEBGL_compressed_texture_astc
+COMPRESSED_RGBA_ASTC_4x4_KHR = 37808
+COMPRESSED_RGBA_ASTC_5x4_KHR = 37809
+COMPRESSED_RGBA_ASTC_5x5_KHR = 37810
+COMPRESSED_RGBA_ASTC_6x5_KHR = 37811
+COMPRESSED_RGBA_ASTC_6x6_KHR = 37812
+COMPRESSED_RGBA_ASTC_8x5_KHR = 37813
+COMPRESSED_RGBA_ASTC_8x6_KHR = 37814
+COMPRESSED_RGBA_ASTC_8x8_KHR = 37815
+COMPRESSED_RGBA_ASTC_10x5_KHR = 37816
+COMPRESSED_RGBA_ASTC_10x6_KHR = 37817
+COMPRESSED_RGBA_ASTC_10x8_KHR = 37818
+COMPRESSED_RGBA_ASTC_10x10_KHR = 37819
+COMPRESSED_RGBA_ASTC_12x10_KHR = 37820
+COMPRESSED_RGBA_ASTC_12x12_KHR = 37821
+COMPRESSED_SRGB8_ALPHA8_ASTC_4x4_KHR = 37840
+COMPRESSED_SRGB8_ALPHA8_ASTC_5x4_KHR = 37841
+COMPRESSED_SRGB8_ALPHA8_ASTC_5x5_KHR = 37842
+COMPRESSED_SRGB8_ALPHA8_ASTC_6x5_KHR = 37843
+COMPRESSED_SRGB8_ALPHA8_ASTC_6x6_KHR = 37844
+COMPRESSED_SRGB8_ALPHA8_ASTC_8x5_KHR = 37845
+COMPRESSED_SRGB8_ALPHA8_ASTC_8x6_KHR = 37846
+COMPRESSED_SRGB8_ALPHA8_ASTC_8x8_KHR = 37847
+COMPRESSED_SRGB8_ALPHA8_ASTC_10x5_KHR = 37848
+COMPRESSED_SRGB8_ALPHA8_ASTC_10x6_KHR = 37849
+COMPRESSED_SRGB8_ALPHA8_ASTC_10x8_KHR = 37850
+COMPRESSED_SRGB8_ALPHA8_ASTC_10x10_KHR = 37851
+COMPRESSED_SRGB8_ALPHA8_ASTC_12x10_KHR = 37852
+COMPRESSED_SRGB8_ALPHA8_ASTC_12x12_KHR = 37853
+
 # WEBGL_compressed_texture_etc
 COMPRESSED_R11_EAC = 37488
 COMPRESSED_SIGNED_R11_EAC = 37489
@@ -1,15 +1,71 @@
-from typing import List, Optional, Sequence, Set, Tuple, Union
+import weakref
+from array import array
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from arcade.arcade_types import BufferProtocol
 from arcade.gl import constants
 
-from .buffer import Buffer
+from .arena import VertexArena
+from .buffer import Buffer, BufferRead, GrowableBuffer
+from .commands import CommandList
+from .dispatch import GLDispatch
 from .framebuffer import DefaultFrameBuffer, Framebuffer
+from .interop import multi_draw_arrays, multi_draw_elements
+from .ktx2 import KTX2File, select_ktx2
+from .mirrored_buffer import MirroredBuffer
 from .program import Program
+from .render_bundle import RenderBundle
+from .ring_buffer import RingBuffer
 from .texture import Texture
-from .types import BufferDescription
+from .texture_atlas import TextureAtlas
+from .uniform_arena import UniformArena
+from .types import BufferDescription, compressed_texture_extensions
 from .vertex_array import Geometry
 
+# Marks a piece of shadowed state as unknown so the next call is always issued
+_UNKNOWN = object()
+
+
+class ContextStats:
+    """
+    Counts the WebGL state calls that were issued or elided by the
+    state shadowing in :py:class:`Context`, the uniform values uploaded
+    and the number of times recorded commands were flushed. Counters are
+    reset by :py:meth:`Context.new_frame`, the values from the previous
+    frame are kept in ``last_issued``, ``last_elided`` and
+    ``last_uniform_uploads``.
+    """
+
+    def __init__(self):
+        self.frame = 0
+        self.issued = 0
+        self.elided = 0
+        self.uniform_uploads = 0
+        self.last_issued = 0
+        self.last_elided = 0
+        self.last_uniform_uploads = 0
+        self.flushes = 0
+
+    def new_frame(self) -> None:
+        self.last_issued = self.issued
+        self.last_elided = self.elided
+        self.last_uniform_uploads = self.uniform_uploads
+        self.issued = 0
+        self.elided = 0
+        self.uniform_uploads = 0
+        self.frame += 1
+
 
 class Context:
 
@@ -24,24 +80,60 @@ class Context:
     BLEND_PREMULTIPLIED_ALPHA = constants.SRC_ALPHA, constants.ONE
 
     def __init__(self, canvas):
-        self.gl = canvas.getContext("webgl2")
-        self._anisotropy_ext = self.gl.getExtension("EXT_texture_filter_anisotropic")
+        self._gl = canvas.getContext("webgl2")
+        self._dispatch = GLDispatch(self._gl)
+        # Commands are recorded here instead of being issued when set
+        self.command_list: Optional[CommandList] = None
+        self._bundle: Optional[RenderBundle] = None
+        self._anisotropy_ext = self._dispatch.getExtension(
+            "EXT_texture_filter_anisotropic"
+        )
+        self._multi_draw_ext = self._dispatch.getExtension("WEBGL_multi_draw")
+        # Compressed formats are only accepted once their extension is enabled
+        self._compressed_formats = frozenset(
+            fmt
+            for extension, formats in compressed_texture_extensions.items()
+            if self._dispatch.getExtension(extension) is not None
+            for fmt in formats
+        )
         self._limits = Limits(self)
         Context.activate(self)
         self.default_texture_unit = self._limits.MAX_TEXTURE_IMAGE_UNITS - 1
 
+        self.stats = ContextStats()
+        # Copy uploads through pooled staging arrays instead of viewing
+        # Python memory directly. See arcade.gl.interop
+        self.staging_uploads = False
+        self._ring_buffers: "weakref.WeakSet[RingBuffer]" = weakref.WeakSet()
+        self._mirrored_buffers: "weakref.WeakSet[MirroredBuffer]" = weakref.WeakSet()
+        # Reads from Buffer.read_async waiting for the GPU
+        self._pending_reads: List[BufferRead] = []
+        self._state_program = _UNKNOWN
+        self._state_vao = _UNKNOWN
+        self._state_framebuffer = _UNKNOWN
+        self._state_buffers: Dict[int, object] = {}
+        self._state_texture_unit = _UNKNOWN
+        self._state_textures: Dict[Tuple[int, int], object] = {}
+        self._state_viewport = _UNKNOWN
+        self._state_scissor = _UNKNOWN
+        self._state_depth_mask = _UNKNOWN
+
         self._screen = DefaultFrameBuffer(self)
         self.active_program: Optional[Program] = None
         self.active_framebuffer: Framebuffer = self._screen
 
-        self.gl.enable(constants.SCISSOR_TEST)
+        self._dispatch.enable(constants.SCISSOR_TEST)
 
         self._blend_func: Union[Tuple[int, int], Tuple[int, int, int, int]] = (
             constants.SRC_ALPHA,
             constants.ONE_MINUS_SRC_ALPHA,
         )
+        self._dispatch.blendFunc(*self._blend_func)
+        self._state_blend_func = self._blend_func
         self._point_size = 1.0
         self._flags: Set[int] = set()
+        # Capabilities whose real state may differ from self._flags
+        self._unknown_flags: Set[int] = set()
 
         self._uniform_setters = None
         self._build_uniform_setters()
@@ -49,41 +141,411 @@ class Context:
     def _build_uniform_setters(self):
         self._uniform_setters = {
             # Integers
-            constants.INT: (int, self.gl.uniform1i, 1, 1),
-            constants.INT_VEC2: (int, self.gl.uniform2iv, 2, 1),
-            constants.INT_VEC3: (int, self.gl.uniform3iv, 3, 1),
-            constants.INT_VEC4: (int, self.gl.uniform4iv, 4, 1),
+            constants.INT: (int, self._dispatch.uniform1i, 1, 1),
+            constants.INT_VEC2: (int, self._dispatch.uniform2iv, 2, 1),
+            constants.INT_VEC3: (int, self._dispatch.uniform3iv, 3, 1),
+            constants.INT_VEC4: (int, self._dispatch.uniform4iv, 4, 1),
             # Bools
-            constants.BOOL: (bool, self.gl.uniform1i, 1, 1),
-            constants.BOOL_VEC2: (bool, self.gl.uniform2iv, 2, 1),
-            constants.BOOL_VEC3: (bool, self.gl.uniform3iv, 3, 1),
-            constants.BOOL_VEC4: (bool, self.gl.uniform4iv, 4, 1),
+            constants.BOOL: (bool, self._dispatch.uniform1i, 1, 1),
+            constants.BOOL_VEC2: (bool, self._dispatch.uniform2iv, 2, 1),
+            constants.BOOL_VEC3: (bool, self._dispatch.uniform3iv, 3, 1),
+            constants.BOOL_VEC4: (bool, self._dispatch.uniform4iv, 4, 1),
             # Floats
-            constants.FLOAT: (float, self.gl.uniform1f, 1, 1),
-            constants.FLOAT_VEC2: (float, self.gl.uniform2fv, 2, 1),
-            constants.FLOAT_VEC3: (float, self.gl.uniform3fv, 3, 1),
-            constants.FLOAT_VEC4: (float, self.gl.uniform4fv, 4, 1),
+            constants.FLOAT: (float, self._dispatch.uniform1f, 1, 1),
+            constants.FLOAT_VEC2: (float, self._dispatch.uniform2fv, 2, 1),
+            constants.FLOAT_VEC3: (float, self._dispatch.uniform3fv, 3, 1),
+            constants.FLOAT_VEC4: (float, self._dispatch.uniform4fv, 4, 1),
             # Matrices
-            constants.FLOAT_MAT2: (float, self.gl.uniformMatrix2fv, 4, 1),
-            constants.FLOAT_MAT3: (float, self.gl.uniformMatrix3fv, 9, 1),
-            constants.FLOAT_MAT4: (float, self.gl.uniformMatrix4fv, 16, 1),
-            # 2D Samplers
-            constants.SAMPLER_2D: (int, self.gl.uniform1i, 1, 1),
-            constants.INT_SAMPLER_2D: (int, self.gl.uniform1i, 1, 1),
-            constants.UNSIGNED_INT_SAMPLER_2D: (int, self.gl.uniform1i, 1, 1),
-            # Array
-            constants.SAMPLER_2D_ARRAY: (
-                int,
-                self.gl.uniform1iv,
-                self.gl.uniform1iv,
-                1,
-                1,
-            ),
+            constants.FLOAT_MAT2: (float, self._dispatch.uniformMatrix2fv, 4, 1),
+            constants.FLOAT_MAT3: (float, self._dispatch.uniformMatrix3fv, 9, 1),
+            constants.FLOAT_MAT4: (float, self._dispatch.uniformMatrix4fv, 16, 1),
         }
+        # Samplers are set to a texture unit
+        for sampler in (
+            constants.SAMPLER_2D,
+            constants.INT_SAMPLER_2D,
+            constants.UNSIGNED_INT_SAMPLER_2D,
+            constants.SAMPLER_2D_SHADOW,
+            constants.SAMPLER_2D_ARRAY,
+            constants.INT_SAMPLER_2D_ARRAY,
+            constants.UNSIGNED_INT_SAMPLER_2D_ARRAY,
+            constants.SAMPLER_2D_ARRAY_SHADOW,
+            constants.SAMPLER_3D,
+            constants.INT_SAMPLER_3D,
+            constants.UNSIGNED_INT_SAMPLER_3D,
+            constants.SAMPLER_CUBE,
+            constants.INT_SAMPLER_CUBE,
+            constants.UNSIGNED_INT_SAMPLER_CUBE,
+            constants.SAMPLER_CUBE_SHADOW,
+        ):
+            self._uniform_setters[sampler] = (int, self._dispatch.uniform1i, 1, 1)
+
+    @property
+    def gl(self):
+        """
+        The WebGL2 rendering context. Any recorded commands are flushed
+        first so direct calls happen in the right order.
+        """
+        if self.command_list is not None and self.command_list.pending:
+            self.flush()
+        return self._gl
 
-    def clear(self, color: Tuple[float, float, float, float]):
-        self.gl.clearColor(*color)
-        self.gl.clear(self.gl.COLOR_BUFFER_BIT)
+    @property
+    def limits(self) -> "Limits":
+        """The implementation limits of this WebGL context"""
+        return self._limits
+
+    @property
+    def multi_draw(self) -> bool:
+        """
+        True if the ``WEBGL_multi_draw`` extension is available. Without it
+        :py:meth:`Geometry.render_multi` issues one draw call per sub-draw.
+        """
+        return self._multi_draw_ext is not None
+
+    @property
+    def compressed_formats(self) -> FrozenSet[int]:
+        """
+        The compressed texture formats supported by the S3TC, RGTC, BPTC,
+        ETC and ASTC extensions that are available.
+        """
+        return self._compressed_formats
+
+    @property
+    def dispatch(self) -> GLDispatch:
+        """
+        The WebGL functions resolved once at context creation. Prefer this
+        over :py:attr:`gl` for calls in hot paths, since every attribute
+        lookup on :py:attr:`gl` crosses the Pyodide FFI. Any recorded
+        commands are flushed first so direct calls happen in the right order.
+        """
+        if self.command_list is not None and self.command_list.pending:
+            self.flush()
+        return self._dispatch
+
+    @property
+    def record_commands(self) -> bool:
+        """
+        Enable or disable command recording. When enabled, state changes,
+        uniform uploads, clears and draw calls are recorded into a
+        :py:class:`~arcade.gl.commands.CommandList` and executed in a single
+        call into JavaScript by :py:meth:`flush`. The window flushes after
+        every ``on_draw``. Any direct use of :py:attr:`gl` flushes first.
+        Disable it to issue every call immediately, which is easier to debug.
+        """
+        return self.command_list is not None
+
+    @record_commands.setter
+    def record_commands(self, value: bool):
+        if value and self.command_list is None:
+            self.command_list = CommandList()
+        elif not value and self.command_list is not None:
+            self.flush()
+            self.command_list = None
+
+    def flush(self) -> None:
+        """Execute and clear all recorded commands"""
+        commands = self.command_list
+        if commands is None or not commands.pending:
+            return
+        self.stats.flushes += 1
+        commands.execute(self._gl)
+        # A render bundle being captured keeps its commands for replay
+        if self._bundle is None:
+            commands.clear()
+
+    def render_bundle(self, draw: Callable[[], None]) -> RenderBundle:
+        """
+        Create a :py:class:`~arcade.gl.RenderBundle` replaying the state
+        changes, uniform uploads and draw calls made by ``draw``.
+
+        :param draw: A function issuing the draw calls to capture
+        """
+        return RenderBundle(self, draw)
+
+    def new_frame(self) -> None:
+        """Called by the window at the start of every frame"""
+        self.stats.new_frame()
+        for ring in self._ring_buffers:
+            ring.new_frame()
+        for mirror in self._mirrored_buffers:
+            mirror.new_frame()
+        if self._pending_reads:
+            self._pending_reads = [r for r in self._pending_reads if not r.poll()]
+
+    def invalidate_state(self) -> None:
+        """
+        Forget all shadowed state so the next state change is always issued.
+        Call this after making WebGL calls on ``ctx.gl`` directly.
+        """
+        self._state_program = _UNKNOWN
+        self._state_vao = _UNKNOWN
+        self._state_framebuffer = _UNKNOWN
+        self._state_buffers = {}
+        self._state_texture_unit = _UNKNOWN
+        self._state_textures = {}
+        self._state_viewport = _UNKNOWN
+        self._state_scissor = _UNKNOWN
+        self._state_depth_mask = _UNKNOWN
+        self._state_blend_func = _UNKNOWN
+        self._unknown_flags = {constants.BLEND, constants.DEPTH_TEST, constants.CULL_FACE}
+
+    def _save_state(self) -> tuple:
+        return (
+            self._state_program,
+            self._state_vao,
+            self._state_framebuffer,
+            dict(self._state_buffers),
+            self._state_texture_unit,
+            dict(self._state_textures),
+            self._state_viewport,
+            self._state_scissor,
+            self._state_depth_mask,
+            self._state_blend_func,
+            self._blend_func,
+            set(self._flags),
+            set(self._unknown_flags),
+            self.active_program,
+            self.active_framebuffer,
+        )
+
+    def _restore_state(self, state: tuple) -> None:
+        (
+            self._state_program,
+            self._state_vao,
+            self._state_framebuffer,
+            buffers,
+            self._state_texture_unit,
+            textures,
+            self._state_viewport,
+            self._state_scissor,
+            self._state_depth_mask,
+            self._state_blend_func,
+            self._blend_func,
+            flags,
+            unknown_flags,
+            self.active_program,
+            self.active_framebuffer,
+        ) = state
+        self._state_buffers = dict(buffers)
+        self._state_textures = dict(textures)
+        self._flags = set(flags)
+        self._unknown_flags = set(unknown_flags)
+
+    def _program_linked(self, program: Program) -> None:
+        """Called when a program has been linked and introspected"""
+
+    def use_program(self, glo) -> None:
+        if self._state_program is glo:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_program = glo
+        if self.command_list is not None:
+            self.command_list.use_program(glo)
+        else:
+            self._dispatch.useProgram(glo)
+
+    def bind_vertex_array(self, glo) -> None:
+        if self._state_vao is glo:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_vao = glo
+        # The element array binding is part of the vertex array state
+        self._state_buffers.pop(constants.ELEMENT_ARRAY_BUFFER, None)
+        if self.command_list is not None:
+            self.command_list.bind_vertex_array(glo)
+        else:
+            self._dispatch.bindVertexArray(glo)
+
+    def bind_buffer(self, target: int, glo) -> None:
+        if self._state_buffers.get(target, _UNKNOWN) is glo:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_buffers[target] = glo
+        if self.command_list is not None:
+            self.command_list.bind_buffer(target, glo)
+        else:
+            self._dispatch.bindBuffer(target, glo)
+
+    def active_texture(self, unit: int) -> None:
+        if self._state_texture_unit == unit:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_texture_unit = unit
+        if self.command_list is not None:
+            self.command_list.active_texture(constants.TEXTURE0 + unit)
+        else:
+            self._dispatch.activeTexture(constants.TEXTURE0 + unit)
+
+    def bind_texture(self, unit: int, target: int, glo) -> None:
+        # Always select the unit: texture calls following a bind act on the
+        # texture bound to the active unit, even when the bind is elided
+        self.active_texture(unit)
+        key = unit, target
+        if self._state_textures.get(key, _UNKNOWN) is glo:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_textures[key] = glo
+        if self.command_list is not None:
+            self.command_list.bind_texture(target, glo)
+        else:
+            self._dispatch.bindTexture(target, glo)
+
+    def bind_framebuffer(self, glo) -> None:
+        if self._state_framebuffer is glo:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_framebuffer = glo
+        if self.command_list is not None:
+            self.command_list.bind_framebuffer(constants.FRAMEBUFFER, glo)
+        else:
+            self._dispatch.bindFramebuffer(constants.FRAMEBUFFER, glo)
+
+    def set_viewport(self, viewport: Tuple[int, int, int, int]) -> None:
+        if self._state_viewport == viewport:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_viewport = viewport
+        if self.command_list is not None:
+            self.command_list.viewport(*viewport)
+        else:
+            self._dispatch.viewport(*viewport)
+
+    def set_scissor(self, scissor: Tuple[int, int, int, int]) -> None:
+        if self._state_scissor == scissor:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_scissor = scissor
+        if self.command_list is not None:
+            self.command_list.scissor(*scissor)
+        else:
+            self._dispatch.scissor(*scissor)
+
+    def set_depth_mask(self, value: bool) -> None:
+        if self._state_depth_mask == value:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_depth_mask = value
+        if self.command_list is not None:
+            self.command_list.depth_mask(value)
+        else:
+            self._dispatch.depthMask(value)
+
+    def draw_arrays(self, mode: int, first: int, count: int, instances: int) -> None:
+        if self.command_list is not None:
+            self.command_list.draw_arrays(mode, first, count, instances)
+        else:
+            self._dispatch.drawArraysInstanced(mode, first, count, instances)
+
+    def draw_elements(
+        self, mode: int, count: int, index_type: int, offset: int, instances: int
+    ) -> None:
+        if self.command_list is not None:
+            self.command_list.draw_elements(mode, count, index_type, offset, instances)
+        else:
+            self._dispatch.drawElementsInstanced(
+                mode, count, index_type, offset, instances
+            )
+
+    def multi_draw_arrays(self, mode: int, firsts, counts, instances=None) -> None:
+        if self._multi_draw_ext is None:
+            if instances is None:
+                instances = [1] * len(firsts)
+            for first, count, num in zip(firsts, counts, instances):
+                self.draw_arrays(mode, first, count, num)
+        elif self.command_list is not None:
+            self.command_list.multi_draw_arrays(
+                self._multi_draw_ext, mode, firsts, counts, instances
+            )
+        else:
+            multi_draw_arrays(self._multi_draw_ext, mode, firsts, counts, instances)
+
+    def multi_draw_elements(
+        self,
+        mode: int,
+        counts,
+        index_type: int,
+        firsts,
+        element_size: int,
+        instances=None,
+    ) -> None:
+        if self._multi_draw_ext is None:
+            if instances is None:
+                instances = [1] * len(firsts)
+            for first, count, num in zip(firsts, counts, instances):
+                self.draw_elements(mode, count, index_type, first * element_size, num)
+        elif self.command_list is not None:
+            self.command_list.multi_draw_elements(
+                self._multi_draw_ext,
+                mode,
+                counts,
+                index_type,
+                firsts,
+                element_size,
+                instances,
+            )
+        else:
+            multi_draw_elements(
+                self._multi_draw_ext,
+                mode,
+                counts,
+                index_type,
+                firsts,
+                element_size,
+                instances,
+            )
+
+    def bind_buffer_base(self, target: int, index: int, glo) -> None:
+        self.stats.issued += 1
+        # Indexed binds also change the generic binding of the target
+        self._state_buffers[target] = glo
+        if self.command_list is not None:
+            self.command_list.bind_buffer_base(target, index, glo)
+        else:
+            self._dispatch.bindBufferBase(target, index, glo)
+
+    def bind_buffer_range(
+        self, target: int, index: int, glo, offset: int, size: int
+    ) -> None:
+        self.stats.issued += 1
+        self._state_buffers[target] = glo
+        if self.command_list is not None:
+            self.command_list.bind_buffer_range(target, index, glo, offset, size)
+        else:
+            self._dispatch.bindBufferRange(target, index, glo, offset, size)
+
+    def begin_transform_feedback(self, mode: int) -> None:
+        if self.command_list is not None:
+            self.command_list.begin_transform_feedback(mode)
+        else:
+            self._dispatch.beginTransformFeedback(mode)
+
+    def end_transform_feedback(self) -> None:
+        if self.command_list is not None:
+            self.command_list.end_transform_feedback()
+        else:
+            self._dispatch.endTransformFeedback()
+
+    def clear(
+        self,
+        color: Tuple[float, float, float, float],
+        *,
+        mask: int = constants.COLOR_BUFFER_BIT,
+    ):
+        if self.command_list is not None:
+            self.command_list.clear_framebuffer(mask, color)
+        else:
+            self._dispatch.clearColor(*color)
+            self._dispatch.clear(mask)
 
     @property
     def blend_func(self) -> Union[Tuple[int, int], Tuple[int, int, int, int]]:
@@ -91,13 +553,20 @@ class Context:
 
     @blend_func.setter
     def blend_func(self, value: Union[Tuple[int, int], Tuple[int, int, int, int]]):
+        if len(value) not in (2, 4):
+            raise ValueError("blend_func takes a tuple of 2 or 4 values")
         self._blend_func = value
-        if len(value) == 2:
-            self.gl.blendFunc(*value)
-        elif len(value) == 4:
-            self.gl.blendFuncSeparate(*value)
+        if value == self._state_blend_func:
+            self.stats.elided += 1
+            return
+        self.stats.issued += 1
+        self._state_blend_func = value
+        if self.command_list is not None:
+            self.command_list.blend_func(*value)
+        elif len(value) == 2:
+            self._dispatch.blendFunc(*value)
         else:
-            ValueError("blend_func takes a tuple of 2 or 4 values")
+            self._dispatch.blendFuncSeparate(*value)
 
     @property
     def screen(self) -> Framebuffer:
@@ -112,33 +581,48 @@ class Context:
         cls.active = ctx
 
     def enable(self, *flags):
-        self._flags.update(flags)
-
         for flag in flags:
-            self.gl.enable(flag)
+            if flag in self._flags and flag not in self._unknown_flags:
+                self.stats.elided += 1
+                continue
+            self.stats.issued += 1
+            self._flags.add(flag)
+            self._unknown_flags.discard(flag)
+            self._enable(flag, True)
 
     def enable_only(self, *args):
-        self._flags = set(args)
-
-        if constants.BLEND in self._flags:
-            self.gl.enable(constants.BLEND)
-        else:
-            self.gl.disable(constants.BLEND)
-
-        if constants.DEPTH_TEST in self._flags:
-            self.gl.enable(constants.DEPTH_TEST)
-        else:
-            self.gl.disable(constants.DEPTH_TEST)
+        for flag in (constants.BLEND, constants.DEPTH_TEST, constants.CULL_FACE):
+            if (flag in args) == (flag in self._flags) and (
+                flag not in self._unknown_flags
+            ):
+                self.stats.elided += 1
+                continue
+            self.stats.issued += 1
+            self._unknown_flags.discard(flag)
+            self._enable(flag, flag in args)
 
-        if constants.CULL_FACE in self._flags:
-            self.gl.enable(constants.CULL_FACE)
-        else:
-            self.gl.disable(constants.CULL_FACE)
+        self._flags = set(args)
 
     def disable(self, *flags):
-        self._flags -= set(flags)
         for flag in flags:
-            self.gl.disable(flag)
+            if flag not in self._flags and flag not in self._unknown_flags:
+                self.stats.elided += 1
+                continue
+            self.stats.issued += 1
+            self._flags.discard(flag)
+            self._unknown_flags.discard(flag)
+            self._enable(flag, False)
+
+    def _enable(self, flag: int, value: bool):
+        if self.command_list is not None:
+            if value:
+                self.command_list.enable(flag)
+            else:
+                self.command_list.disable(flag)
+        elif value:
+            self._dispatch.enable(flag)
+        else:
+            self._dispatch.disable(flag)
 
     def is_enabled(self, flag) -> bool:
         return flag in self._flags
@@ -151,13 +635,211 @@ class Context:
     def viewport(self, value: Tuple[int, int, int, int]):
         self.active_framebuffer.viewport = value
 
-    def program(self, *, vertex_shader: str, fragment_shader: str) -> Program:
+    def program(
+        self,
+        *,
+        vertex_shader: str,
+        fragment_shader: Optional[str] = None,
+        defer_uniforms: bool = False,
+        varyings: Optional[Sequence[str]] = None,
+        varyings_capture_mode: str = "interleaved",
+    ) -> Program:
+        """
+        Create a program from shader sources.
+
+        :param str vertex_shader: The vertex shader source
+        :param str fragment_shader: The fragment shader source. Can only be
+                                    left out when ``varyings`` are given
+        :param bool defer_uniforms: Stage uniform assignments until the
+                                    program is used for drawing
+        :param varyings: Vertex shader outputs to capture with transform
+                         feedback. See :py:meth:`Geometry.transform`
+        :param str varyings_capture_mode: ``"interleaved"`` to write all
+                                          varyings into one buffer or
+                                          ``"separate"`` to write each
+                                          varying into its own buffer
+        """
         return Program(
-            self, vertex_shader=vertex_shader, fragment_shader=fragment_shader
+            self,
+            vertex_shader=vertex_shader,
+            fragment_shader=fragment_shader,
+            defer_uniforms=defer_uniforms,
+            varyings=varyings,
+            varyings_capture_mode=varyings_capture_mode,
         )
 
-    def buffer(self, *, data: Optional[BufferProtocol] = None, usage: str = "static"):
-        return Buffer(self, data, usage=usage)
+    def buffer(
+        self,
+        *,
+        data: Optional[BufferProtocol] = None,
+        reserve: int = 0,
+        usage: str = "static",
+    ) -> Buffer:
+        """
+        Create a buffer with initial data, or reserve a number of bytes
+        with undefined contents.
+
+        :param data: The initial data
+        :param int reserve: Bytes to allocate when no data is given
+        :param str usage: The usage hint, ``"static"``, ``"dynamic"`` or ``"stream"``
+        """
+        return Buffer(self, data, reserve=reserve, usage=usage)
+
+    def growable_buffer(
+        self,
+        *,
+        data: Optional[BufferProtocol] = None,
+        reserve: int = 0,
+        usage: str = "dynamic",
+    ) -> GrowableBuffer:
+        """
+        Create a :py:class:`~arcade.gl.GrowableBuffer` that doubles its
+        capacity when written past its end.
+
+        :param data: The initial data
+        :param int reserve: Initial capacity in bytes when no data is given
+        :param str usage: The usage hint, ``"static"``, ``"dynamic"`` or ``"stream"``
+        """
+        return GrowableBuffer(self, data, reserve=reserve, usage=usage)
+
+    def index_buffer(self, indices: Iterable[int], *, usage: str = "static") -> Buffer:
+        """
+        Create an index buffer using the smallest index type able to hold
+        the largest index. Use the buffer as ``index_buffer`` in
+        :py:meth:`geometry`, which picks up the index size automatically.
+
+        A negative index is written as the primitive restart index of the
+        chosen type. WebGL2 always restarts strips and fans at this index,
+        so many strips can be drawn with one call. See
+        :py:func:`arcade.gl.geometry.join_strips`.
+
+        :param indices: The indices
+        :param str usage: The usage hint, see :py:meth:`buffer`
+        """
+        indices = list(indices)
+        largest = max(indices, default=0)
+        for element_size, typecode in ((1, "B"), (2, "H"), (4, "I")):
+            # The largest value of each type is reserved for restarts
+            restart = (1 << (element_size * 8)) - 1
+            if largest < restart:
+                break
+        else:
+            raise ValueError(f"Index {largest} is too large for an index buffer")
+
+        if min(indices, default=0) < 0:
+            indices = [restart if index < 0 else index for index in indices]
+
+        return Buffer(
+            self,
+            array(typecode, indices),
+            buffer_type=constants.ELEMENT_ARRAY_BUFFER,
+            usage=usage,
+            index_element_size=element_size,
+        )
+
+    def vertex_arena(
+        self,
+        formats: str,
+        attributes: Sequence[str],
+        *,
+        vertices: int = 65536,
+        normalized: Optional[Iterable[str]] = None,
+        mode: Optional[int] = None,
+        usage: str = "static",
+    ) -> VertexArena:
+        """
+        Create a :py:class:`~arcade.gl.VertexArena` sharing one buffer
+        between many small meshes with the same vertex format.
+
+        :param str formats: The vertex format, see :py:class:`~arcade.gl.BufferDescription`
+        :param attributes: The attribute names
+        :param int vertices: The number of vertices the arena can hold
+        :param normalized: Attributes that should be normalized
+        :param int mode: The primitive mode slices are drawn with
+        :param str usage: The usage hint of the buffer
+        """
+        return VertexArena(
+            self,
+            formats,
+            attributes,
+            vertices=vertices,
+            normalized=normalized,
+            mode=mode,
+            usage=usage,
+        )
+
+    def mirrored_buffer(
+        self,
+        data: Optional[Iterable] = None,
+        *,
+        size: int = 0,
+        typecode: str = "f",
+        gap: int = 256,
+        buffer_type: int = constants.ARRAY_BUFFER,
+        usage: str = "dynamic",
+    ) -> MirroredBuffer:
+        """
+        Create a :py:class:`~arcade.gl.MirroredBuffer` that keeps a Python
+        copy of its data and uploads only the changed ranges on flush.
+        Its upload stats are reset by :py:meth:`new_frame`.
+
+        :param data: The initial elements
+        :param int size: Number of zeroed elements when no data is given
+        :param str typecode: The ``array`` typecode of the elements
+        :param int gap: Merge dirty ranges separated by at most this many bytes
+        :param int buffer_type: The buffer binding target
+        :param str usage: The usage hint
+        """
+        mirror = MirroredBuffer(
+            self,
+            data,
+            size=size,
+            typecode=typecode,
+            gap=gap,
+            buffer_type=buffer_type,
+            usage=usage,
+        )
+        self._mirrored_buffers.add(mirror)
+        return mirror
+
+    def stream_buffer(
+        self,
+        size: int,
+        *,
+        frames: int = 3,
+        buffer_type: int = constants.ARRAY_BUFFER,
+        fence: bool = True,
+    ) -> RingBuffer:
+        """
+        Create a :py:class:`~arcade.gl.RingBuffer` for data rewritten every frame.
+        The ring is rotated automatically by :py:meth:`new_frame`.
+
+        :param int size: Bytes available to each frame
+        :param int frames: Number of frame regions to rotate through
+        :param int buffer_type: The buffer binding target
+        :param bool fence: Use fence sync objects to detect regions still in use
+        """
+        ring = RingBuffer(
+            self, size, frames=frames, buffer_type=buffer_type, fence=fence
+        )
+        self._ring_buffers.add(ring)
+        return ring
+
+    def uniform_arena(
+        self, frame_size: int = 65536, *, frames: int = 3, fence: bool = True
+    ) -> UniformArena:
+        """
+        Create a :py:class:`~arcade.gl.UniformArena` for packing per-draw
+        uniform blocks into one buffer. The arena is rotated automatically
+        by :py:meth:`new_frame`.
+
+        :param int frame_size: Bytes available to each frame
+        :param int frames: Number of frame regions to rotate through
+        :param bool fence: Use fence sync objects to detect regions still in use
+        """
+        arena = UniformArena(self, frame_size, frames=frames, fence=fence)
+        self._ring_buffers.add(arena)
+        return arena
 
     def framebuffer(
         self,
@@ -180,14 +862,208 @@ class Context:
         wrap_y: Optional[int] = None,
         filter: Optional[Tuple[int, int]] = None,
     ) -> Texture:
+        """
+        Create a 2D texture.
+
+        :param size: The width and height of the texture
+        :param int components: Number of components per pixel, 1 to 4
+        :param str dtype: The data type of each component, such as ``"f1"``
+        :param data: The initial pixels
+        :param int wrap_x: Wrap mode for the x axis. Defaults to ``REPEAT``
+        :param int wrap_y: Wrap mode for the y axis. Defaults to ``REPEAT``
+        :param filter: The ``(min, mag)`` filter. Defaults to linear filtering
+                       for float and normalized types, nearest for integers
+        """
+        return Texture(
+            self,
+            size,
+            components=components,
+            data=data,
+            dtype=dtype,
+            filter=filter,
+            wrap_x=wrap_x,
+            wrap_y=wrap_y,
+        )
+
+    def texture_array(
+        self,
+        size: Tuple[int, int, int],
+        *,
+        components: int = 4,
+        dtype: str = "f1",
+        data: Optional[BufferProtocol] = None,
+        wrap_x: Optional[int] = None,
+        wrap_y: Optional[int] = None,
+        filter: Optional[Tuple[int, int]] = None,
+    ) -> Texture:
+        """
+        Create a 2D array texture, a stack of same sized layers sampled with
+        a ``sampler2DArray``. Single layers are written with
+        ``texture.write(data, layer=i)``.
+
+        :param size: The width, height and number of layers
+        :param int components: Number of components per pixel, 1 to 4
+        :param str dtype: The data type of each component, such as ``"f1"``
+        :param data: The initial pixels, layer after layer
+        :param int wrap_x: Wrap mode for the x axis. Defaults to ``REPEAT``
+        :param int wrap_y: Wrap mode for the y axis. Defaults to ``REPEAT``
+        :param filter: The ``(min, mag)`` filter
+        """
+        return Texture(
+            self,
+            size,
+            components=components,
+            data=data,
+            dtype=dtype,
+            filter=filter,
+            wrap_x=wrap_x,
+            wrap_y=wrap_y,
+            target=constants.TEXTURE_2D_ARRAY,
+        )
+
+    def texture_3d(
+        self,
+        size: Tuple[int, int, int],
+        *,
+        components: int = 4,
+        dtype: str = "f1",
+        data: Optional[BufferProtocol] = None,
+        wrap_x: Optional[int] = None,
+        wrap_y: Optional[int] = None,
+        wrap_z: Optional[int] = None,
+        filter: Optional[Tuple[int, int]] = None,
+    ) -> Texture:
+        """
+        Create a 3D texture sampled with a ``sampler3D``, for example a
+        color lookup table.
+
+        :param size: The width, height and depth
+        :param int components: Number of components per pixel, 1 to 4
+        :param str dtype: The data type of each component, such as ``"f1"``
+        :param data: The initial pixels, slice after slice
+        :param int wrap_x: Wrap mode for the x axis. Defaults to ``REPEAT``
+        :param int wrap_y: Wrap mode for the y axis. Defaults to ``REPEAT``
+        :param int wrap_z: Wrap mode for the z axis. Defaults to ``REPEAT``
+        :param filter: The ``(min, mag)`` filter
+        """
         return Texture(
             self,
             size,
             components=components,
             data=data,
             dtype=dtype,
+            filter=filter,
             wrap_x=wrap_x,
             wrap_y=wrap_y,
+            wrap_z=wrap_z,
+            target=constants.TEXTURE_3D,
+        )
+
+    def compressed_texture(
+        self,
+        size: Tuple[int, int],
+        compressed_format: int,
+        levels: Sequence[BufferProtocol],
+        *,
+        wrap_x: Optional[int] = None,
+        wrap_y: Optional[int] = None,
+        filter: Optional[Tuple[int, int]] = None,
+    ) -> Texture:
+        """
+        Create a texture from compressed blocks, uploaded with
+        ``compressedTexSubImage2D``. The format must be in
+        :py:attr:`compressed_formats`.
+
+        :param size: The width and height of the texture
+        :param int compressed_format: The compressed internal format, such as
+                                      ``COMPRESSED_RGBA_S3TC_DXT5_EXT``
+        :param levels: The blocks of each mipmap level, largest first
+        :param int wrap_x: Wrap mode for the x axis. Defaults to ``REPEAT``
+        :param int wrap_y: Wrap mode for the y axis. Defaults to ``REPEAT``
+        :param filter: The ``(min, mag)`` filter. Defaults to trilinear
+                       filtering when there is more than one level
+        """
+        texture = Texture(
+            self,
+            size,
+            filter=filter,
+            wrap_x=wrap_x,
+            wrap_y=wrap_y,
+            compressed_format=compressed_format,
+            levels=len(levels),
+        )
+        for level, data in enumerate(levels):
+            texture.write(data, level=level)
+        return texture
+
+    def ktx2_texture(
+        self,
+        files: Union[KTX2File, Iterable[KTX2File]],
+        *,
+        wrap_x: Optional[int] = None,
+        wrap_y: Optional[int] = None,
+        filter: Optional[Tuple[int, int]] = None,
+    ) -> Texture:
+        """
+        Create a texture from a KTX2 file. When given versions of the same
+        texture in different formats, the best supported one is used, see
+        :py:func:`~arcade.gl.ktx2.select_ktx2`.
+
+        :param files: One or more KTX2 files
+        :param int wrap_x: Wrap mode for the x axis. Defaults to ``REPEAT``
+        :param int wrap_y: Wrap mode for the y axis. Defaults to ``REPEAT``
+        :param filter: The ``(min, mag)`` filter
+        """
+        if isinstance(files, KTX2File):
+            files = (files,)
+        ktx = select_ktx2(files, self._compressed_formats)
+        if ktx.depth > 1 or ktx.layers > 1 or ktx.faces > 1:
+            raise ValueError("Only 2D KTX2 textures are supported")
+
+        if ktx.internal_format is not None:
+            return self.compressed_texture(
+                ktx.size,
+                ktx.internal_format,
+                ktx.levels,
+                wrap_x=wrap_x,
+                wrap_y=wrap_y,
+                filter=filter,
+            )
+
+        components, dtype = ktx.pixel_format
+        texture = self.texture(
+            ktx.size,
+            components=components,
+            dtype=dtype,
+            data=ktx.levels[0],
+            wrap_x=wrap_x,
+            wrap_y=wrap_y,
+            filter=filter,
+        )
+        # Uncompressed mipmaps are generated rather than uploaded
+        if ktx.level_count != 1:
+            texture.build_mipmaps()
+        return texture
+
+    def texture_atlas(
+        self,
+        size: Tuple[int, int] = (512, 512),
+        *,
+        components: int = 4,
+        border: int = 1,
+        max_size: Optional[Tuple[int, int]] = None,
+    ) -> TextureAtlas:
+        """
+        Create a texture atlas packing many images into one texture.
+
+        :param size: The initial width and height of the atlas
+        :param int components: Number of components per pixel
+        :param int border: Empty pixels kept around each image
+        :param max_size: The largest size the atlas can grow to.
+                         Defaults to ``MAX_TEXTURE_SIZE``
+        """
+        return TextureAtlas(
+            self, size, components=components, border=border, max_size=max_size
         )
 
     def depth_texture(
@@ -200,7 +1076,7 @@ class Context:
         content: Optional[Sequence[BufferDescription]] = None,
         index_buffer: Optional[Buffer] = None,
         mode: Optional[int] = None,
-        index_element_size: int = 4,
+        index_element_size: Optional[int] = None,
     ):
         return Geometry(
             self,
@@ -282,8 +1158,11 @@ class Limits:
         )
         self.MAX_TEXTURE_IMAGE_UNITS = self.get_param(constants.MAX_TEXTURE_IMAGE_UNITS)
         print(self.MAX_TEXTURE_IMAGE_UNITS)
-        self.MAX_TEXTURE_MAX_ANISOTROPY = self.get_param(
-            constants.MAX_TEXTURE_MAX_ANISOTROPY_EXT
+        # Only queryable when EXT_texture_filter_anisotropic is available
+        self.MAX_TEXTURE_MAX_ANISOTROPY = (
+            self.get_param(constants.MAX_TEXTURE_MAX_ANISOTROPY_EXT)
+            if ctx._anisotropy_ext is not None
+            else 1.0
         )
         self.MAX_VIEWPORT_DIMS = self.get_param(constants.MAX_VIEWPORT_DIMS)
         self.MAX_TRANSFORM_FEEDBACK_SEPARATE_ATTRIBS = self.get_param(
@@ -292,5 +1171,4 @@ class Limits:
         self.POINT_SIZE_RANGE = self.get_param(constants.ALIASED_POINT_SIZE_RANGE)
 
     def get_param(self, enum: int):
-        return self._ctx.gl.getParameter(enum)
-        return self._ctx.gl.getParameter(enum)
+        return self._ctx.dispatch.getParameter(enum)
@@ -0,0 +1,122 @@
+"""
+Pre-resolved WebGL entry points.
+
+Looking up a method on the WebGL context's ``JsProxy``, like ``gl.bindBuffer``,
+is itself a call across the Pyodide FFI before the actual call even happens.
+:py:class:`GLDispatch` resolves the entry points used by ``arcade.gl`` once and
+stores the bound functions as plain Python attributes.
+"""
+
+ENTRY_POINTS = (
+    "activeTexture",
+    "attachShader",
+    "beginTransformFeedback",
+    "bindBuffer",
+    "bindBufferBase",
+    "bindBufferRange",
+    "bindFramebuffer",
+    "bindTexture",
+    "bindTransformFeedback",
+    "bindVertexArray",
+    "blendFunc",
+    "blendFuncSeparate",
+    "bufferData",
+    "bufferSubData",
+    "checkFramebufferStatus",
+    "clear",
+    "clearColor",
+    "clientWaitSync",
+    "compileShader",
+    "copyBufferSubData",
+    "createBuffer",
+    "createFramebuffer",
+    "createProgram",
+    "createShader",
+    "createTexture",
+    "createTransformFeedback",
+    "createVertexArray",
+    "deleteBuffer",
+    "deleteFramebuffer",
+    "deleteProgram",
+    "deleteShader",
+    "deleteSync",
+    "deleteTexture",
+    "deleteTransformFeedback",
+    "deleteVertexArray",
+    "depthMask",
+    "detachShader",
+    "disable",
+    "drawArraysInstanced",
+    "drawBuffers",
+    "drawElementsInstanced",
+    "enable",
+    "enableVertexAttribArray",
+    "endTransformFeedback",
+    "fenceSync",
+    "framebufferTexture2D",
+    "generateMipmap",
+    "getActiveAttrib",
+    "getActiveUniform",
+    "getActiveUniformBlockName",
+    "getActiveUniformBlockParameter",
+    "getActiveUniforms",
+    "getAttribLocation",
+    "getExtension",
+    "getParameter",
+    "getProgramInfoLog",
+    "getProgramParameter",
+    "getShaderInfoLog",
+    "getShaderParameter",
+    "getSyncParameter",
+    "getTransformFeedbackVarying",
+    "getUniformLocation",
+    "linkProgram",
+    "pixelStorei",
+    "scissor",
+    "shaderSource",
+    "texImage2D",
+    "texParameterf",
+    "texParameteri",
+    "texStorage2D",
+    "transformFeedbackVaryings",
+    "uniform1f",
+    "uniform1fv",
+    "uniform1i",
+    "uniform1iv",
+    "uniform2fv",
+    "uniform2iv",
+    "uniform3fv",
+    "uniform3iv",
+    "uniform4fv",
+    "uniform4iv",
+    "uniformBlockBinding",
+    "uniformMatrix2fv",
+    "uniformMatrix3fv",
+    "uniformMatrix4fv",
+    "useProgram",
+    "vertexAttribDivisor",
+    "vertexAttribPointer",
+    "viewport",
+)
+
+
+class GLDispatch:
+    """
+    A table of WebGL functions resolved once from a WebGL context.
+
+    The entry points in :py:data:`ENTRY_POINTS` are resolved when the table is
+    created. Any other attribute, including WebGL constants, is resolved from
+    the context on first access and cached.
+
+    :param gl: The WebGL2 rendering context
+    """
+
+    def __init__(self, gl):
+        self.raw = gl
+        for name in ENTRY_POINTS:
+            setattr(self, name, getattr(gl, name))
+
+    def __getattr__(self, name: str):
+        value = getattr(self.raw, name)
+        setattr(self, name, value)
+        return value
@@ -16,7 +16,7 @@ class Framebuffer:
         self, ctx: "Context", *, color_attachments=None, depth_attachment=None
     ):
         self._ctx = ctx
-        self._glo = self._ctx.gl.createFramebuffer()
+        self._glo = self._ctx.dispatch.createFramebuffer()
 
         self._color_attachments = (
             color_attachments
@@ -27,15 +27,16 @@ class Framebuffer:
         self._samples = 0
         self._depth_mask = True
         self._prev_fbo = None
+        self._draw_buffers_set = False
 
-        self._ctx.gl.bindFramebuffer(constants.FRAMEBUFFER, self._glo)
+        self._ctx.bind_framebuffer(self._glo)
 
         self._width, self._height = self._detect_size()
         self._viewport = 0, 0, self._width, self._height
         self._scissor: Optional[Tuple[int, int, int, int]] = None
 
         for i, tex in enumerate(self._color_attachments):
-            self._ctx.gl.framebufferTexture2D(
+            self._ctx.dispatch.framebufferTexture2D(
                 constants.FRAMEBUFFER,
                 constants.COLOR_ATTACHMENT0 + i,
                 tex._target,
@@ -44,7 +45,7 @@ class Framebuffer:
             )
 
         if self._depth_attachment:
-            self._ctx.gl.framebufferTexture2D(
+            self._ctx.dispatch.framebufferTexture2D(
                 constants.FRAMEBUFFER,
                 constants.DEPTH_ATTACHMENT,
                 self._depth_attachment._target,
@@ -98,11 +99,11 @@ class Framebuffer:
         # If the framebuffer is already bound we need to set the viewport
         # Otherwise it will be set on use()
         if self._ctx.active_framebuffer == self:
-            self._ctx.gl.viewport(*self._viewport)
+            self._ctx.set_viewport(self._viewport)
             if self._scissor is None:
-                self._ctx.gl.scissor(*self._viewport)
+                self._ctx.set_scissor(self._viewport)
             else:
-                self._ctx.gl.scissor(*self._scissor)
+                self._ctx.set_scissor(self._scissor)
 
     viewport = property(_get_viewport, _set_viewport)
 
@@ -114,10 +115,10 @@ class Framebuffer:
 
         if self._scissor is None:
             if self._ctx.active_framebuffer == self:
-                self._ctx.gl.scissor(*self._viewport)
+                self._ctx.set_scissor(self._viewport)
         else:
             if self._ctx.active_framebuffer == self:
-                self._ctx.gl.scissor(*self._scissor)
+                self._ctx.set_scissor(self._scissor)
 
     scissor = property(_get_scissor, _set_scissor)
 
@@ -138,17 +139,20 @@ class Framebuffer:
         if self._ctx.active_framebuffer == self and not force:
             return
 
-        self._ctx.gl.bindFramebuffer(constants.FRAMEBUFFER, self._glo)
+        self._ctx.bind_framebuffer(self._glo)
 
-        if self._draw_buffers:
-            self._ctx.gl.drawBuffers(self._draw_buffers)
+        # Draw buffers are part of the framebuffer state, so they only
+        # need to be set the first time the framebuffer is bound
+        if self._draw_buffers and not self._draw_buffers_set:
+            self._ctx.dispatch.drawBuffers(self._draw_buffers)
+            self._draw_buffers_set = True
 
-        self._ctx.gl.depthMask(self._depth_mask)
-        self._ctx.gl.viewport(*self._viewport)
+        self._ctx.set_depth_mask(self._depth_mask)
+        self._ctx.set_viewport(self._viewport)
         if self._scissor is not None:
-            self._ctx.gl.scissor(*self._scissor)
+            self._ctx.set_scissor(self._scissor)
         else:
-            self._ctx.gl.scissor(*self._viewport)
+            self._ctx.set_scissor(self._viewport)
 
     def clear(
         self,
@@ -168,25 +172,27 @@ class Framebuffer:
 
             if normalized:
                 if len(color) == 3:
-                    self._ctx.gl.clearColor(*color, 1.0)
+                    clear_color = (*color, 1.0)
                 else:
-                    self._ctx.gl.clearColor(*color)
+                    clear_color = tuple(color)
             else:
                 if len(color) == 3:
-                    self._ctx.gl.clearColor(
-                        color[0] / 255, color[1] / 255, color[2] / 255, 1.0
-                    )
+                    clear_color = (color[0] / 255, color[1] / 255, color[2] / 255, 1.0)
                 else:
-                    self._ctx.gl.clearColor(
-                        color[0] / 255, color[1] / 255, color[2] / 255, color[3] / 255
+                    clear_color = (
+                        color[0] / 255,
+                        color[1] / 255,
+                        color[2] / 255,
+                        color[3] / 255,
                     )
 
             if self._depth_attachment:
-                self._ctx.gl.clear(
-                    constants.COLOR_BUFFER_BIT | constants.DEPTH_BUFFER_BIT
+                self._ctx.clear(
+                    clear_color,
+                    mask=constants.COLOR_BUFFER_BIT | constants.DEPTH_BUFFER_BIT,
                 )
             else:
-                self._ctx.gl.clear(constants.COLOR_BUFFER_BIT)
+                self._ctx.clear(clear_color, mask=constants.COLOR_BUFFER_BIT)
 
             self.scissor = scissor_values
 
@@ -200,7 +206,7 @@ class Framebuffer:
             constants.FRAMEBUFFER_COMPLETE: "Framebuffer is complete.",
         }
 
-        status = ctx.gl.checkFramebufferStatus(constants.FRAMEBUFFER)
+        status = ctx.dispatch.checkFramebufferStatus(constants.FRAMEBUFFER)
         if status != constants.FRAMEBUFFER_COMPLETE:
             raise ValueError(
                 "Framebuffer is incomplete. {}".format(
@@ -222,7 +228,8 @@ class DefaultFrameBuffer(Framebuffer):
         self._glo = None
 
         self._draw_buffers = None
-        x, y, width, height = self._ctx.gl.getParameter(constants.SCISSOR_BOX)
+        self._draw_buffers_set = False
+        x, y, width, height = self._ctx.dispatch.getParameter(constants.SCISSOR_BOX)
 
         self._viewport = x, y, width, height
         self._scissor = None
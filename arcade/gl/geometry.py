@@ -1,9 +1,39 @@
+import copy
+import math
 from array import array
-from typing import Tuple
+from typing import Iterable, List, Optional, Sequence, Tuple
 
-from arcade.gl import BufferDescription, Context
+from arcade.gl import Buffer, BufferDescription, Context, Program, constants
+from arcade.gl.interop import get_buffer_sub_data
 from arcade.gl.vertex_array import Geometry
 
+# Index value replaced by the primitive restart index of the index type
+PRIMITIVE_RESTART = -1
+
+# Corners of a quad in triangle strip order: x, y, u, v
+_QUAD_CORNERS = (
+    (-1.0, 1.0, 0.0, 1.0),
+    (-1.0, -1.0, 0.0, 0.0),
+    (1.0, 1.0, 1.0, 1.0),
+    (1.0, -1.0, 1.0, 0.0),
+)
+_QUAD_INDICES = (0, 1, 2, 3)
+
+# Each face of a cube as its normal and the directions of the quad's x and y
+# axes, oriented so the triangles are counter-clockwise seen from outside
+_CUBE_FACES = (
+    ((0, 0, 1), (1, 0, 0), (0, 1, 0)),
+    ((1, 0, 0), (0, 0, -1), (0, 1, 0)),
+    ((0, 0, -1), (-1, 0, 0), (0, 1, 0)),
+    ((-1, 0, 0), (0, 0, 1), (0, 1, 0)),
+    ((0, 1, 0), (1, 0, 0), (0, 0, -1)),
+    ((0, -1, 0), (1, 0, 0), (0, 0, 1)),
+)
+# Two triangles per face, sharing the four corners of the face
+_CUBE_INDICES = tuple(
+    face * 4 + corner for face in range(6) for corner in (0, 1, 2, 2, 1, 3)
+)
+
 
 def _get_active_context() -> Context:
     ctx = Context.active
@@ -30,27 +60,9 @@ def quad_2d(
     width, height = size
     x_pos, y_pos = pos
 
-    data = array(
-        "f",
-        [
-            x_pos - width / 2.0,
-            y_pos + height / 2.0,
-            0.0,
-            1.0,
-            x_pos - width / 2.0,
-            y_pos - height / 2.0,
-            0.0,
-            0.0,
-            x_pos + width / 2.0,
-            y_pos + height / 2.0,
-            1.0,
-            1.0,
-            x_pos + width / 2.0,
-            y_pos - height / 2.0,
-            1.0,
-            0.0,
-        ],
-    )
+    data = array("f")
+    for x, y, u, v in _QUAD_CORNERS:
+        data.extend((x_pos + x * width / 2.0, y_pos + y * height / 2.0, u, v))
 
     return ctx.geometry(
         [
@@ -60,6 +72,7 @@ def quad_2d(
                 ["in_vert", "in_uv"],
             )
         ],
+        index_buffer=ctx.index_buffer(_QUAD_INDICES),
         mode=ctx.gl.TRIANGLE_STRIP,
     )
 
@@ -76,319 +89,296 @@ def cube(
     :returns: A cube
     """
     ctx = _get_active_context()
-    width, height, depth = size
-    width, height, depth = width / 2.0, height / 2.0, depth / 2.0
+    half = size[0] / 2.0, size[1] / 2.0, size[2] / 2.0
+
+    data = array("f")
+    for normal, right, up in _CUBE_FACES:
+        for x, y, u, v in _QUAD_CORNERS:
+            data.extend(
+                center[i] + (normal[i] + right[i] * x + up[i] * y) * half[i]
+                for i in range(3)
+            )
+            data.extend(normal)
+            data.extend((u, v))
 
-    pos = array(
-        "f",
+    return ctx.geometry(
         [
-            center[0] + width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] + depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] + depth,
-            center[0] - width,
-            center[1] + height,
-            center[2] + depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] + width,
-            center[1] - height,
-            center[2] - depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] + width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] + depth,
-            center[0] + width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] + width,
-            center[1] - height,
-            center[2] - depth,
-            center[0] + width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] + width,
-            center[1] - height,
-            center[2] - depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] - depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] - width,
-            center[1] + height,
-            center[2] + depth,
-            center[0] - width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] + depth,
-            center[0] - width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] - depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] + width,
-            center[1] - height,
-            center[2] - depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] - depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] - width,
-            center[1] - height,
-            center[2] - depth,
-            center[0] - width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] - width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] + depth,
-            center[0] - width,
-            center[1] + height,
-            center[2] - depth,
-            center[0] - width,
-            center[1] + height,
-            center[2] + depth,
-            center[0] + width,
-            center[1] + height,
-            center[2] + depth,
+            BufferDescription(
+                ctx.buffer(data=data),
+                "3f 3f 2f",
+                ["in_position", "in_normal", "in_uv"],
+            )
         ],
+        index_buffer=ctx.index_buffer(_CUBE_INDICES),
     )
 
-    normal = array(
-        "f",
-        [
-            -0,
-            0,
-            1,
-            -0,
-            0,
-            1,
-            -0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            -1,
-            -0,
-            0,
-            -1,
-            -0,
-            0,
-            -1,
-            -0,
-            0,
-            -1,
-            -0,
-            0,
-            -1,
-            -0,
-            0,
-            -1,
-            -0,
-            0,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            0,
-            -1,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-        ],
+
+def join_strips(strips: Iterable[Sequence[int]]) -> List[int]:
+    """
+    Join the indices of several triangle or line strips into one index list
+    separated by primitive restarts, so all strips can be drawn with a single
+    call. Pass the result to :py:meth:`~arcade.gl.Context.index_buffer`.
+
+    :param strips: The indices of each strip
+    """
+    indices: List[int] = []
+    for strip in strips:
+        if indices:
+            indices.append(PRIMITIVE_RESTART)
+        indices.extend(strip)
+    return indices
+
+
+class StaticBatch:
+    """
+    Many static objects merged into one :py:class:`~arcade.gl.Geometry`,
+    created by :py:func:`merge`.
+
+    All objects are drawn with a single draw call. Objects can be hidden
+    by setting their entry in :py:attr:`visible` to ``False``. The visible
+    objects are then drawn with one multi-draw call, see
+    :py:meth:`~arcade.gl.Geometry.render_multi`.
+
+    :param Geometry geometry: The merged geometry
+    :param ranges: The first vertex or index and the count of each object
+    :param int gap: Indices between two consecutive objects
+    """
+
+    def __init__(self, geometry: Geometry, ranges: List[Tuple[int, int]], gap: int = 0):
+        self.geometry = geometry
+        self.ranges = ranges
+        self.visible: List[bool] = [True] * len(ranges)
+        self._gap = gap
+
+    def __len__(self) -> int:
+        return len(self.ranges)
+
+    def render(self, program: Program, *, instances: int = 1) -> None:
+        """
+        Render the visible objects.
+
+        :param Program program: The program to render with
+        :param int instances: Number of instances to render
+        """
+        if all(self.visible):
+            self.geometry.render(program, instances=instances)
+            return
+
+        # Neighbouring visible objects are drawn as one range
+        firsts = array("i")
+        counts = array("i")
+        end = None
+        for (first, count), visible in zip(self.ranges, self.visible):
+            if not visible:
+                continue
+            if end is not None and first - end <= self._gap:
+                counts[-1] = first + count - firsts[-1]
+            else:
+                firsts.append(first)
+                counts.append(count)
+            end = first + count
+
+        per_draw = None if instances == 1 else array("i", [instances] * len(firsts))
+        self.geometry.render_multi(program, firsts, counts, per_draw)
+
+
+def merge(
+    geometries: Sequence[Geometry],
+    transforms: Optional[Sequence[Sequence[float]]] = None,
+    *,
+    position: str = "in_position",
+    normal: Optional[str] = "in_normal",
+) -> StaticBatch:
+    """
+    Merge geometries with the same buffer layout and mode into a single
+    geometry drawn with one call. This is meant for static objects and
+    is done once at load time, since the vertex data is read back from
+    the GPU.
+
+    Each geometry can be given a transform, such as a
+    :py:class:`~arcade.math.Mat4`, which is applied to its vertex
+    positions. Normals are transformed by the inverse transpose of the
+    transform's upper 3x3 and normalized. Both must be float attributes.
+
+    Strips, fans and loops are joined with primitive restarts.
+
+    :param geometries: The geometries to merge
+    :param transforms: One column-major 4x4 matrix per geometry
+    :param str position: The name of the position attribute
+    :param str normal: The name of the normal attribute, if any
+    :returns: A :py:class:`StaticBatch` with the merged geometry
+    """
+    if not geometries:
+        raise ValueError("At least one geometry is needed")
+    if transforms is not None and len(transforms) != len(geometries):
+        raise ValueError("One transform is needed per geometry")
+
+    base = geometries[0]
+    ctx = base._ctx
+    layout = [_layout_key(descr) for descr in base._content]
+    for geometry in geometries:
+        if [_layout_key(descr) for descr in geometry._content] != layout:
+            raise ValueError("All geometries must have the same buffer layout")
+        if geometry._mode != base._mode:
+            raise ValueError("All geometries must have the same mode")
+        if any(descr.instanced for descr in geometry._content):
+            raise ValueError("Instanced buffers can not be merged")
+
+    # Separate primitives can be concatenated, everything else is
+    # indexed so objects can be split with primitive restarts
+    joined = base._mode not in (constants.POINTS, constants.LINES, constants.TRIANGLES)
+    indexed = joined or any(g._index_buffer is not None for g in geometries)
+
+    datas = [bytearray() for _ in base._content]
+    indices: List[int] = []
+    ranges: List[Tuple[int, int]] = []
+    vertex_count = 0
+
+    for number, geometry in enumerate(geometries):
+        vertices = _vertex_count(geometry)
+        for data, descr in zip(datas, geometry._content):
+            start = len(data)
+            data += _read(descr.buffer, vertices * descr.stride)
+            if transforms is not None:
+                _transform(
+                    data, start, descr, vertices, transforms[number], position, normal
+                )
+
+        if indexed:
+            if geometry._index_buffer is not None:
+                local = _read_indices(geometry)
+            else:
+                local = range(vertices)
+            if joined and indices:
+                indices.append(PRIMITIVE_RESTART)
+            ranges.append((len(indices), len(local)))
+            indices.extend(
+                index + vertex_count if index >= 0 else PRIMITIVE_RESTART
+                for index in local
+            )
+        else:
+            ranges.append((vertex_count, vertices))
+        vertex_count += vertices
+
+    content = []
+    for data, descr in zip(datas, base._content):
+        merged = copy.copy(descr)
+        merged.buffer = ctx.buffer(data=data)
+        merged.num_vertices = vertex_count
+        content.append(merged)
+
+    geometry = ctx.geometry(
+        content,
+        index_buffer=ctx.index_buffer(indices) if indexed else None,
+        mode=base._mode,
     )
+    return StaticBatch(geometry, ranges, gap=1 if joined else 0)
 
-    uv = array(
-        "f",
-        [
-            1,
-            0,
-            1,
-            1,
-            0,
-            0,
-            1,
-            1,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            1,
-            1,
-            0,
-            0,
-            1,
-            1,
-            0,
-            1,
-            0,
-            0,
-            1,
-            1,
-            0,
-            1,
-            0,
-            0,
-            1,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            1,
-            0,
-            1,
-            1,
-            1,
-            0,
-            1,
-            1,
-            0,
-            1,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            1,
-            0,
-            1,
-            1,
-            0,
-            0,
-            1,
-            0,
-            0,
-            1,
-            0,
-        ],
+
+def _layout_key(descr: BufferDescription) -> tuple:
+    return (
+        descr.stride,
+        descr.instanced,
+        tuple(sorted(descr.normalized)),
+        tuple((f.name, f.gl_type, f.components, f.offset) for f in descr.formats),
     )
 
-    return ctx.geometry(
-        [
-            BufferDescription(ctx.buffer(data=pos), "3f", ["in_position"]),
-            BufferDescription(ctx.buffer(data=normal), "3f", ["in_normal"]),
-            BufferDescription(ctx.buffer(data=uv), "2f", ["in_uv"]),
-        ]
+
+def _vertex_count(geometry: Geometry) -> int:
+    return min(descr.num_vertices for descr in geometry._content)
+
+
+def _read(buffer: Buffer, size: int) -> bytearray:
+    ctx = buffer._ctx
+    data = bytearray(size)
+    ctx.bind_buffer(constants.COPY_READ_BUFFER, buffer.glo)
+    get_buffer_sub_data(ctx.gl, constants.COPY_READ_BUFFER, 0, data)
+    return data
+
+
+def _read_indices(geometry: Geometry) -> List[int]:
+    """Read the indices of a geometry with restarts as negative values"""
+    size = geometry._index_element_size
+    data = _read(geometry._index_buffer, geometry._index_buffer.size)
+    restart = (1 << (size * 8)) - 1
+    return [
+        PRIMITIVE_RESTART if index == restart else index
+        for index in memoryview(data).cast({1: "B", 2: "H", 4: "I"}[size])
+    ]
+
+
+def _transform(
+    data: bytearray,
+    start: int,
+    descr: BufferDescription,
+    vertices: int,
+    matrix: Sequence[float],
+    position: str,
+    normal: Optional[str],
+) -> None:
+    """Transform the positions and normals of vertices in interleaved data"""
+    floats = memoryview(data)[start : start + vertices * descr.stride].cast("f")
+    values = array("f", floats)
+    step = descr.stride // 4
+
+    for attr in descr.formats:
+        if attr.name not in (position, normal):
+            continue
+        if attr.gl_type != constants.FLOAT:
+            raise ValueError(f"Attribute '{attr.name}' must be 32 bit floats")
+
+        offset = attr.offset // 4
+        columns = [values[offset + i :: step] for i in range(attr.components)]
+        while len(columns) < 3:
+            columns.append(array("f", bytes(4 * vertices)))
+        x, y, z = columns[:3]
+
+        if attr.name == position:
+            m = matrix
+            columns[0] = [
+                m[0] * a + m[4] * b + m[8] * c + m[12] for a, b, c in zip(x, y, z)
+            ]
+            columns[1] = [
+                m[1] * a + m[5] * b + m[9] * c + m[13] for a, b, c in zip(x, y, z)
+            ]
+            columns[2] = [
+                m[2] * a + m[6] * b + m[10] * c + m[14] for a, b, c in zip(x, y, z)
+            ]
+        else:
+            n = _normal_matrix(matrix)
+            nx = [n[0] * a + n[1] * b + n[2] * c for a, b, c in zip(x, y, z)]
+            ny = [n[3] * a + n[4] * b + n[5] * c for a, b, c in zip(x, y, z)]
+            nz = [n[6] * a + n[7] * b + n[8] * c for a, b, c in zip(x, y, z)]
+            lengths = [
+                math.sqrt(a * a + b * b + c * c) or 1.0 for a, b, c in zip(nx, ny, nz)
+            ]
+            columns[0] = [a / length for a, length in zip(nx, lengths)]
+            columns[1] = [b / length for b, length in zip(ny, lengths)]
+            columns[2] = [c / length for c, length in zip(nz, lengths)]
+
+        for i in range(min(attr.components, 3)):
+            values[offset + i :: step] = array("f", columns[i])
+
+    floats[:] = values
+
+
+def _normal_matrix(m: Sequence[float]) -> Tuple[float, ...]:
+    """
+    The rows of the inverse transpose of the upper 3x3 of a column-major 4x4
+    matrix, up to a scale. The cofactor matrix is used since the normals
+    are normalized afterwards anyway.
+    """
+    a, b, c = m[0], m[4], m[8]
+    d, e, f = m[1], m[5], m[9]
+    g, h, i = m[2], m[6], m[10]
+    return (
+        e * i - f * h,
+        f * g - d * i,
+        d * h - e * g,
+        c * h - b * i,
+        a * i - c * g,
+        b * g - a * h,
+        b * f - c * e,
+        c * d - a * f,
+        a * e - b * d,
     )
@@ -0,0 +1,534 @@
+"""
+Helpers for handing Python buffer data to WebGL.
+
+Python objects passed as arguments to a JavaScript function are proxied
+for the duration of the call. This lets the JavaScript side take a typed
+array view directly over the Python buffer's memory with ``getBuffer``,
+so data reaches WebGL without first being copied into a new ArrayBuffer.
+"""
+from array import array
+from typing import Optional
+
+from pyodide.code import run_js
+
+from arcade.arcade_types import BufferProtocol
+from arcade.gl import constants
+
+_helpers = run_js(
+    """
+(() => {
+    // Reusable staging arrays keyed by their power of two size class
+    const pool = new Map();
+
+    function staged(src) {
+        let size = 256;
+        while (size < src.byteLength) {
+            size *= 2;
+        }
+        let staging = pool.get(size);
+        if (staging === undefined) {
+            staging = new Uint8Array(size);
+            pool.set(size, staging);
+        }
+        staging.set(src);
+        return staging.subarray(0, src.byteLength);
+    }
+
+    function withView(data, stage, callback) {
+        const pybuf = data.getBuffer("u8");
+        try {
+            callback(stage ? staged(pybuf.data) : pybuf.data);
+        } finally {
+            pybuf.release();
+        }
+    }
+
+    function withInts(data, callback) {
+        const pybuf = data.getBuffer("i32");
+        try {
+            return callback(pybuf.data);
+        } finally {
+            pybuf.release();
+        }
+    }
+
+    return {
+        multiDrawArrays(ext, mode, firstsData, countsData, instancesData) {
+            withInts(firstsData, (firsts) => withInts(countsData, (counts) => {
+                if (instancesData == null) {
+                    ext.multiDrawArraysWEBGL(mode, firsts, 0, counts, 0, firsts.length);
+                    return;
+                }
+                withInts(instancesData, (instances) => ext.multiDrawArraysInstancedWEBGL(
+                    mode, firsts, 0, counts, 0, instances, 0, firsts.length
+                ));
+            }));
+        },
+        multiDrawElements(ext, mode, countsData, type, firstsData, size, instancesData) {
+            withInts(firstsData, (firsts) => withInts(countsData, (counts) => {
+                const offsets = firsts.map((first) => first * size);
+                if (instancesData == null) {
+                    ext.multiDrawElementsWEBGL(mode, counts, 0, type, offsets, 0, counts.length);
+                    return;
+                }
+                withInts(instancesData, (instances) => ext.multiDrawElementsInstancedWEBGL(
+                    mode, counts, 0, type, offsets, 0, instances, 0, counts.length
+                ));
+            }));
+        },
+        uniformArray(gl, setter, location, data, isFloat, isMatrix) {
+            const pybuf = data.getBuffer(isFloat ? "f32" : "i32");
+            try {
+                if (isMatrix) {
+                    setter.call(gl, location, false, pybuf.data);
+                } else {
+                    setter.call(gl, location, pybuf.data);
+                }
+            } finally {
+                pybuf.release();
+            }
+        },
+        texImage2D(gl, target, level, internalFormat, width, height, format, type, view, data) {
+            if (data == null) {
+                gl.texImage2D(target, level, internalFormat, width, height, 0, format, type, null);
+                return;
+            }
+            const pybuf = data.getBuffer(view);
+            try {
+                gl.texImage2D(
+                    target, level, internalFormat, width, height, 0, format, type, pybuf.data
+                );
+            } finally {
+                pybuf.release();
+            }
+        },
+        texSubImage2D(gl, target, level, x, y, width, height, format, type, view, data) {
+            const pybuf = data.getBuffer(view);
+            try {
+                gl.texSubImage2D(target, level, x, y, width, height, format, type, pybuf.data);
+            } finally {
+                pybuf.release();
+            }
+        },
+        texImage3D(gl, target, level, internalFormat, width, height, depth, format, type, view, data) {
+            if (data == null) {
+                gl.texImage3D(
+                    target, level, internalFormat, width, height, depth, 0, format, type, null
+                );
+                return;
+            }
+            const pybuf = data.getBuffer(view);
+            try {
+                gl.texImage3D(
+                    target, level, internalFormat, width, height, depth, 0, format, type,
+                    pybuf.data
+                );
+            } finally {
+                pybuf.release();
+            }
+        },
+        texSubImage3D(gl, target, level, x, y, z, width, height, depth, format, type, view, data) {
+            const pybuf = data.getBuffer(view);
+            try {
+                gl.texSubImage3D(
+                    target, level, x, y, z, width, height, depth, format, type, pybuf.data
+                );
+            } finally {
+                pybuf.release();
+            }
+        },
+        compressedTexSubImage2D(gl, target, level, x, y, width, height, format, data) {
+            const pybuf = data.getBuffer("u8");
+            try {
+                gl.compressedTexSubImage2D(
+                    target, level, x, y, width, height, format, pybuf.data
+                );
+            } finally {
+                pybuf.release();
+            }
+        },
+        readPixels(gl, x, y, width, height, format, type, view, data) {
+            const pybuf = data.getBuffer(view);
+            try {
+                gl.readPixels(x, y, width, height, format, type, pybuf.data);
+            } finally {
+                pybuf.release();
+            }
+        },
+        bufferData(gl, target, data, usage, stage) {
+            withView(data, stage, (view) => gl.bufferData(target, view, usage));
+        },
+        bufferSubData(gl, target, offset, data, stage) {
+            withView(data, stage, (view) => gl.bufferSubData(target, offset, view));
+        },
+        getBufferSubData(gl, target, offset, data) {
+            withView(data, false, (view) => gl.getBufferSubData(target, offset, view));
+        },
+        poolSize() {
+            let total = 0;
+            for (const size of pool.keys()) {
+                total += size;
+            }
+            return total;
+        },
+        clearPool() {
+            pool.clear();
+        },
+    };
+})()
+"""
+)
+
+
+# The typed array WebGL expects for each pixel data type
+_pixel_views = {
+    constants.UNSIGNED_BYTE: "u8",
+    constants.BYTE: "i8",
+    constants.UNSIGNED_SHORT: "u16",
+    constants.SHORT: "i16",
+    constants.HALF_FLOAT: "u16",
+    constants.UNSIGNED_INT: "u32",
+    constants.INT: "i32",
+    constants.FLOAT: "f32",
+}
+
+
+def as_bytes(data: BufferProtocol) -> memoryview:
+    """
+    Get a flat byte view of a buffer. No copy is made unless the
+    buffer is not contiguous.
+
+    :param data: Any object supporting the buffer protocol
+    """
+    view = memoryview(data)
+    if not view.c_contiguous:
+        view = memoryview(view.tobytes())
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return view
+
+
+def as_int32(values) -> memoryview:
+    """
+    Get a view of integers as 32 bit signed integers. ``array("i")`` and
+    matching memoryviews are used as they are, anything else is copied.
+
+    :param values: An array, memoryview or sequence of integers
+    """
+    if isinstance(values, (array, memoryview)):
+        view = memoryview(values)
+        if view.format == "i" and view.ndim == 1 and view.c_contiguous:
+            return view
+    return memoryview(array("i", values))
+
+
+def as_float32(values) -> memoryview:
+    """
+    Get a view of numbers as 32 bit floats. ``array("f")`` and matching
+    memoryviews are used as they are, anything else is copied.
+
+    :param values: An array, memoryview or sequence of numbers
+    """
+    if isinstance(values, (array, memoryview)):
+        view = memoryview(values)
+        if view.format == "f" and view.ndim == 1 and view.c_contiguous:
+            return view
+    return memoryview(array("f", values))
+
+
+def buffer_data(
+    gl, target: int, data: BufferProtocol, usage: int, staged: bool = False
+) -> None:
+    """
+    Allocate and fill the buffer bound to ``target`` with ``data``.
+
+    :param gl: The WebGL context
+    :param int target: The buffer binding target
+    :param data: Any object supporting the buffer protocol
+    :param int usage: The WebGL usage hint
+    :param bool staged: Copy through a pooled staging array instead of
+                        viewing the Python memory directly
+    """
+    _helpers.bufferData(gl, target, as_bytes(data), usage, staged)
+
+
+def buffer_sub_data(
+    gl, target: int, offset: int, data: BufferProtocol, staged: bool = False
+) -> None:
+    """
+    Write ``data`` into the buffer bound to ``target`` at a byte offset.
+    Pass a ``memoryview`` slice to upload a sub-range of a larger buffer.
+
+    :param gl: The WebGL context
+    :param int target: The buffer binding target
+    :param int offset: Byte offset in the WebGL buffer
+    :param data: Any object supporting the buffer protocol
+    :param bool staged: Copy through a pooled staging array instead of
+                        viewing the Python memory directly
+    """
+    _helpers.bufferSubData(gl, target, offset, as_bytes(data), staged)
+
+
+def get_buffer_sub_data(gl, target: int, offset: int, data: BufferProtocol) -> None:
+    """
+    Read from the buffer bound to ``target`` straight into writable Python
+    memory, such as a ``bytearray``. This waits for the GPU to finish
+    writing the buffer.
+
+    :param gl: The WebGL context
+    :param int target: The buffer binding target
+    :param int offset: Byte offset in the WebGL buffer
+    :param data: A writable object supporting the buffer protocol
+    """
+    _helpers.getBufferSubData(gl, target, offset, as_bytes(data))
+
+
+def uniform_array(
+    gl, setter, location, data: memoryview, is_float: bool, is_matrix: bool
+) -> None:
+    """
+    Upload an array uniform from a view of 32 bit values. The data is
+    passed to WebGL as a typed array view without copying.
+
+    :param gl: The WebGL context
+    :param setter: The WebGL uniform function, such as ``gl.uniform4fv``
+    :param location: The uniform location
+    :param memoryview data: A view from :py:func:`as_float32` or :py:func:`as_int32`
+    :param bool is_float: The data holds floats rather than integers
+    :param bool is_matrix: The setter takes a transpose argument
+    """
+    _helpers.uniformArray(gl, setter, location, data, is_float, is_matrix)
+
+
+def tex_image_2d(
+    gl,
+    target: int,
+    level: int,
+    internal_format: int,
+    width: int,
+    height: int,
+    format: int,
+    type: int,
+    data: Optional[BufferProtocol],
+) -> None:
+    """
+    Allocate a level of the texture bound to ``target``, filling it with
+    ``data`` viewed as the typed array matching ``type``.
+
+    :param gl: The WebGL context
+    :param data: Any object supporting the buffer protocol, or None to
+                 leave the contents undefined
+    """
+    if data is not None:
+        data = as_bytes(data)
+    _helpers.texImage2D(
+        gl,
+        target,
+        level,
+        internal_format,
+        width,
+        height,
+        format,
+        type,
+        _pixel_views[type],
+        data,
+    )
+
+
+def tex_sub_image_2d(
+    gl,
+    target: int,
+    level: int,
+    x: int,
+    y: int,
+    width: int,
+    height: int,
+    format: int,
+    type: int,
+    data: BufferProtocol,
+) -> None:
+    """
+    Write pixels into a rectangle of the texture bound to ``target``. The
+    Python memory is viewed directly as the typed array matching ``type``.
+
+    :param gl: The WebGL context
+    :param data: Any object supporting the buffer protocol
+    """
+    _helpers.texSubImage2D(
+        gl,
+        target,
+        level,
+        x,
+        y,
+        width,
+        height,
+        format,
+        type,
+        _pixel_views[type],
+        as_bytes(data),
+    )
+
+
+def tex_image_3d(
+    gl,
+    target: int,
+    level: int,
+    internal_format: int,
+    width: int,
+    height: int,
+    depth: int,
+    format: int,
+    type: int,
+    data: Optional[BufferProtocol],
+) -> None:
+    """
+    Allocate a level of the array or 3D texture bound to ``target``. See
+    :py:func:`tex_image_2d`.
+
+    :param gl: The WebGL context
+    :param data: Any object supporting the buffer protocol, or None to
+                 leave the contents undefined
+    """
+    if data is not None:
+        data = as_bytes(data)
+    _helpers.texImage3D(
+        gl,
+        target,
+        level,
+        internal_format,
+        width,
+        height,
+        depth,
+        format,
+        type,
+        _pixel_views[type],
+        data,
+    )
+
+
+def tex_sub_image_3d(
+    gl,
+    target: int,
+    level: int,
+    x: int,
+    y: int,
+    z: int,
+    width: int,
+    height: int,
+    depth: int,
+    format: int,
+    type: int,
+    data: BufferProtocol,
+) -> None:
+    """
+    Write pixels into a box of the array or 3D texture bound to ``target``.
+    See :py:func:`tex_sub_image_2d`.
+
+    :param gl: The WebGL context
+    :param data: Any object supporting the buffer protocol
+    """
+    _helpers.texSubImage3D(
+        gl,
+        target,
+        level,
+        x,
+        y,
+        z,
+        width,
+        height,
+        depth,
+        format,
+        type,
+        _pixel_views[type],
+        as_bytes(data),
+    )
+
+
+def compressed_tex_sub_image_2d(
+    gl,
+    target: int,
+    level: int,
+    x: int,
+    y: int,
+    width: int,
+    height: int,
+    format: int,
+    data: BufferProtocol,
+) -> None:
+    """
+    Write compressed blocks into a rectangle of the texture bound to
+    ``target``. The Python memory is viewed directly as a ``Uint8Array``.
+
+    :param gl: The WebGL context
+    :param int format: The compressed internal format of the texture
+    :param data: Any object supporting the buffer protocol
+    """
+    _helpers.compressedTexSubImage2D(
+        gl, target, level, x, y, width, height, format, as_bytes(data)
+    )
+
+
+def read_pixels(
+    gl,
+    x: int,
+    y: int,
+    width: int,
+    height: int,
+    format: int,
+    type: int,
+    data: BufferProtocol,
+) -> None:
+    """
+    Read pixels from the bound read framebuffer straight into writable
+    Python memory.
+
+    :param gl: The WebGL context
+    :param data: A writable object supporting the buffer protocol
+    """
+    _helpers.readPixels(
+        gl, x, y, width, height, format, type, _pixel_views[type], as_bytes(data)
+    )
+
+
+def multi_draw_arrays(ext, mode: int, firsts, counts, instances=None) -> None:
+    """
+    Issue many draws with a single call using the ``WEBGL_multi_draw``
+    extension. The inputs are viewed directly, see :py:func:`as_int32`.
+
+    :param ext: The ``WEBGL_multi_draw`` extension object
+    :param int mode: The primitive mode
+    :param firsts: The first vertex of each draw
+    :param counts: The number of vertices in each draw
+    :param instances: The number of instances of each draw, if instanced
+    """
+    _helpers.multiDrawArrays(ext, mode, firsts, counts, instances)
+
+
+def multi_draw_elements(
+    ext, mode: int, counts, index_type: int, firsts, element_size: int, instances=None
+) -> None:
+    """
+    Issue many indexed draws with a single call using the ``WEBGL_multi_draw``
+    extension. The inputs are viewed directly, see :py:func:`as_int32`.
+
+    :param ext: The ``WEBGL_multi_draw`` extension object
+    :param int mode: The primitive mode
+    :param counts: The number of indices in each draw
+    :param int index_type: The type of the indices
+    :param firsts: The first index of each draw
+    :param int element_size: Byte size of one index
+    :param instances: The number of instances of each draw, if instanced
+    """
+    _helpers.multiDrawElements(
+        ext, mode, counts, index_type, firsts, element_size, instances
+    )
+
+
+def staging_pool_size() -> int:
+    """Total bytes currently held by the staging pool"""
+    return _helpers.poolSize()
+
+
+def clear_staging_pool() -> None:
+    """Release all pooled staging arrays"""
+    _helpers.clearPool()
@@ -0,0 +1,240 @@
+"""
+Reading KTX2 texture containers.
+
+The parser only uses the standard library and does not need a WebGL context,
+so files can be inspected and a format chosen before anything is uploaded.
+"""
+import struct
+import zlib
+from pathlib import Path
+from typing import Collection, Dict, Iterable, List, Optional, Tuple, Union
+
+from arcade.arcade_types import BufferProtocol
+from arcade.gl import constants
+
+from .types import compressed_texture_extensions
+
+IDENTIFIER = b"\xabKTX 20\xbb\r\n\x1a\n"
+
+SUPERCOMPRESSION_NONE = 0
+SUPERCOMPRESSION_BASIS_LZ = 1
+SUPERCOMPRESSION_ZSTANDARD = 2
+SUPERCOMPRESSION_ZLIB = 3
+
+# The header following the identifier and one entry of the level index
+_HEADER = struct.Struct("<13I2Q")
+_LEVEL = struct.Struct("<3Q")
+_LEVEL_INDEX_OFFSET = len(IDENTIFIER) + _HEADER.size
+
+# Uncompressed Vulkan formats as (components, dtype) for Context.texture
+_vk_pixel_formats = {
+    9: (1, "f1"),  # VK_FORMAT_R8_UNORM
+    16: (2, "f1"),  # VK_FORMAT_R8G8_UNORM
+    23: (3, "f1"),  # VK_FORMAT_R8G8B8_UNORM
+    37: (4, "f1"),  # VK_FORMAT_R8G8B8A8_UNORM
+    76: (1, "f2"),  # VK_FORMAT_R16_SFLOAT
+    83: (2, "f2"),  # VK_FORMAT_R16G16_SFLOAT
+    90: (3, "f2"),  # VK_FORMAT_R16G16B16_SFLOAT
+    97: (4, "f2"),  # VK_FORMAT_R16G16B16A16_SFLOAT
+    100: (1, "f4"),  # VK_FORMAT_R32_SFLOAT
+    103: (2, "f4"),  # VK_FORMAT_R32G32_SFLOAT
+    106: (3, "f4"),  # VK_FORMAT_R32G32B32_SFLOAT
+    109: (4, "f4"),  # VK_FORMAT_R32G32B32A32_SFLOAT
+}
+
+# Compressed Vulkan formats and the matching WebGL internal format
+_vk_compressed_formats = {
+    131: constants.COMPRESSED_RGB_S3TC_DXT1_EXT,
+    132: constants.COMPRESSED_SRGB_S3TC_DXT1_EXT,
+    133: constants.COMPRESSED_RGBA_S3TC_DXT1_EXT,
+    134: constants.COMPRESSED_SRGB_ALPHA_S3TC_DXT1_EXT,
+    135: constants.COMPRESSED_RGBA_S3TC_DXT3_EXT,
+    136: constants.COMPRESSED_SRGB_ALPHA_S3TC_DXT3_EXT,
+    137: constants.COMPRESSED_RGBA_S3TC_DXT5_EXT,
+    138: constants.COMPRESSED_SRGB_ALPHA_S3TC_DXT5_EXT,
+    139: constants.COMPRESSED_RED_RGTC1_EXT,
+    140: constants.COMPRESSED_SIGNED_RED_RGTC1_EXT,
+    141: constants.COMPRESSED_RED_GREEN_RGTC2_EXT,
+    142: constants.COMPRESSED_SIGNED_RED_GREEN_RGTC2_EXT,
+    143: constants.COMPRESSED_RGB_BPTC_UNSIGNED_FLOAT_EXT,
+    144: constants.COMPRESSED_RGB_BPTC_SIGNED_FLOAT_EXT,
+    145: constants.COMPRESSED_RGBA_BPTC_UNORM_EXT,
+    146: constants.COMPRESSED_SRGB_ALPHA_BPTC_UNORM_EXT,
+    147: constants.COMPRESSED_RGB8_ETC2,
+    148: constants.COMPRESSED_SRGB8_ETC2,
+    149: constants.COMPRESSED_RGB8_PUNCHTHROUGH_ALPHA1_ETC2,
+    150: constants.COMPRESSED_SRGB8_PUNCHTHROUGH_ALPHA1_ETC2,
+    151: constants.COMPRESSED_RGBA8_ETC2_EAC,
+    152: constants.COMPRESSED_SRGB8_ALPHA8_ETC2_EAC,
+    153: constants.COMPRESSED_R11_EAC,
+    154: constants.COMPRESSED_SIGNED_R11_EAC,
+    155: constants.COMPRESSED_RG11_EAC,
+    156: constants.COMPRESSED_SIGNED_RG11_EAC,
+}
+# The 14 ASTC block sizes are in the same order in Vulkan and WebGL
+for _i in range(14):
+    _vk_compressed_formats[157 + _i * 2] = constants.COMPRESSED_RGBA_ASTC_4x4_KHR + _i
+    _vk_compressed_formats[158 + _i * 2] = (
+        constants.COMPRESSED_SRGB8_ALPHA8_ASTC_4x4_KHR + _i
+    )
+
+# Compression families from most to least preferred. Formats from earlier
+# families give better quality for the same size. Uncompressed data is the
+# last resort.
+_preference = (
+    "WEBGL_compressed_texture_astc",
+    "EXT_texture_compression_bptc",
+    "WEBGL_compressed_texture_etc",
+    "WEBGL_compressed_texture_s3tc",
+    "WEBGL_compressed_texture_s3tc_srgb",
+    "EXT_texture_compression_rgtc",
+)
+_format_rank = {
+    fmt: rank
+    for rank, extension in enumerate(_preference)
+    for fmt in compressed_texture_extensions[extension]
+}
+
+
+class KTX2File:
+    """
+    The contents of a KTX2 texture container.
+
+    Uncompressed level data and data supercompressed with zlib is
+    supported. Basis Universal and Zstandard supercompression need a
+    transcoder and are rejected. Note that KTX2 images are usually stored
+    with the top row first while WebGL expects the bottom row first.
+
+    :param data: The contents of a ``.ktx2`` file
+    """
+
+    def __init__(self, data: BufferProtocol):
+        view = memoryview(data).cast("B")
+        if view[: len(IDENTIFIER)] != IDENTIFIER:
+            raise ValueError("Not a KTX2 file")
+        if len(view) < _LEVEL_INDEX_OFFSET:
+            raise ValueError("The KTX2 header is truncated")
+
+        (
+            self.vk_format,
+            self.type_size,
+            self.width,
+            self.height,
+            self.depth,
+            self.layers,
+            self.faces,
+            #: The stored level count. 0 asks for mipmaps to be generated
+            self.level_count,
+            self.supercompression,
+            _,
+            _,
+            kvd_offset,
+            kvd_length,
+            _,
+            _,
+        ) = _HEADER.unpack_from(view, len(IDENTIFIER))
+
+        if self.supercompression not in (SUPERCOMPRESSION_NONE, SUPERCOMPRESSION_ZLIB):
+            raise ValueError(
+                f"KTX2 supercompression scheme {self.supercompression} is not supported"
+            )
+
+        #: The data of each mipmap level, largest first
+        self.levels: List[memoryview] = [
+            self._read_level(view, i) for i in range(max(1, self.level_count))
+        ]
+        self.key_values: Dict[str, bytes] = self._read_key_values(
+            self._slice(view, kvd_offset, kvd_length)
+        )
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "KTX2File":
+        """
+        Read a KTX2 file.
+
+        :param path: The path of the file
+        """
+        with open(path, "rb") as fd:
+            return cls(fd.read())
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    @property
+    def internal_format(self) -> Optional[int]:
+        """The compressed WebGL format of the data, or None if uncompressed"""
+        return _vk_compressed_formats.get(self.vk_format)
+
+    @property
+    def pixel_format(self) -> Optional[Tuple[int, str]]:
+        """``(components, dtype)`` of uncompressed data, or None if compressed"""
+        return _vk_pixel_formats.get(self.vk_format)
+
+    def is_supported(self, compressed_formats: Collection[int]) -> bool:
+        """
+        Check if the data can be uploaded.
+
+        :param compressed_formats: The compressed formats available, such as
+                                   :py:attr:`Context.compressed_formats`
+        """
+        internal_format = self.internal_format
+        if internal_format is not None:
+            return internal_format in compressed_formats
+        return self.pixel_format is not None
+
+    def _rank(self) -> int:
+        return _format_rank.get(self.internal_format, len(_preference))
+
+    def _read_level(self, view: memoryview, level: int) -> memoryview:
+        offset, length, uncompressed_length = _LEVEL.unpack_from(
+            view, _LEVEL_INDEX_OFFSET + level * _LEVEL.size
+        )
+        data = self._slice(view, offset, length)
+        if self.supercompression == SUPERCOMPRESSION_ZLIB:
+            data = memoryview(zlib.decompress(data))
+            if len(data) != uncompressed_length:
+                raise ValueError(f"Level {level} has the wrong uncompressed size")
+        return data
+
+    @staticmethod
+    def _slice(view: memoryview, offset: int, length: int) -> memoryview:
+        if offset + length > len(view):
+            raise ValueError("The KTX2 file is truncated")
+        return view[offset : offset + length]
+
+    @staticmethod
+    def _read_key_values(view: memoryview) -> Dict[str, bytes]:
+        key_values = {}
+        offset = 0
+        while offset + 4 <= len(view):
+            (length,) = struct.unpack_from("<I", view, offset)
+            entry = bytes(view[offset + 4 : offset + 4 + length])
+            key, _, value = entry.partition(b"\0")
+            key_values[key.decode("utf-8")] = value
+            # Entries are padded to 4 bytes
+            offset += 4 + (length + 3) // 4 * 4
+        return key_values
+
+
+def select_ktx2(
+    candidates: Iterable[KTX2File], compressed_formats: Collection[int]
+) -> KTX2File:
+    """
+    Pick the best file from versions of the same texture encoded in
+    different formats. ASTC is preferred, then BPTC, ETC2, S3TC and RGTC.
+    Uncompressed files are the fallback when no compressed format is
+    supported.
+
+    :param candidates: The files to choose from
+    :param compressed_formats: The compressed formats available, such as
+                               :py:attr:`Context.compressed_formats`
+    """
+    best = None
+    for candidate in candidates:
+        if candidate.is_supported(compressed_formats):
+            if best is None or candidate._rank() < best._rank():
+                best = candidate
+    if best is None:
+        raise ValueError("None of the KTX2 files use a supported format")
+    return best
@@ -0,0 +1,181 @@
+from array import array
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple, Union
+
+from arcade.gl import constants
+
+from .buffer import Buffer
+
+if TYPE_CHECKING:
+    from arcade.gl import Context
+
+
+class MirroredBuffer:
+    """
+    A buffer with a copy of its contents kept in a Python ``array``.
+
+    Elements are changed through the buffer like a list, for example
+    ``mirror[i] = 1.0`` or ``mirror[4:8] = values``. Every write records
+    the dirty byte range. :py:meth:`flush` sorts the ranges, merges ranges
+    that are at most ``gap`` bytes apart and uploads each merged range
+    with one ``bufferSubData`` call. Uploading the few clean bytes between
+    two close ranges is cheaper than a second call.
+
+    When :py:attr:`array` is modified directly, call :py:meth:`mark_dirty`
+    with the changed elements.
+
+    Upload stats are counted per frame and reset by
+    :py:meth:`Context.new_frame`. The values from the previous frame are
+    kept in ``last_bytes_uploaded`` and ``last_upload_calls``.
+
+    :param Context ctx: The context this buffer belongs to
+    :param data: The initial elements
+    :param int size: Number of zeroed elements when no data is given
+    :param str typecode: The ``array`` typecode of the elements
+    :param int gap: Merge dirty ranges separated by at most this many bytes
+    :param int buffer_type: The buffer binding target
+    :param str usage: The usage hint
+    """
+
+    def __init__(
+        self,
+        ctx: "Context",
+        data: Optional[Iterable] = None,
+        *,
+        size: int = 0,
+        typecode: str = "f",
+        gap: int = 256,
+        buffer_type: int = constants.ARRAY_BUFFER,
+        usage: str = "dynamic",
+    ):
+        if data is not None and size > 0:
+            raise ValueError("data and size can not be combined")
+        if size < 0:
+            raise ValueError("size can not be negative")
+        if gap < 0:
+            raise ValueError("gap can not be negative")
+
+        if data is None:
+            self._array = array(typecode, bytes(array(typecode).itemsize * size))
+        else:
+            self._array = array(typecode, data)
+        self._itemsize = self._array.itemsize
+        self._gap = gap
+        self._buffer = Buffer(ctx, self._array, buffer_type=buffer_type, usage=usage)
+        self._dirty: List[Tuple[int, int]] = []
+
+        self.bytes_uploaded = 0
+        self.upload_calls = 0
+        self.last_bytes_uploaded = 0
+        self.last_upload_calls = 0
+
+    @property
+    def buffer(self) -> Buffer:
+        """The buffer holding the uploaded data"""
+        return self._buffer
+
+    @property
+    def array(self) -> array:
+        """
+        The Python side copy of the data. Changes made to it directly must
+        be reported with :py:meth:`mark_dirty`.
+        """
+        return self._array
+
+    @property
+    def gap(self) -> int:
+        """Dirty ranges separated by at most this many bytes are merged"""
+        return self._gap
+
+    @gap.setter
+    def gap(self, value: int):
+        if value < 0:
+            raise ValueError("gap can not be negative")
+        self._gap = value
+
+    @property
+    def dirty(self) -> bool:
+        """True when there are changes not yet uploaded"""
+        return bool(self._dirty)
+
+    def __len__(self) -> int:
+        return len(self._array)
+
+    def __getitem__(self, index: Union[int, slice]):
+        return self._array[index]
+
+    def __setitem__(self, index: Union[int, slice], value) -> None:
+        if isinstance(index, slice):
+            values = array(self._array.typecode, value)
+            indices = range(*index.indices(len(self._array)))
+            # The GPU buffer has a fixed size, so the mirror can not resize
+            if len(values) != len(indices):
+                raise ValueError(
+                    f"Can not assign {len(values)} values to a slice "
+                    f"of {len(indices)} elements"
+                )
+            self._array[index] = values
+            size = self._itemsize
+            if not indices:
+                return
+            if indices.step == 1:
+                self._dirty.append((indices.start * size, indices.stop * size))
+            else:
+                # Extended slices are recorded per element and merged on flush
+                self._dirty.extend((i * size, (i + 1) * size) for i in indices)
+        else:
+            self._array[index] = value
+            if index < 0:
+                index += len(self._array)
+            self._dirty.append((index * self._itemsize, (index + 1) * self._itemsize))
+
+    def mark_dirty(self, start: int = 0, stop: Optional[int] = None) -> None:
+        """
+        Mark a range of elements as changed.
+
+        :param int start: The first changed element
+        :param int stop: One past the last changed element. Defaults to the end
+        """
+        if stop is None:
+            stop = len(self._array)
+        start, stop, _ = slice(start, stop).indices(len(self._array))
+        if start < stop:
+            self._dirty.append((start * self._itemsize, stop * self._itemsize))
+
+    def dirty_ranges(self) -> List[Tuple[int, int]]:
+        """
+        The merged ``(start, stop)`` byte ranges the next :py:meth:`flush`
+        will upload.
+        """
+        ranges = sorted(self._dirty)
+        if not ranges:
+            return ranges
+
+        gap = self._gap
+        merged = [ranges[0]]
+        for start, stop in ranges[1:]:
+            last_start, last_stop = merged[-1]
+            if start - last_stop <= gap:
+                if stop > last_stop:
+                    merged[-1] = last_start, stop
+            else:
+                merged.append((start, stop))
+        return merged
+
+    def flush(self) -> None:
+        """Upload all changed ranges"""
+        if not self._dirty:
+            return
+
+        data = memoryview(self._array).cast("B")
+        for start, stop in self.dirty_ranges():
+            self._buffer.write(data[start:stop], start)
+            self.bytes_uploaded += stop - start
+            self.upload_calls += 1
+        self._dirty.clear()
+
+    def new_frame(self) -> None:
+        """Reset the upload stats. Called by :py:meth:`Context.new_frame`"""
+        self.last_bytes_uploaded = self.bytes_uploaded
+        self.last_upload_calls = self.upload_calls
+        self.bytes_uploaded = 0
+        self.upload_calls = 0
@@ -1,21 +1,87 @@
-from typing import TYPE_CHECKING, Dict, Iterable
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from arcade.gl import constants
 
 from .types import AttribFormat, GLTypes
-from .uniform import Uniform
+from .uniform import Uniform, UniformBlock, UniformBlockMember
 
 if TYPE_CHECKING:
     from arcade.gl import Context
 
 
+# Used when a transform feedback program has no fragment shader
+_EMPTY_FRAGMENT_SHADER = """#version 300 es
+precision mediump float;
+void main() {}
+"""
+
+
 class Program:
-    def __init__(self, ctx: "Context", *, vertex_shader: str, fragment_shader: str):
+
+    _capture_modes = {
+        "interleaved": constants.INTERLEAVED_ATTRIBS,
+        "separate": constants.SEPARATE_ATTRIBS,
+    }
+
+    def __init__(
+        self,
+        ctx: "Context",
+        *,
+        vertex_shader: str,
+        fragment_shader: Optional[str] = None,
+        defer_uniforms: bool = False,
+        varyings: Optional[Sequence[str]] = None,
+        varyings_capture_mode: str = "interleaved",
+    ):
+        try:
+            capture_mode = Program._capture_modes[varyings_capture_mode]
+        except KeyError:
+            raise ValueError(
+                f"Invalid varyings_capture_mode '{varyings_capture_mode}'. "
+                f"Valid modes are: {', '.join(Program._capture_modes)}"
+            )
+        self._varyings: Tuple[str, ...] = tuple(varyings or ())
+        self._varyings_capture_mode = varyings_capture_mode
+        # Bytes written per vertex for each varying
+        self._varying_sizes: List[int] = []
+
+        if fragment_shader is None:
+            if not self._varyings:
+                raise ValueError(
+                    "A fragment shader is required unless varyings are given"
+                )
+            fragment_shader = _EMPTY_FRAGMENT_SHADER
+
+        if (
+            varyings_capture_mode == "separate"
+            and len(self._varyings) > ctx.limits.MAX_TRANSFORM_FEEDBACK_SEPARATE_ATTRIBS
+        ):
+            raise ValueError(
+                f"At most {ctx.limits.MAX_TRANSFORM_FEEDBACK_SEPARATE_ATTRIBS} "
+                "varyings can be captured in separate mode"
+            )
+
         self._ctx = ctx
-        self._glo = self._ctx.gl.createProgram()
+        self._glo = self._ctx.dispatch.createProgram()
         self._geometry_info = (0, 0, 0)
         self._attributes = []
-        self._uniforms: Dict[str, Uniform] = {}
+        self.attribute_key = "INVALID"
+        self._uniforms: Dict[str, Union[Uniform, UniformBlock]] = {}
+        self._uniform_blocks: Dict[str, UniformBlock] = {}
+        self._defer_uniforms = defer_uniforms
+        self._pending_uniforms: Dict[Uniform, Any] = {}
+        self._version = 0
 
         raw_shaders = [
             (vertex_shader, constants.VERTEX_SHADER),
@@ -24,18 +90,28 @@ class Program:
 
         shaders = []
         for raw_shader, shader_type in raw_shaders:
-            shader = Program.compile_shader(self._ctx.gl, raw_shader, shader_type)
-            self._ctx.gl.attachShader(self._glo, shader)
+            shader = Program.compile_shader(self._ctx.dispatch, raw_shader, shader_type)
+            self._ctx.dispatch.attachShader(self._glo, shader)
             shaders.append(shader)
 
-        Program.link(self._ctx.gl, self._glo)
+        # Varyings must be specified before linking
+        if self._varyings:
+            self._ctx.dispatch.transformFeedbackVaryings(
+                self._glo, list(self._varyings), capture_mode
+            )
+
+        Program.link(self._ctx.dispatch, self._glo)
 
         for shader in shaders:
-            self._ctx.gl.detachShader(self._glo, shader)
-            self._ctx.gl.deleteShader(shader)
+            self._ctx.dispatch.detachShader(self._glo, shader)
+            self._ctx.dispatch.deleteShader(shader)
 
         self._introspect_attributes()
         self._introspect_uniforms()
+        self._introspect_uniform_blocks()
+        if self._varyings:
+            self._introspect_varyings()
+        self._ctx._program_linked(self)
 
     @property
     def glo(self):
@@ -45,25 +121,113 @@ class Program:
     def attributes(self) -> Iterable[AttribFormat]:
         return self._attributes
 
+    @property
+    def varyings(self) -> Tuple[str, ...]:
+        """The vertex shader outputs captured with transform feedback"""
+        return self._varyings
+
+    @property
+    def varyings_capture_mode(self) -> str:
+        """
+        How varyings are written by transform feedback.
+        ``"interleaved"`` or ``"separate"``.
+        """
+        return self._varyings_capture_mode
+
+    @property
+    def varying_sizes(self) -> List[int]:
+        """Bytes written per vertex by each varying"""
+        return self._varying_sizes
+
+    @property
+    def uniform_blocks(self) -> Dict[str, UniformBlock]:
+        """
+        The active uniform blocks by name. A block's binding point can also
+        be set with ``program["BlockName"] = binding``.
+        """
+        return self._uniform_blocks
+
+    @property
+    def defer_uniforms(self) -> bool:
+        """
+        When enabled, uniform assignments are staged and only uploaded
+        when the program is used for drawing. Only the last value
+        assigned to each uniform is uploaded.
+        """
+        return self._defer_uniforms
+
+    @defer_uniforms.setter
+    def defer_uniforms(self, value: bool):
+        if not value:
+            self.flush_uniforms()
+        self._defer_uniforms = value
+
     def __setitem__(self, key, value):
         try:
             uniform = self._uniforms[key]
         except KeyError:
             raise KeyError(f"Uniform with the name `{key}` was not found.")
 
-        uniform.setter(value)
+        if self._ctx._bundle is not None:
+            self._ctx._bundle.track(self)
+        if self._defer_uniforms:
+            self._pending_uniforms[uniform] = value
+        else:
+            uniform.setter(value)
+
+    def set_uniforms(self, values: Mapping[str, Any]) -> None:
+        """
+        Set several uniforms at once. The program is bound once and every
+        value is applied, or staged when uniforms are deferred::
+
+            program.set_uniforms({"time": t, "lights": light_data})
+
+        :param values: Uniform names mapped to their values
+        """
+        uniforms = self._uniforms
+        try:
+            resolved = [(uniforms[name], value) for name, value in values.items()]
+        except KeyError as e:
+            raise KeyError(f"Uniform with the name `{e.args[0]}` was not found.")
+
+        if self._ctx._bundle is not None:
+            self._ctx._bundle.track(self)
+        if self._defer_uniforms:
+            self._pending_uniforms.update(resolved)
+            return
+
+        self.use()
+        for uniform, value in resolved:
+            uniform.setter(value)
+
+    def flush_uniforms(self) -> None:
+        """Upload all staged uniform values"""
+        if not self._pending_uniforms:
+            return
+        pending = self._pending_uniforms
+        self._pending_uniforms = {}
+        for uniform, value in pending.items():
+            uniform.setter(value)
+
+    def invalidate_uniforms(self) -> None:
+        """Forget cached uniform values so the next assignments are uploaded"""
+        for uniform in self._uniforms.values():
+            uniform.invalidate()
 
     def use(self):
-        self._ctx.gl.useProgram(self._glo)
+        self._ctx.use_program(self._glo)
+        self._ctx.active_program = self
+        if self._pending_uniforms:
+            self.flush_uniforms()
 
     def _introspect_attributes(self):
-        num_attrs = self._ctx.gl.getProgramParameter(
+        num_attrs = self._ctx.dispatch.getProgramParameter(
             self._glo, constants.ACTIVE_ATTRIBUTES
         )
 
         for i in range(num_attrs):
-            info = self._ctx.gl.getActiveAttrib(self._glo, i)
-            location = self._ctx.gl.getAttribLocation(self._glo, info.name)
+            info = self._ctx.dispatch.getActiveAttrib(self._glo, i)
+            location = self._ctx.dispatch.getAttribLocation(self._glo, info.name)
 
             type_info = GLTypes.get(info.type)
 
@@ -77,27 +241,99 @@ class Program:
                 )
             )
 
+        # Programs with identical attribute layouts can share vertex arrays
+        self.attribute_key = ":".join(
+            f"{attr.name}[{attr.gl_type}/{attr.components}]@{attr.location}"
+            for attr in self._attributes
+        )
+
     def _introspect_uniforms(self):
-        active_uniforms = self._ctx.gl.getProgramParameter(
+        active_uniforms = self._ctx.dispatch.getProgramParameter(
             self._glo, constants.ACTIVE_UNIFORMS
         )
 
         for index in range(active_uniforms):
-            active_info = self._ctx.gl.getActiveUniform(self._glo, index)
-            print(active_info.type)
-            u_location = self._ctx.gl.getUniformLocation(self._glo, active_info.name)
+            active_info = self._ctx.dispatch.getActiveUniform(self._glo, index)
+            u_location = self._ctx.dispatch.getUniformLocation(
+                self._glo, active_info.name
+            )
+            # Members of uniform blocks have no location
+            if u_location is None:
+                continue
+
+            # Arrays are reported as "name[0]" and set through their name
+            name = active_info.name
+            if name.endswith("[0]"):
+                name = name[:-3]
 
-            self._uniforms[active_info.name] = Uniform(
+            self._uniforms[name] = Uniform(
                 self._ctx,
                 self._glo,
                 u_location,
-                active_info.name,
+                name,
                 active_info.type,
                 active_info.size,
             )
 
+    def _introspect_uniform_blocks(self):
+        gl = self._ctx.dispatch
+        num_blocks = gl.getProgramParameter(self._glo, constants.ACTIVE_UNIFORM_BLOCKS)
+
+        for index in range(num_blocks):
+            name = gl.getActiveUniformBlockName(self._glo, index)
+            size = gl.getActiveUniformBlockParameter(
+                self._glo, index, constants.UNIFORM_BLOCK_DATA_SIZE
+            )
+            indices = gl.getActiveUniformBlockParameter(
+                self._glo, index, constants.UNIFORM_BLOCK_ACTIVE_UNIFORM_INDICES
+            )
+            types, sizes, offsets, array_strides, matrix_strides = (
+                list(gl.getActiveUniforms(self._glo, indices, pname))
+                for pname in (
+                    constants.UNIFORM_TYPE,
+                    constants.UNIFORM_SIZE,
+                    constants.UNIFORM_OFFSET,
+                    constants.UNIFORM_ARRAY_STRIDE,
+                    constants.UNIFORM_MATRIX_STRIDE,
+                )
+            )
+
+            members = []
+            for i, uniform_index in enumerate(indices):
+                member_name = gl.getActiveUniform(self._glo, uniform_index).name
+                # Arrays are reported as "name[0]" and members of blocks
+                # with an instance name as "Block.name"
+                if member_name.endswith("[0]"):
+                    member_name = member_name[:-3]
+                if member_name.startswith(f"{name}."):
+                    member_name = member_name[len(name) + 1 :]
+                members.append(
+                    UniformBlockMember(
+                        member_name,
+                        types[i],
+                        offsets[i],
+                        sizes[i],
+                        array_strides[i],
+                        matrix_strides[i],
+                    )
+                )
+
+            block = UniformBlock(self._ctx, self._glo, index, size, name, members)
+            self._uniform_blocks[name] = block
+            self._uniforms[name] = block
+
+    def _introspect_varyings(self):
+        num_varyings = self._ctx.dispatch.getProgramParameter(
+            self._glo, constants.TRANSFORM_FEEDBACK_VARYINGS
+        )
+
+        for i in range(num_varyings):
+            info = self._ctx.dispatch.getTransformFeedbackVarying(self._glo, i)
+            type_info = GLTypes.get(info.type)
+            self._varying_sizes.append(type_info.size * info.size)
+
     def _query_uniform(self, index: int):
-        active_info = self._ctx.gl.getActiveUniform(self._glo, index)
+        active_info = self._ctx.dispatch.getActiveUniform(self._glo, index)
         return active_info.name, active_info.type, active_info.value
 
     @staticmethod
@@ -0,0 +1,121 @@
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from .commands import CommandList
+from .program import Program
+
+if TYPE_CHECKING:
+    from arcade.gl import Context
+
+
+class RenderBundle:
+    """
+    A captured sequence of state changes, uniform uploads and draw calls
+    that can be replayed with a single call into JavaScript.
+
+    The first :py:meth:`run` calls ``draw`` with command recording enabled.
+    The recorded commands are executed and compiled into a generated
+    JavaScript function, which later calls to :py:meth:`run` replay
+    directly. Only commands that can be recorded are replayed, so buffer
+    and texture uploads made inside ``draw`` happen once during capture.
+
+    The bundle keeps track of the buffers, textures, programs and
+    geometries it used and is captured again when any of them has been
+    changed in a way that affects the recorded commands. Programs and
+    textures can not change after creation, so they never cause a capture.
+
+    Uniform values set inside ``draw`` are recorded as constants and
+    replayed with the values they had during the capture. Set uniforms
+    that change between runs outside ``draw``, or call :py:meth:`invalidate`
+    after changing them.
+
+    :param Context ctx: The context this bundle belongs to
+    :param draw: A function issuing the draw calls to capture
+    """
+
+    def __init__(self, ctx: "Context", draw: Callable[[], None]):
+        self._ctx = ctx
+        self._draw = draw
+        self._func = None
+        self._state: Optional[tuple] = None
+        self._refs: Dict[int, Tuple[object, int]] = {}
+        # Programs whose uniforms the replay may have changed
+        self._programs: List[Program] = []
+        self._commands = 0
+        self._captures = 0
+
+    @property
+    def valid(self) -> bool:
+        """False if the bundle needs to be captured again"""
+        if self._func is None:
+            return False
+        for obj, version in self._refs.values():
+            if obj._version != version:
+                return False
+        return True
+
+    @property
+    def commands(self) -> int:
+        """Number of commands replayed by the bundle"""
+        return self._commands
+
+    @property
+    def captures(self) -> int:
+        """Number of times the bundle has been captured"""
+        return self._captures
+
+    def invalidate(self) -> None:
+        """Force the bundle to be captured again on the next run"""
+        self._func = None
+
+    def track(self, obj) -> None:
+        """
+        Remember an object used by the captured commands. Called by
+        geometries, programs and textures while the bundle is capturing.
+        """
+        if id(obj) in self._refs:
+            return
+        self._refs[id(obj)] = obj, obj._version
+        # Forget cached uniform values so the uploads made while capturing
+        # are recorded rather than elided
+        if isinstance(obj, Program):
+            obj.invalidate_uniforms()
+            self._programs.append(obj)
+
+    def run(self) -> None:
+        """Replay the bundle, capturing it first if needed"""
+        if not self.valid:
+            self._capture()
+            return
+
+        ctx = self._ctx
+        self._func(ctx.gl)
+        # Shadowed state is now what it was at the end of the capture,
+        # while uniform values may differ from what the caches think
+        ctx._restore_state(self._state)
+        for program in self._programs:
+            program.invalidate_uniforms()
+
+    def _capture(self) -> None:
+        ctx = self._ctx
+        ctx.flush()
+        previous = ctx.command_list
+        commands = CommandList()
+        self._refs = {}
+        self._programs = []
+
+        # Start from unknown state so every command the draw function
+        # depends on is recorded
+        ctx.invalidate_state()
+        ctx.command_list = commands
+        ctx._bundle = self
+        try:
+            self._draw()
+            ctx.flush()
+        finally:
+            ctx.command_list = previous
+            ctx._bundle = None
+
+        self._state = ctx._save_state()
+        self._func = commands.compile()
+        self._commands = len(commands)
+        self._captures += 1
@@ -0,0 +1,156 @@
+from typing import TYPE_CHECKING, List
+
+from arcade.arcade_types import BufferProtocol
+from arcade.gl import constants
+
+from .buffer import Buffer
+from .interop import as_bytes
+
+if TYPE_CHECKING:
+    from arcade.gl import Context
+
+
+class RingBuffer:
+    """
+    A buffer for streaming data that changes every frame.
+
+    One WebGL buffer is split into ``frames`` regions of ``frame_size`` bytes.
+    Each frame allocations are handed out from the current region, and
+    :py:meth:`Context.new_frame` rotates to the next one. Data written in a
+    frame is therefore not overwritten until ``frames`` frames later, by which
+    time the GPU is normally done reading it.
+
+    When ``fence`` is enabled a fence is placed after each frame. If the GPU
+    has not passed the fence by the time its region comes around again, the
+    buffer storage is orphaned instead of writing into memory that may still
+    be in use.
+
+    Allocations return byte offsets into :py:attr:`buffer`. For vertex data
+    described by a :py:class:`~arcade.gl.BufferDescription` with a given
+    stride, allocate with ``alignment=stride`` and render with
+    ``first=offset // stride``.
+
+    :param Context ctx: The context this buffer belongs to
+    :param int frame_size: Bytes available to each frame
+    :param int frames: Number of frame regions to rotate through
+    :param int buffer_type: The buffer binding target
+    :param bool fence: Use fence sync objects to detect regions still in use
+    """
+
+    def __init__(
+        self,
+        ctx: "Context",
+        frame_size: int,
+        *,
+        frames: int = 3,
+        buffer_type: int = constants.ARRAY_BUFFER,
+        fence: bool = True,
+    ):
+        if frame_size <= 0:
+            raise ValueError("frame_size must be positive")
+        if frames < 1:
+            raise ValueError("frames must be at least 1")
+
+        self._ctx = ctx
+        self._frame_size = frame_size
+        self._frames = frames
+        self._fence = fence
+        self._buffer = Buffer(
+            ctx, reserve=frame_size * frames, buffer_type=buffer_type, usage="stream"
+        )
+        self._frame = 0
+        self._cursor = 0
+        self._fences: List = [None] * frames
+        self._orphans = 0
+
+    @property
+    def buffer(self) -> Buffer:
+        """The buffer holding all frame regions"""
+        return self._buffer
+
+    @property
+    def frame_size(self) -> int:
+        return self._frame_size
+
+    @property
+    def frames(self) -> int:
+        return self._frames
+
+    @property
+    def used(self) -> int:
+        """Bytes allocated in the current frame"""
+        return self._cursor
+
+    @property
+    def orphans(self) -> int:
+        """Number of times the storage was orphaned because a region was still in use"""
+        return self._orphans
+
+    def alloc(self, size: int, alignment: int = 1) -> int:
+        """
+        Reserve ``size`` bytes in the current frame region.
+
+        :param int size: Number of bytes to reserve
+        :param int alignment: Align the returned offset to a multiple of this
+        :returns: Byte offset into :py:attr:`buffer`
+        """
+        region_start = self._frame * self._frame_size
+        offset = region_start + self._cursor
+        offset = -(-offset // alignment) * alignment
+
+        if offset + size > region_start + self._frame_size:
+            raise ValueError(
+                f"RingBuffer frame region is full. Requested {size} bytes with "
+                f"{region_start + self._frame_size - offset} bytes left. "
+                "Use a larger frame_size."
+            )
+
+        self._cursor = offset + size - region_start
+        return offset
+
+    def write(self, data: BufferProtocol, alignment: int = 1) -> int:
+        """
+        Allocate space in the current frame region and upload data to it.
+
+        :param data: Any object supporting the buffer protocol
+        :param int alignment: Align the returned offset to a multiple of this
+        :returns: Byte offset into :py:attr:`buffer`
+        """
+        view = as_bytes(data)
+        offset = self.alloc(view.nbytes, alignment)
+        self._buffer.write(view, offset)
+        return offset
+
+    def new_frame(self) -> None:
+        """Move on to the next frame region. Called by :py:meth:`Context.new_frame`"""
+        gl = self._ctx.dispatch
+        if self._fence:
+            if self._fences[self._frame] is not None:
+                gl.deleteSync(self._fences[self._frame])
+            self._fences[self._frame] = gl.fenceSync(
+                constants.SYNC_GPU_COMMANDS_COMPLETE, 0
+            )
+
+        self._frame = (self._frame + 1) % self._frames
+        self._cursor = 0
+
+        sync = self._fences[self._frame]
+        if sync is None:
+            return
+
+        # WebGL does not allow blocking, so only poll the fence
+        status = gl.clientWaitSync(sync, 0, 0)
+        if status in (constants.ALREADY_SIGNALED, constants.CONDITION_SATISFIED):
+            gl.deleteSync(sync)
+            self._fences[self._frame] = None
+            return
+
+        # The GPU may still be reading this region. Orphan the storage so
+        # writes go to fresh memory, which also makes all fences obsolete.
+        self._orphans += 1
+        for i, fence in enumerate(self._fences):
+            if fence is not None:
+                gl.deleteSync(fence)
+                self._fences[i] = None
+
+        self._buffer.orphan()
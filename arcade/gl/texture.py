@@ -1,19 +1,55 @@
+import struct
+from array import array
 from typing import TYPE_CHECKING, Optional, Tuple
 
 from arcade.arcade_types import BufferProtocol
 from arcade.gl import constants
 
-from .types import pixel_formats
+from .interop import (
+    as_bytes,
+    compressed_tex_sub_image_2d,
+    read_pixels,
+    tex_image_2d,
+    tex_image_3d,
+    tex_sub_image_2d,
+    tex_sub_image_3d,
+)
+from .types import compressed_formats, pixel_formats
 
 if TYPE_CHECKING:
     from arcade.gl import Context
 
+# The format and type readPixels always supports for each dtype, with the
+# typecode of the values read and the typecode of the returned values
+_read_formats = {
+    "f1": (constants.RGBA, constants.UNSIGNED_BYTE, "B", "B"),
+    "f2": (constants.RGBA, constants.FLOAT, "f", "e"),
+    "f4": (constants.RGBA, constants.FLOAT, "f", "f"),
+    "i1": (constants.RGBA_INTEGER, constants.INT, "i", "b"),
+    "i2": (constants.RGBA_INTEGER, constants.INT, "i", "h"),
+    "i4": (constants.RGBA_INTEGER, constants.INT, "i", "i"),
+    "u1": (constants.RGBA_INTEGER, constants.UNSIGNED_INT, "I", "B"),
+    "u2": (constants.RGBA_INTEGER, constants.UNSIGNED_INT, "I", "H"),
+    "u4": (constants.RGBA_INTEGER, constants.UNSIGNED_INT, "I", "I"),
+}
+
 
 class Texture:
+    """
+    A 2D, 2D array or 3D texture. Array and 3D textures are created with
+    ``target`` set to ``TEXTURE_2D_ARRAY`` or ``TEXTURE_3D`` and a
+    ``(width, height, layers)`` size.
+
+    2D textures can use a compressed format such as
+    ``COMPRESSED_RGBA_S3TC_DXT5_EXT``. Their storage is allocated for
+    ``levels`` mipmap levels with ``texStorage2D`` and each level is
+    written with :py:meth:`write`.
+    """
+
     def __init__(
         self,
         ctx: "Context",
-        size: Tuple[int, int],
+        size: Tuple[int, ...],
         *,
         components: int = 4,
         dtype: str = "f1",
@@ -21,47 +57,238 @@ class Texture:
         filter: Optional[Tuple[int, int]] = None,
         wrap_x: Optional[int] = None,
         wrap_y: Optional[int] = None,
+        wrap_z: Optional[int] = None,
         target=constants.TEXTURE_2D,
         depth=False,
+        compressed_format: Optional[int] = None,
+        levels: int = 1,
     ):
         self._ctx = ctx
-        self._target = constants.TEXTURE_2D
-        self._width, self._height = size
+        self._target = target
+        self._layered = target in (constants.TEXTURE_2D_ARRAY, constants.TEXTURE_3D)
+        if self._layered:
+            if len(size) != 3:
+                raise ValueError(
+                    "Array and 3D textures need a (width, height, layers) size"
+                )
+            self._width, self._height, self._layers = size
+            self._check_layers()
+        else:
+            self._width, self._height = size
+            self._layers = 1
         self._dtype = dtype
         self._components = components
         self._alignment = 1
-        self._target = target
         self._depth = depth
+        self._compressed_format = compressed_format
+        self._levels = levels
         self._compare_func: Optional[str] = None
         self._anisotropy = 1.0
+        # Framebuffer used by read(), created on first use
+        self._read_fbo = None
+        # Incremented when the texture storage is re-specified
+        self._version = 0
+        # The mipmap levels generated by build_mipmaps, if any
+        self._mipmap_levels: Optional[Tuple[int, int]] = None
 
-        if "f" in self._dtype:
-            self._filter = constants.LINEAR, constants.LINEAR
-        else:
-            self._filter = constants.NEAREST, constants.NEAREST
+        self._glo = self._ctx.dispatch.createTexture()
+        self._ctx.bind_texture(self._ctx.default_texture_unit, self._target, self._glo)
 
-        self._wrap_x = constants.REPEAT
-        self._wrap_y = constants.REPEAT
+        self._allocate(data)
 
-        self._ctx.gl.activeTexture(constants.TEXTURE0 + self._ctx.default_texture_unit)
-        self._glo = self._ctx.gl.createTexture()
-        self._ctx.gl.bindTexture(self._target, self._glo)
-
-        self._texture_2d(data)
+        # WebGL defaults to a mipmapped min filter, which leaves textures
+        # without mipmaps incomplete. Always set the sampling state. A filter
+        # chosen by the user is kept by build_mipmaps.
+        filter_set = filter is not None
+        if filter is None:
+            if self._compressed_format is not None and levels > 1:
+                filter = constants.LINEAR_MIPMAP_LINEAR, constants.LINEAR
+            elif "f" in self._dtype and not self._depth:
+                filter = constants.LINEAR, constants.LINEAR
+            else:
+                filter = constants.NEAREST, constants.NEAREST
+        self._filter = (0, 0)
+        self._wrap_x = 0
+        self._wrap_y = 0
+        self._wrap_z = 0
+        self.filter = filter
+        self._filter_set = filter_set
+        self.wrap_x = wrap_x if wrap_x is not None else constants.REPEAT
+        self.wrap_y = wrap_y if wrap_y is not None else constants.REPEAT
+        if self._target == constants.TEXTURE_3D:
+            self.wrap_z = wrap_z if wrap_z is not None else constants.REPEAT
 
     def use(self, unit: int = 0) -> None:
-        self._ctx.gl.activeTexture(constants.TEXTURE0 + unit)
-        self._ctx.gl.bindTexture(self._target, self._glo)
+        if self._ctx._bundle is not None:
+            self._ctx._bundle.track(self)
+        self._ctx.bind_texture(unit, self._target, self._glo)
 
     @property
     def glo(self):
         return self._glo
 
+    def delete(self) -> None:
+        """Delete the underlying WebGL texture"""
+        if self._glo is None:
+            return
+        gl = self._ctx.dispatch
+        if self._read_fbo is not None:
+            gl.deleteFramebuffer(self._read_fbo)
+            self._read_fbo = None
+        gl.deleteTexture(self._glo)
+        # Deleting a bound texture implicitly unbinds it
+        textures = self._ctx._state_textures
+        for key, glo in textures.items():
+            if glo is self._glo:
+                textures[key] = None
+        self._glo = None
+
     @property
-    def size(self) -> Tuple[int, int]:
+    def size(self) -> Tuple[int, ...]:
+        """
+        ``(width, height)``, or ``(width, height, layers)`` for array and
+        3D textures
+        """
+        if self._layered:
+            return self._width, self._height, self._layers
         return self._width, self._height
 
-    def _texture_2d(self, data):
+    @property
+    def compressed_format(self) -> Optional[int]:
+        """The compressed internal format, or None for uncompressed textures"""
+        return self._compressed_format
+
+    @property
+    def layers(self) -> int:
+        """The number of layers, or the depth of a 3D texture. 1 for 2D textures"""
+        return self._layers
+
+    @property
+    def filter(self) -> Tuple[int, int]:
+        """
+        The ``(min, mag)`` filter, for example ``(LINEAR_MIPMAP_LINEAR, LINEAR)``.
+        Mipmapped min filters need :py:meth:`build_mipmaps` to be called.
+        """
+        return self._filter
+
+    @filter.setter
+    def filter(self, value: Tuple[int, int]):
+        if not isinstance(value, tuple) or len(value) != 2:
+            raise ValueError("filter should be a (min, mag) tuple")
+        self._filter_set = True
+        min_filter, mag_filter = value
+        if min_filter != self._filter[0]:
+            self._parameter(constants.TEXTURE_MIN_FILTER, min_filter)
+        if mag_filter != self._filter[1]:
+            self._parameter(constants.TEXTURE_MAG_FILTER, mag_filter)
+        self._filter = value
+
+    @property
+    def wrap_x(self) -> int:
+        """
+        The wrap mode for the x axis. ``REPEAT``, ``MIRRORED_REPEAT`` or
+        ``CLAMP_TO_EDGE``.
+        """
+        return self._wrap_x
+
+    @wrap_x.setter
+    def wrap_x(self, value: int):
+        if value != self._wrap_x:
+            self._parameter(constants.TEXTURE_WRAP_S, value)
+            self._wrap_x = value
+
+    @property
+    def wrap_y(self) -> int:
+        """
+        The wrap mode for the y axis. ``REPEAT``, ``MIRRORED_REPEAT`` or
+        ``CLAMP_TO_EDGE``.
+        """
+        return self._wrap_y
+
+    @wrap_y.setter
+    def wrap_y(self, value: int):
+        if value != self._wrap_y:
+            self._parameter(constants.TEXTURE_WRAP_T, value)
+            self._wrap_y = value
+
+    @property
+    def wrap_z(self) -> int:
+        """
+        The wrap mode for the z axis of a 3D texture. ``REPEAT``,
+        ``MIRRORED_REPEAT`` or ``CLAMP_TO_EDGE``.
+        """
+        return self._wrap_z
+
+    @wrap_z.setter
+    def wrap_z(self, value: int):
+        if self._target != constants.TEXTURE_3D:
+            raise ValueError("wrap_z can only be set on 3D textures")
+        if value != self._wrap_z:
+            self._parameter(constants.TEXTURE_WRAP_R, value)
+            self._wrap_z = value
+
+    @property
+    def anisotropy(self) -> float:
+        """
+        The anisotropic filtering level. Clamped to the maximum supported
+        level, and ignored when ``EXT_texture_filter_anisotropic`` is not
+        available.
+        """
+        return self._anisotropy
+
+    @anisotropy.setter
+    def anisotropy(self, value: float):
+        value = max(1.0, min(float(value), self._ctx.limits.MAX_TEXTURE_MAX_ANISOTROPY))
+        if value == self._anisotropy or self._ctx._anisotropy_ext is None:
+            return
+        self._ctx.bind_texture(self._ctx.default_texture_unit, self._target, self._glo)
+        self._ctx.dispatch.texParameterf(
+            self._target, constants.TEXTURE_MAX_ANISOTROPY_EXT, value
+        )
+        self._anisotropy = value
+
+    def build_mipmaps(self, base: int = 0, max_level: int = 1000) -> None:
+        """
+        Generate mipmaps from the ``base`` level. Unless a filter was set,
+        the min filter is switched to ``LINEAR_MIPMAP_LINEAR`` so the mipmaps
+        are used when the texture is minified.
+
+        :param int base: The level to generate the others from
+        :param int max_level: The last level to generate
+        """
+        if self._compressed_format is not None:
+            raise ValueError("Mipmaps can not be generated for compressed textures")
+        if base < 0 or max_level < base:
+            raise ValueError("max_level must be at least base and base not negative")
+
+        if self._mipmap_levels != (base, max_level):
+            self._parameter(constants.TEXTURE_BASE_LEVEL, base)
+            self._parameter(constants.TEXTURE_MAX_LEVEL, max_level)
+            self._mipmap_levels = base, max_level
+        self._ctx.bind_texture(self._ctx.default_texture_unit, self._target, self._glo)
+        self._ctx.dispatch.generateMipmap(self._target)
+
+        if not self._filter_set:
+            self.filter = constants.LINEAR_MIPMAP_LINEAR, constants.LINEAR
+            self._filter_set = False
+
+    def _parameter(self, pname: int, value: int) -> None:
+        self._ctx.bind_texture(self._ctx.default_texture_unit, self._target, self._glo)
+        self._ctx.dispatch.texParameteri(self._target, pname, value)
+
+    def _check_layers(self) -> None:
+        limits = self._ctx.limits
+        if self._target == constants.TEXTURE_3D:
+            limit = limits.MAX_3D_TEXTURE_SIZE
+            if max(self._width, self._height, self._layers) > limit:
+                raise ValueError(f"3D textures can not be larger than {limit}")
+        elif self._layers > limits.MAX_ARRAY_TEXTURE_LAYERS:
+            limit = limits.MAX_ARRAY_TEXTURE_LAYERS
+            raise ValueError(f"Array textures can have at most {limit} layers")
+        if self._layers < 1:
+            raise ValueError("layers must be at least 1")
+
+    def _allocate(self, data):
         try:
             format_info = pixel_formats[self._dtype]
         except KeyError:
@@ -70,34 +297,280 @@ class Texture:
             )
         _format, _internal_format, self._type, self._component_size = format_info
 
-        self._ctx.gl.pixelStorei(constants.UNPACK_ALIGNMENT, self._alignment)
-        self._ctx.gl.pixelStorei(constants.PACK_ALIGNMENT, self._alignment)
+        self._ctx.dispatch.pixelStorei(constants.UNPACK_ALIGNMENT, self._alignment)
+        self._ctx.dispatch.pixelStorei(constants.PACK_ALIGNMENT, self._alignment)
+
+        if self._compressed_format is not None:
+            self._allocate_compressed(data)
+            return
 
         if self._depth:
-            self._ctx.gl.texImage2D(
+            self._format = constants.DEPTH_COMPONENT
+            self._internal_format = constants.DEPTH_COMPONENT24
+            self._type = constants.UNSIGNED_INT
+            self._component_size = 4
+        else:
+            self._format = _format[self._components]
+            self._internal_format = _internal_format[self._components]
+
+        if self._layered:
+            tex_image_3d(
+                self._ctx.gl,
                 self._target,
                 0,
-                constants.DEPTH_COMPONENT24,
+                self._internal_format,
                 self._width,
                 self._height,
-                0,
-                constants.DEPTH_COMPONENT,
-                constants.UNSIGNED_INT,
+                self._layers,
+                self._format,
+                self._type,
                 data,
             )
-            self.compare_func = "<="
         else:
-            self._format = _format[self._components]
-            self._internal_format = _internal_format[self._components]
-
-            self._ctx.gl.texImage2D(
+            tex_image_2d(
+                self._ctx.gl,
                 self._target,
                 0,
                 self._internal_format,
                 self._width,
                 self._height,
-                0,
                 self._format,
                 self._type,
                 data,
             )
+
+        if self._depth:
+            self.compare_func = "<="
+
+    def _allocate_compressed(self, data):
+        if self._layered or self._depth:
+            raise ValueError("Only 2D color textures can be compressed")
+        if self._compressed_format not in self._ctx.compressed_formats:
+            raise ValueError(
+                f"Compressed format {self._compressed_format} is not supported"
+            )
+        if self._levels < 1:
+            raise ValueError("levels must be at least 1")
+
+        self._format = self._internal_format = self._compressed_format
+        self._ctx.dispatch.texStorage2D(
+            self._target,
+            self._levels,
+            self._internal_format,
+            self._width,
+            self._height,
+        )
+        if data is not None:
+            self.write(data)
+
+    def write(
+        self,
+        data: BufferProtocol,
+        level: int = 0,
+        viewport: Optional[Tuple[int, ...]] = None,
+        layer: Optional[int] = None,
+    ) -> None:
+        """
+        Write pixels into the texture with ``texSubImage2D``, or
+        ``texSubImage3D`` for array and 3D textures. The data is handed to
+        WebGL straight from the Python memory, so an ``array`` or a
+        ``memoryview`` slice of a larger buffer is uploaded without copying.
+
+        :param data: The pixels, rows from bottom to top
+        :param int level: The mipmap level to write to
+        :param viewport: The area to write as ``(x, y, width, height)`` or
+                         ``(width, height)``. Defaults to the whole level
+        :param int layer: The layer of an array or 3D texture to write.
+                          Defaults to all layers
+        """
+        x, y, width, height = self._level_area(level, viewport)
+        z, depth = self._layer_range(level, layer)
+        view = as_bytes(data)
+        if self._compressed_format is not None:
+            self._write_compressed(view, level, x, y, width, height)
+            return
+
+        expected = width * height * depth * self._components * self._component_size
+        if view.nbytes != expected:
+            raise ValueError(
+                f"Expected {expected} bytes for a {width}x{height}x{depth} area, "
+                f"got {view.nbytes}"
+            )
+
+        self._ctx.bind_texture(self._ctx.default_texture_unit, self._target, self._glo)
+        self._ctx.dispatch.pixelStorei(constants.UNPACK_ALIGNMENT, self._alignment)
+        if self._layered:
+            tex_sub_image_3d(
+                self._ctx.gl,
+                self._target,
+                level,
+                x,
+                y,
+                z,
+                width,
+                height,
+                depth,
+                self._format,
+                self._type,
+                view,
+            )
+        else:
+            tex_sub_image_2d(
+                self._ctx.gl,
+                self._target,
+                level,
+                x,
+                y,
+                width,
+                height,
+                self._format,
+                self._type,
+                view,
+            )
+
+    def _write_compressed(self, view, level, x, y, width, height):
+        if level >= self._levels:
+            raise ValueError(f"The texture only has {self._levels} levels")
+        block_width, block_height, block_size = compressed_formats[
+            self._compressed_format
+        ]
+        blocks_x = -(-width // block_width)
+        blocks_y = -(-height // block_height)
+        expected = blocks_x * blocks_y * block_size
+        if view.nbytes != expected:
+            raise ValueError(
+                f"Expected {expected} bytes of compressed blocks for a "
+                f"{width}x{height} area, got {view.nbytes}"
+            )
+
+        self._ctx.bind_texture(self._ctx.default_texture_unit, self._target, self._glo)
+        compressed_tex_sub_image_2d(
+            self._ctx.gl,
+            self._target,
+            level,
+            x,
+            y,
+            width,
+            height,
+            self._compressed_format,
+            view,
+        )
+
+    def read(
+        self,
+        level: int = 0,
+        viewport: Optional[Tuple[int, ...]] = None,
+        layer: Optional[int] = None,
+    ) -> bytes:
+        """
+        Read pixels from the texture. The texture is attached to a
+        framebuffer and read with ``readPixels``, which waits for the GPU
+        to finish rendering to it. Depth textures can not be read, and
+        neither can formats WebGL can not render to, such as float
+        textures without ``EXT_color_buffer_float``.
+
+        WebGL only guarantees reading four components of 8 bit normalized,
+        32 bit integer or float values, so pixels are read in that form and
+        converted to the texture's components and dtype.
+
+        :param int level: The mipmap level to read
+        :param viewport: The area to read as ``(x, y, width, height)`` or
+                         ``(width, height)``. Defaults to the whole level
+        :param int layer: The layer of an array or 3D texture to read.
+                          Defaults to the first layer
+        """
+        if self._depth:
+            raise ValueError("Depth textures can not be read in WebGL")
+        if self._compressed_format is not None:
+            raise ValueError("Compressed textures can not be read in WebGL")
+
+        x, y, width, height = self._level_area(level, viewport)
+        z, _ = self._layer_range(level, 0 if layer is None else layer)
+        read_format, read_type, read_code, code = _read_formats[self._dtype]
+        values = array(read_code)
+        values.frombytes(bytes(width * height * 4 * values.itemsize))
+
+        gl = self._ctx.dispatch
+        if self._read_fbo is None:
+            self._read_fbo = gl.createFramebuffer()
+        self._ctx.bind_framebuffer(self._read_fbo)
+        if self._layered:
+            gl.framebufferTextureLayer(
+                constants.FRAMEBUFFER, constants.COLOR_ATTACHMENT0, self._glo, level, z
+            )
+        else:
+            gl.framebufferTexture2D(
+                constants.FRAMEBUFFER,
+                constants.COLOR_ATTACHMENT0,
+                self._target,
+                self._glo,
+                level,
+            )
+        status = gl.checkFramebufferStatus(constants.FRAMEBUFFER)
+        if status == constants.FRAMEBUFFER_COMPLETE:
+            gl.pixelStorei(constants.PACK_ALIGNMENT, self._alignment)
+            read_pixels(
+                self._ctx.gl, x, y, width, height, read_format, read_type, values
+            )
+        self._ctx.active_framebuffer.use(force=True)
+        if status != constants.FRAMEBUFFER_COMPLETE:
+            raise ValueError(
+                f"Textures with {self._components} components of dtype "
+                f"'{self._dtype}' can not be read on this device"
+            )
+
+        components = self._components
+        if components != 4:
+            picked = array(read_code)
+            picked.frombytes(bytes(width * height * components * values.itemsize))
+            for c in range(components):
+                picked[c::components] = values[c::4]
+            values = picked
+        if code == read_code:
+            return values.tobytes()
+        # array has no half float typecode
+        if code == "e":
+            return struct.pack(f"<{len(values)}e", *values)
+        return array(code, values).tobytes()
+
+    def _layer_range(self, level: int, layer: Optional[int]) -> Tuple[int, int]:
+        if not self._layered:
+            if layer not in (None, 0):
+                raise ValueError("Only array and 3D textures have layers")
+            return 0, 1
+
+        # The depth of 3D textures shrinks with each mipmap level
+        if self._target == constants.TEXTURE_3D:
+            layers = max(1, self._layers >> level)
+        else:
+            layers = self._layers
+        if layer is None:
+            return 0, layers
+        if not 0 <= layer < layers:
+            raise ValueError(
+                f"layer {layer} is outside the {layers} layers of the level"
+            )
+        return layer, 1
+
+    def _level_area(
+        self, level: int, viewport: Optional[Tuple[int, ...]]
+    ) -> Tuple[int, int, int, int]:
+        level_width = max(1, self._width >> level)
+        level_height = max(1, self._height >> level)
+        if viewport is None:
+            return 0, 0, level_width, level_height
+
+        if len(viewport) == 2:
+            x, y, width, height = 0, 0, *viewport
+        elif len(viewport) == 4:
+            x, y, width, height = viewport
+        else:
+            raise ValueError(
+                "viewport should be (x, y, width, height) or (width, height)"
+            )
+
+        if x < 0 or y < 0 or x + width > level_width or y + height > level_height:
+            raise ValueError(
+                f"viewport {viewport} is outside the {level_width}x{level_height} level"
+            )
+        return x, y, width, height
@@ -0,0 +1,341 @@
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from arcade.arcade_types import BufferProtocol
+from arcade.gl import constants
+
+from .interop import as_bytes
+from .texture import Texture
+
+if TYPE_CHECKING:
+    from arcade.gl import Context
+
+# A free rectangle in the atlas: x, y, width, height
+_Rect = Tuple[int, int, int, int]
+
+
+class AtlasRegion:
+    """
+    The area of an image in a :py:class:`TextureAtlas`.
+
+    Regions are updated in place when the atlas is repacked or grows, so
+    keep the region rather than copying its coordinates, or rebuild data
+    derived from them when :py:attr:`TextureAtlas.version` changes.
+    """
+
+    __slots__ = ("name", "x", "y", "width", "height", "texture_coordinates", "_data")
+
+    def __init__(self, name: str, width: int, height: int, data: bytes):
+        self.name = name
+        self.x = 0
+        self.y = 0
+        self.width = width
+        self.height = height
+        #: The ``(u0, v0, u1, v1)`` texture coordinates of the image
+        self.texture_coordinates: Tuple[float, float, float, float] = (0, 0, 0, 0)
+        self._data = data
+
+    def __repr__(self) -> str:
+        return (
+            f"<AtlasRegion {self.name!r} {self.width}x{self.height} "
+            f"at ({self.x}, {self.y})>"
+        )
+
+
+class TextureAtlas:
+    """
+    Packs many images into one texture so they can be drawn without
+    switching textures.
+
+    Images are placed with a guillotine packer: every placement splits a
+    free rectangle in two, and removing an image returns its rectangle to
+    the free list, merging it with free neighbours. When an image does not
+    fit, all images are repacked from scratch to undo fragmentation, and
+    if that is not enough the atlas doubles in size up to ``max_size``.
+    Growing creates a new :py:attr:`texture`.
+
+    A copy of every image is kept in Python memory so images can be
+    uploaded again after repacking. Each image is uploaded together with
+    its transparent border in one ``texSubImage2D`` call, so pixels left
+    behind by removed or moved images never touch a border.
+
+    :param Context ctx: The context this atlas belongs to
+    :param size: The initial width and height of the atlas
+    :param int components: Number of components per pixel
+    :param int border: Empty pixels kept around each image to avoid
+                       bleeding when sampling with linear filtering
+    :param max_size: The largest width and height the atlas can grow to.
+                     Defaults to ``MAX_TEXTURE_SIZE``
+    """
+
+    def __init__(
+        self,
+        ctx: "Context",
+        size: Tuple[int, int] = (512, 512),
+        *,
+        components: int = 4,
+        border: int = 1,
+        max_size: Optional[Tuple[int, int]] = None,
+    ):
+        if border < 0:
+            raise ValueError("border can not be negative")
+
+        self._ctx = ctx
+        self._components = components
+        self._border = border
+        if max_size is None:
+            limit = ctx.limits.MAX_TEXTURE_SIZE
+            max_size = limit, limit
+        self._max_size = max_size
+        if size[0] > max_size[0] or size[1] > max_size[1]:
+            raise ValueError(f"size {size} is larger than max_size {max_size}")
+
+        self._regions: Dict[str, AtlasRegion] = {}
+        self._size = size
+        self._free: List[_Rect] = [(0, 0, *size)]
+        self._texture = self._create_texture(size)
+        self._repacks = 0
+        # Incremented when regions move or the texture is replaced
+        self._version = 0
+
+    @property
+    def texture(self) -> Texture:
+        """The texture holding the images"""
+        return self._texture
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self._size
+
+    @property
+    def version(self) -> int:
+        """Incremented whenever existing regions move or the texture changes"""
+        return self._version
+
+    @property
+    def repacks(self) -> int:
+        """Number of times all images were repacked"""
+        return self._repacks
+
+    @property
+    def regions(self) -> Dict[str, AtlasRegion]:
+        return self._regions
+
+    def __len__(self) -> int:
+        return len(self._regions)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._regions
+
+    def __getitem__(self, name: str) -> AtlasRegion:
+        return self._regions[name]
+
+    def add(
+        self, name: str, size: Tuple[int, int], data: BufferProtocol
+    ) -> AtlasRegion:
+        """
+        Add an image to the atlas. Adding a name that is already in the atlas
+        returns the existing region.
+
+        :param str name: A unique name for the image
+        :param size: The width and height of the image
+        :param data: The pixels, rows from bottom to top
+        """
+        region = self._regions.get(name)
+        if region is not None:
+            return region
+
+        width, height = size
+        view = as_bytes(data)
+        expected = width * height * self._components
+        if view.nbytes != expected:
+            raise ValueError(
+                f"Expected {expected} bytes for a {width}x{height} image, "
+                f"got {view.nbytes}"
+            )
+
+        region = AtlasRegion(name, width, height, self._pad(width, height, view))
+        position = self._insert(self._free, *self._padded(region))
+        if position is None:
+            self._regions[name] = region
+            try:
+                self._repack()
+            except ValueError:
+                del self._regions[name]
+                raise
+            return region
+
+        self._place(region, position)
+        self._regions[name] = region
+        self._upload(region)
+        return region
+
+    def update(self, name: str, data: BufferProtocol) -> None:
+        """
+        Replace the pixels of an image with new pixels of the same size.
+
+        :param str name: The name of the image
+        :param data: The pixels, rows from bottom to top
+        """
+        region = self._regions[name]
+        view = as_bytes(data)
+        if view.nbytes != region.width * region.height * self._components:
+            raise ValueError("The new image must have the same size")
+        region._data = self._pad(region.width, region.height, view)
+        self._upload(region)
+
+    def remove(self, name: str) -> None:
+        """
+        Remove an image. Its space is reused by later images.
+
+        :param str name: The name of the image
+        """
+        region = self._regions.pop(name)
+        width, height = self._padded(region)
+        border = self._border
+        self._free.append((region.x - border, region.y - border, width, height))
+        self._merge_free()
+
+    def _pad(self, width: int, height: int, view: memoryview) -> bytes:
+        # Surround the image with the border, cleared to zero
+        border = self._border
+        if border == 0:
+            return bytes(view)
+        row = width * self._components
+        padded_row = (width + border * 2) * self._components
+        padded = bytearray(padded_row * (height + border * 2))
+        start = border * padded_row + border * self._components
+        for y in range(height):
+            padded[start : start + row] = view[y * row : (y + 1) * row]
+            start += padded_row
+        return bytes(padded)
+
+    def _padded(self, region: AtlasRegion) -> Tuple[int, int]:
+        return region.width + self._border * 2, region.height + self._border * 2
+
+    def _place(self, region: AtlasRegion, position: Tuple[int, int]) -> None:
+        region.x = position[0] + self._border
+        region.y = position[1] + self._border
+        width, height = self._size
+        region.texture_coordinates = (
+            region.x / width,
+            region.y / height,
+            (region.x + region.width) / width,
+            (region.y + region.height) / height,
+        )
+
+    def _upload(self, region: AtlasRegion) -> None:
+        if region.width and region.height:
+            border = self._border
+            width, height = self._padded(region)
+            self._texture.write(
+                region._data,
+                viewport=(region.x - border, region.y - border, width, height),
+            )
+
+    def _create_texture(self, size: Tuple[int, int]) -> Texture:
+        return Texture(
+            self._ctx,
+            size,
+            components=self._components,
+            wrap_x=constants.CLAMP_TO_EDGE,
+            wrap_y=constants.CLAMP_TO_EDGE,
+        )
+
+    def _repack(self) -> None:
+        # Place the largest images first, growing until everything fits
+        regions = sorted(
+            self._regions.values(),
+            key=lambda r: (max(r.width, r.height), r.width * r.height),
+            reverse=True,
+        )
+        size = self._size
+        while True:
+            free: List[_Rect] = [(0, 0, *size)]
+            positions = self._layout(free, regions)
+            if positions is not None:
+                break
+            size = self._grow(size)
+
+        self._repacks += 1
+        self._version += 1
+        if size != self._size:
+            self._size = size
+            self._texture.delete()
+            self._texture = self._create_texture(size)
+        self._free = free
+        for region, position in zip(regions, positions):
+            self._place(region, position)
+            self._upload(region)
+
+    def _layout(
+        self, free: List[_Rect], regions: Iterable[AtlasRegion]
+    ) -> Optional[List[Tuple[int, int]]]:
+        positions = []
+        for region in regions:
+            position = self._insert(free, *self._padded(region))
+            if position is None:
+                return None
+            positions.append(position)
+        return positions
+
+    def _grow(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        width, height = size
+        max_width, max_height = self._max_size
+        if width <= height and width * 2 <= max_width:
+            return width * 2, height
+        if height * 2 <= max_height:
+            return width, height * 2
+        if width * 2 <= max_width:
+            return width * 2, height
+        raise ValueError(
+            f"The texture atlas is full and can not grow beyond {self._max_size}"
+        )
+
+    @staticmethod
+    def _insert(
+        free: List[_Rect], width: int, height: int
+    ) -> Optional[Tuple[int, int]]:
+        # Best short side fit: the free rectangle leaving the smallest gap
+        best = None
+        best_score = None
+        for i, (_, _, free_width, free_height) in enumerate(free):
+            if width <= free_width and height <= free_height:
+                score = (
+                    min(free_width - width, free_height - height),
+                    free_width * free_height,
+                )
+                if best_score is None or score < best_score:
+                    best, best_score = i, score
+        if best is None:
+            return None
+
+        x, y, free_width, free_height = free.pop(best)
+        right = free_width - width
+        top = free_height - height
+        # Split along the shorter leftover side to keep the larger piece whole
+        if right < top:
+            pieces = (x + width, y, right, height), (x, y + height, free_width, top)
+        else:
+            pieces = (x + width, y, right, free_height), (x, y + height, width, top)
+        free.extend(piece for piece in pieces if piece[2] > 0 and piece[3] > 0)
+        return x, y
+
+    def _merge_free(self) -> None:
+        free = self._free
+        merged = True
+        while merged:
+            merged = False
+            for i, (ax, ay, aw, ah) in enumerate(free):
+                for j in range(i + 1, len(free)):
+                    bx, by, bw, bh = free[j]
+                    if ay == by and ah == bh and (ax + aw == bx or bx + bw == ax):
+                        free[i] = min(ax, bx), ay, aw + bw, ah
+                    elif ax == bx and aw == bw and (ay + ah == by or by + bh == ay):
+                        free[i] = ax, min(ay, by), aw, ah + bh
+                    else:
+                        continue
+                    del free[j]
+                    merged = True
+                    break
+                if merged:
+                    break
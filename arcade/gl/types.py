@@ -1,7 +1,9 @@
 import re
-from typing import Iterable, List, Optional
+from typing import Iterable, List, Optional, Sequence, Tuple
 
-from arcade.gl import Buffer, constants
+from arcade.gl import constants
+
+from .buffer import Buffer
 
 _float_base_format = (0, constants.RED, constants.RG, constants.RGB, constants.RGBA)
 _int_base_format = (
@@ -69,6 +71,116 @@ pixel_formats = {
 }
 
 
+# Block width, block height and bytes per block of each compressed format
+compressed_formats = {
+    # S3TC (BC1 to BC3)
+    constants.COMPRESSED_RGB_S3TC_DXT1_EXT: (4, 4, 8),
+    constants.COMPRESSED_RGBA_S3TC_DXT1_EXT: (4, 4, 8),
+    constants.COMPRESSED_RGBA_S3TC_DXT3_EXT: (4, 4, 16),
+    constants.COMPRESSED_RGBA_S3TC_DXT5_EXT: (4, 4, 16),
+    constants.COMPRESSED_SRGB_S3TC_DXT1_EXT: (4, 4, 8),
+    constants.COMPRESSED_SRGB_ALPHA_S3TC_DXT1_EXT: (4, 4, 8),
+    constants.COMPRESSED_SRGB_ALPHA_S3TC_DXT3_EXT: (4, 4, 16),
+    constants.COMPRESSED_SRGB_ALPHA_S3TC_DXT5_EXT: (4, 4, 16),
+    # RGTC (BC4 and BC5)
+    constants.COMPRESSED_RED_RGTC1_EXT: (4, 4, 8),
+    constants.COMPRESSED_SIGNED_RED_RGTC1_EXT: (4, 4, 8),
+    constants.COMPRESSED_RED_GREEN_RGTC2_EXT: (4, 4, 16),
+    constants.COMPRESSED_SIGNED_RED_GREEN_RGTC2_EXT: (4, 4, 16),
+    # BPTC (BC6H and BC7)
+    constants.COMPRESSED_RGBA_BPTC_UNORM_EXT: (4, 4, 16),
+    constants.COMPRESSED_SRGB_ALPHA_BPTC_UNORM_EXT: (4, 4, 16),
+    constants.COMPRESSED_RGB_BPTC_SIGNED_FLOAT_EXT: (4, 4, 16),
+    constants.COMPRESSED_RGB_BPTC_UNSIGNED_FLOAT_EXT: (4, 4, 16),
+    # ETC2 and EAC
+    constants.COMPRESSED_R11_EAC: (4, 4, 8),
+    constants.COMPRESSED_SIGNED_R11_EAC: (4, 4, 8),
+    constants.COMPRESSED_RG11_EAC: (4, 4, 16),
+    constants.COMPRESSED_SIGNED_RG11_EAC: (4, 4, 16),
+    constants.COMPRESSED_RGB8_ETC2: (4, 4, 8),
+    constants.COMPRESSED_SRGB8_ETC2: (4, 4, 8),
+    constants.COMPRESSED_RGBA8_ETC2_EAC: (4, 4, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ETC2_EAC: (4, 4, 16),
+    constants.COMPRESSED_RGB8_PUNCHTHROUGH_ALPHA1_ETC2: (4, 4, 8),
+    constants.COMPRESSED_SRGB8_PUNCHTHROUGH_ALPHA1_ETC2: (4, 4, 8),
+    # ASTC
+    constants.COMPRESSED_RGBA_ASTC_4x4_KHR: (4, 4, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_4x4_KHR: (4, 4, 16),
+    constants.COMPRESSED_RGBA_ASTC_5x4_KHR: (5, 4, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_5x4_KHR: (5, 4, 16),
+    constants.COMPRESSED_RGBA_ASTC_5x5_KHR: (5, 5, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_5x5_KHR: (5, 5, 16),
+    constants.COMPRESSED_RGBA_ASTC_6x5_KHR: (6, 5, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_6x5_KHR: (6, 5, 16),
+    constants.COMPRESSED_RGBA_ASTC_6x6_KHR: (6, 6, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_6x6_KHR: (6, 6, 16),
+    constants.COMPRESSED_RGBA_ASTC_8x5_KHR: (8, 5, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_8x5_KHR: (8, 5, 16),
+    constants.COMPRESSED_RGBA_ASTC_8x6_KHR: (8, 6, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_8x6_KHR: (8, 6, 16),
+    constants.COMPRESSED_RGBA_ASTC_8x8_KHR: (8, 8, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_8x8_KHR: (8, 8, 16),
+    constants.COMPRESSED_RGBA_ASTC_10x5_KHR: (10, 5, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_10x5_KHR: (10, 5, 16),
+    constants.COMPRESSED_RGBA_ASTC_10x6_KHR: (10, 6, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_10x6_KHR: (10, 6, 16),
+    constants.COMPRESSED_RGBA_ASTC_10x8_KHR: (10, 8, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_10x8_KHR: (10, 8, 16),
+    constants.COMPRESSED_RGBA_ASTC_10x10_KHR: (10, 10, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_10x10_KHR: (10, 10, 16),
+    constants.COMPRESSED_RGBA_ASTC_12x10_KHR: (12, 10, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_12x10_KHR: (12, 10, 16),
+    constants.COMPRESSED_RGBA_ASTC_12x12_KHR: (12, 12, 16),
+    constants.COMPRESSED_SRGB8_ALPHA8_ASTC_12x12_KHR: (12, 12, 16),
+}
+
+# The compressed formats enabled by each WebGL extension
+compressed_texture_extensions = {
+    "WEBGL_compressed_texture_s3tc": (
+        constants.COMPRESSED_RGB_S3TC_DXT1_EXT,
+        constants.COMPRESSED_RGBA_S3TC_DXT1_EXT,
+        constants.COMPRESSED_RGBA_S3TC_DXT3_EXT,
+        constants.COMPRESSED_RGBA_S3TC_DXT5_EXT,
+    ),
+    "WEBGL_compressed_texture_s3tc_srgb": (
+        constants.COMPRESSED_SRGB_S3TC_DXT1_EXT,
+        constants.COMPRESSED_SRGB_ALPHA_S3TC_DXT1_EXT,
+        constants.COMPRESSED_SRGB_ALPHA_S3TC_DXT3_EXT,
+        constants.COMPRESSED_SRGB_ALPHA_S3TC_DXT5_EXT,
+    ),
+    "EXT_texture_compression_rgtc": (
+        constants.COMPRESSED_RED_RGTC1_EXT,
+        constants.COMPRESSED_SIGNED_RED_RGTC1_EXT,
+        constants.COMPRESSED_RED_GREEN_RGTC2_EXT,
+        constants.COMPRESSED_SIGNED_RED_GREEN_RGTC2_EXT,
+    ),
+    "EXT_texture_compression_bptc": (
+        constants.COMPRESSED_RGBA_BPTC_UNORM_EXT,
+        constants.COMPRESSED_SRGB_ALPHA_BPTC_UNORM_EXT,
+        constants.COMPRESSED_RGB_BPTC_SIGNED_FLOAT_EXT,
+        constants.COMPRESSED_RGB_BPTC_UNSIGNED_FLOAT_EXT,
+    ),
+    "WEBGL_compressed_texture_etc": (
+        constants.COMPRESSED_R11_EAC,
+        constants.COMPRESSED_SIGNED_R11_EAC,
+        constants.COMPRESSED_RG11_EAC,
+        constants.COMPRESSED_SIGNED_RG11_EAC,
+        constants.COMPRESSED_RGB8_ETC2,
+        constants.COMPRESSED_SRGB8_ETC2,
+        constants.COMPRESSED_RGBA8_ETC2_EAC,
+        constants.COMPRESSED_SRGB8_ALPHA8_ETC2_EAC,
+        constants.COMPRESSED_RGB8_PUNCHTHROUGH_ALPHA1_ETC2,
+        constants.COMPRESSED_SRGB8_PUNCHTHROUGH_ALPHA1_ETC2,
+    ),
+    # The ASTC formats have the highest enum values
+    "WEBGL_compressed_texture_astc": tuple(
+        fmt
+        for fmt in compressed_formats
+        if fmt >= constants.COMPRESSED_RGBA_ASTC_4x4_KHR
+    ),
+}
+
+
 class AttribFormat:
     """
     Represents an attribute in a BufferDescription or a Program.
@@ -154,13 +266,29 @@ class BufferDescription:
         if self.normalized > set(self.attributes):
             raise ValueError("Normalized attribute not found in attributes.")
 
+        self.formats, self.stride = self._parse_formats(formats, self.attributes)
+
+        if self.buffer.size % self.stride != 0:
+            raise ValueError(
+                f"Buffer size must align by {self.stride} bytes. "
+                f"{self.buffer} size={self.buffer.size}"
+            )
+
+        # Estimate number of vertices for this buffer
+        self.num_vertices = self.buffer.size // self.stride
+
+    @classmethod
+    def _parse_formats(
+        cls, formats: str, attributes: Sequence[str]
+    ) -> Tuple[List[AttribFormat], int]:
+        """Parse a format string into attribute formats and the stride in bytes"""
         formats_list = formats.split(" ")
         non_padded_formats = [f for f in formats_list if "x" not in f]
 
-        if len(non_padded_formats) != len(self.attributes):
+        if len(non_padded_formats) != len(attributes):
             raise ValueError(
                 f"Different lengths of formats ({len(formats_list)}) and "
-                f"attributes ({len(self.attributes)})"
+                f"attributes ({len(attributes)})"
             )
 
         def zip_attrs(formats, attributes):
@@ -173,8 +301,9 @@ class BufferDescription:
                     yield f, attributes[attr_index]
                     attr_index += 1
 
-        self.stride = 0
-        for attr_fmt, attr_name in zip_attrs(formats_list, self.attributes):
+        attrib_formats: List[AttribFormat] = []
+        stride = 0
+        for attr_fmt, attr_name in zip_attrs(formats_list, attributes):
             try:
                 components_str, data_type_str, data_size_str = re.split(
                     r"([fiux])", attr_fmt
@@ -198,23 +327,14 @@ class BufferDescription:
                     f"Could not parse attribute format: '{attr_fmt} : {ex}'"
                 )
 
-            gl_type, byte_size = self._formats[data_type]
-            self.formats.append(
-                AttribFormat(
-                    attr_name, gl_type, components, byte_size, offset=self.stride
-                )
+            gl_type, byte_size = cls._formats[data_type]
+            attrib_formats.append(
+                AttribFormat(attr_name, gl_type, components, byte_size, offset=stride)
             )
 
-            self.stride += byte_size * components
+            stride += byte_size * components
 
-        if self.buffer.size % self.stride != 0:
-            raise ValueError(
-                f"Buffer size must align by {self.stride} bytes. "
-                f"{self.buffer} size={self.buffer.size}"
-            )
-
-        # Estimate number of vertices for this buffer
-        self.num_vertices = self.buffer.size // self.stride
+        return attrib_formats, stride
 
 
 class TypeInfo:
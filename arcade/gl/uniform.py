@@ -1,5 +1,15 @@
+import re
+import struct
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
 from arcade.gl import constants
 
+from .interop import as_float32, as_int32, uniform_array
+
+# Sentinel for a uniform that has not been written yet
+_UNSET = object()
+
 
 class Uniform:
     def __init__(self, ctx, program, location, name, data_type, array_length):
@@ -10,6 +20,7 @@ class Uniform:
         self._data_type = data_type
         self._array_length = array_length
         self._components = 0
+        self._cache = [_UNSET]
         self.setter = None
         self._setup_getters_and_setters()
 
@@ -39,47 +50,421 @@ class Uniform:
             constants.FLOAT_MAT4,
         )
 
+        is_float = gl_type is float
+
+        if self._array_length > 1:
+            # Scalar setters like uniform1f only take a single value
+            if length == 1 and not is_matrix:
+                dispatch = self._ctx.dispatch
+                gl_setter = dispatch.uniform1fv if is_float else dispatch.uniform1iv
+            self.setter = Uniform._create_array_setter_func(
+                self._ctx,
+                self._program,
+                self._location,
+                gl_setter,
+                is_matrix,
+                is_float,
+                self._cache,
+                self._name,
+                length,
+                self._array_length,
+            )
+            return
+
         self.setter = Uniform._create_setter_func(
-            self._ctx, self._program, self._location, gl_setter, is_matrix
+            self._ctx,
+            self._program,
+            self._location,
+            gl_setter,
+            is_matrix,
+            is_float,
+            self._cache,
         )
 
+    def invalidate(self) -> None:
+        """Forget the cached value so the next assignment is always uploaded"""
+        self._cache[0] = _UNSET
+
     @staticmethod
-    def _create_setter_func(ctx, program, location, gl_setter, is_matrix):
+    def _create_setter_func(
+        ctx, program, location, gl_setter, is_matrix, is_float, cache
+    ):
+        # The last uploaded value is kept in ``cache[0]``. Numbers and tuples
+        # (including Mat4) are immutable and can be compared directly, other
+        # sequences are snapshotted as tuples so later mutation is detected.
         if is_matrix:
 
             def setter_func(value):
-                ctx.gl.useProgram(program)
-                gl_setter(location, False, value)
+                if not isinstance(value, tuple):
+                    value = tuple(value)
+                cached = cache[0]
+                if cached is value or cached == value:
+                    return
+                cache[0] = value
+                ctx.use_program(program)
+                ctx.stats.uniform_uploads += 1
+                if ctx.command_list is not None:
+                    ctx.command_list.uniform(gl_setter, location, value, True, True)
+                else:
+                    gl_setter(location, False, value)
 
         else:
 
             def setter_func(value):
-                ctx.gl.useProgram(program)
-                gl_setter(location, value)
+                key = value if isinstance(value, (int, float, tuple)) else tuple(value)
+                cached = cache[0]
+                if cached is key or cached == key:
+                    return
+                cache[0] = key
+                ctx.use_program(program)
+                ctx.stats.uniform_uploads += 1
+                if ctx.command_list is not None:
+                    ctx.command_list.uniform(gl_setter, location, key, is_float, False)
+                else:
+                    gl_setter(location, value)
+
+        return setter_func
+
+    @staticmethod
+    def _create_array_setter_func(
+        ctx,
+        program,
+        location,
+        gl_setter,
+        is_matrix,
+        is_float,
+        cache,
+        name,
+        components,
+        array_length,
+    ):
+        # Arrays are converted to 32 bit values once and uploaded from that
+        # memory. The bytes are kept to detect unchanged values.
+        to_array = as_float32 if is_float else as_int32
+        max_values = components * array_length
+
+        def setter_func(value):
+            data = to_array(value)
+            count = len(data)
+            if count % components or count > max_values:
+                raise ValueError(
+                    f"Uniform array '{name}' takes up to {array_length} elements "
+                    f"of {components} values, got {count} values"
+                )
+            key = data.tobytes()
+            if cache[0] == key:
+                return
+            cache[0] = key
+            ctx.use_program(program)
+            ctx.stats.uniform_uploads += 1
+            if ctx.command_list is not None:
+                ctx.command_list.uniform(gl_setter, location, data, is_float, is_matrix)
+            else:
+                uniform_array(ctx._gl, gl_setter, location, data, is_float, is_matrix)
 
         return setter_func
 
 
+# Block member types: (struct format character, rows, columns)
+_BLOCK_TYPES = {
+    constants.FLOAT: ("f", 1, 1),
+    constants.FLOAT_VEC2: ("f", 2, 1),
+    constants.FLOAT_VEC3: ("f", 3, 1),
+    constants.FLOAT_VEC4: ("f", 4, 1),
+    constants.INT: ("i", 1, 1),
+    constants.INT_VEC2: ("i", 2, 1),
+    constants.INT_VEC3: ("i", 3, 1),
+    constants.INT_VEC4: ("i", 4, 1),
+    constants.UNSIGNED_INT: ("I", 1, 1),
+    constants.UNSIGNED_INT_VEC2: ("I", 2, 1),
+    constants.UNSIGNED_INT_VEC3: ("I", 3, 1),
+    constants.UNSIGNED_INT_VEC4: ("I", 4, 1),
+    # Booleans are stored as 32 bit unsigned integers in uniform blocks
+    constants.BOOL: ("I", 1, 1),
+    constants.BOOL_VEC2: ("I", 2, 1),
+    constants.BOOL_VEC3: ("I", 3, 1),
+    constants.BOOL_VEC4: ("I", 4, 1),
+    # Matrices are stored as arrays of column vectors
+    constants.FLOAT_MAT2: ("f", 2, 2),
+    constants.FLOAT_MAT3: ("f", 3, 3),
+    constants.FLOAT_MAT4: ("f", 4, 4),
+    constants.FLOAT_MAT2x3: ("f", 3, 2),
+    constants.FLOAT_MAT2x4: ("f", 4, 2),
+    constants.FLOAT_MAT3x2: ("f", 2, 3),
+    constants.FLOAT_MAT3x4: ("f", 4, 3),
+    constants.FLOAT_MAT4x2: ("f", 2, 4),
+    constants.FLOAT_MAT4x3: ("f", 3, 4),
+}
+
+# GLSL type names accepted by UniformBlockWriter.std140
+_GLSL_TYPES = {
+    "float": constants.FLOAT,
+    "vec2": constants.FLOAT_VEC2,
+    "vec3": constants.FLOAT_VEC3,
+    "vec4": constants.FLOAT_VEC4,
+    "int": constants.INT,
+    "ivec2": constants.INT_VEC2,
+    "ivec3": constants.INT_VEC3,
+    "ivec4": constants.INT_VEC4,
+    "uint": constants.UNSIGNED_INT,
+    "uvec2": constants.UNSIGNED_INT_VEC2,
+    "uvec3": constants.UNSIGNED_INT_VEC3,
+    "uvec4": constants.UNSIGNED_INT_VEC4,
+    "bool": constants.BOOL,
+    "bvec2": constants.BOOL_VEC2,
+    "bvec3": constants.BOOL_VEC3,
+    "bvec4": constants.BOOL_VEC4,
+    "mat2": constants.FLOAT_MAT2,
+    "mat3": constants.FLOAT_MAT3,
+    "mat4": constants.FLOAT_MAT4,
+    "mat2x2": constants.FLOAT_MAT2,
+    "mat2x3": constants.FLOAT_MAT2x3,
+    "mat2x4": constants.FLOAT_MAT2x4,
+    "mat3x2": constants.FLOAT_MAT3x2,
+    "mat3x3": constants.FLOAT_MAT3,
+    "mat3x4": constants.FLOAT_MAT3x4,
+    "mat4x2": constants.FLOAT_MAT4x2,
+    "mat4x3": constants.FLOAT_MAT4x3,
+    "mat4x4": constants.FLOAT_MAT4,
+}
+
+_GLSL_DECLARATION = re.compile(r"^\s*(\w+)\s*(?:\[\s*(\d+)\s*\])?\s*$")
+
+
+class UniformBlockMember:
+    """
+    The layout of one member of a uniform block.
+
+    :param str name: The member name, without the block name prefix
+    :param int data_type: The GL type of the member
+    :param int offset: Byte offset from the start of the block
+    :param int array_length: Number of array elements, 1 for non-arrays
+    :param int array_stride: Bytes between array elements
+    :param int matrix_stride: Bytes between matrix columns
+    """
+
+    def __init__(
+        self,
+        name: str,
+        data_type: int,
+        offset: int,
+        array_length: int = 1,
+        array_stride: int = 0,
+        matrix_stride: int = 0,
+    ):
+        try:
+            fmt, rows, columns = _BLOCK_TYPES[data_type]
+        except KeyError:
+            raise ValueError(f"Unsupported uniform block member type {data_type}")
+
+        self.name = name
+        self.data_type = data_type
+        self.offset = offset
+        self.array_length = array_length
+        self.array_stride = array_stride
+        self.matrix_stride = matrix_stride
+        # Number of values in the whole member
+        self.components = rows * columns * array_length
+
+        # Offsets of every column vector in the member
+        offsets = [
+            offset + element * array_stride + column * matrix_stride
+            for element in range(array_length)
+            for column in range(columns)
+        ]
+        if all(b - a == rows * 4 for a, b in zip(offsets, offsets[1:])):
+            # Tightly packed, like vec4 arrays and mat4, is written in one call
+            self._struct = struct.Struct(f"<{self.components}{fmt}")
+            self._offsets = [offset]
+            self._step = self.components
+        else:
+            self._struct = struct.Struct(f"<{rows}{fmt}")
+            self._offsets = offsets
+            self._step = rows
+
+    def pack_into(self, data: bytearray, offset: int, value) -> None:
+        """
+        Write a value into a block stored in ``data`` at ``offset``.
+
+        :param bytearray data: The block data
+        :param int offset: Byte offset of the block in ``data``
+        :param value: A number, a flat sequence of numbers such as ``Mat4``
+                      or ``array('f')``, or a sequence of vectors
+        """
+        values = _flatten(value)
+        if len(values) != self.components:
+            raise ValueError(
+                f"Uniform block member '{self.name}' takes {self.components} "
+                f"values, got {len(values)}"
+            )
+
+        pack_into = self._struct.pack_into
+        step = self._step
+        for i, member_offset in enumerate(self._offsets):
+            pack_into(data, offset + member_offset, *values[i * step : (i + 1) * step])
+
+
+def _flatten(value) -> Sequence:
+    if isinstance(value, (int, float)):
+        return (value,)
+    if isinstance(value, array):
+        return value
+    if isinstance(value, tuple) and (not value or isinstance(value[0], (int, float))):
+        return value
+
+    values = list(value)
+    if values and not isinstance(values[0], (int, float)):
+        values = [component for item in values for component in item]
+    return values
+
+
+class UniformBlockWriter:
+    """
+    Packs Python values into the byte layout of a uniform block.
+
+    The layout comes from program introspection with
+    :py:meth:`UniformBlock.writer`, or is computed with the std140 rules
+    with :py:meth:`std140` for blocks declared ``layout(std140)``.
+    The writer keeps a copy of the whole block in :py:attr:`data`, so
+    members not given to :py:meth:`pack` keep their previous values::
+
+        writer = program.uniform_blocks["Camera"].writer()
+        buffer.write(writer.pack({"projection": projection, "view": view}))
+
+    :param int size: The size of the block in bytes
+    :param members: The members of the block
+    """
+
+    def __init__(self, size: int, members: Iterable[UniformBlockMember]):
+        self._size = size
+        self._members: Dict[str, UniformBlockMember] = {m.name: m for m in members}
+        self._data = bytearray(size)
+
+    @classmethod
+    def std140(cls, fields: Sequence[Tuple[str, str]]) -> "UniformBlockWriter":
+        """
+        Create a writer for a ``layout(std140)`` block from its declaration::
+
+            UniformBlockWriter.std140([("projection", "mat4"), ("lights", "vec4[8]")])
+
+        Structs are not supported.
+
+        :param fields: ``(name, type)`` pairs in declaration order. The type
+                       is a GLSL type name with an optional array length
+        """
+        members = []
+        offset = 0
+        for name, declaration in fields:
+            match = _GLSL_DECLARATION.match(declaration)
+            if match is None or match.group(1) not in _GLSL_TYPES:
+                raise ValueError(f"Unsupported uniform block type '{declaration}'")
+
+            data_type = _GLSL_TYPES[match.group(1)]
+            is_array = match.group(2) is not None
+            array_length = int(match.group(2)) if is_array else 1
+            _, rows, columns = _BLOCK_TYPES[data_type]
+
+            if columns > 1 or is_array:
+                # Array elements and matrix columns are padded to a vec4
+                align = 16
+                matrix_stride = 16 if columns > 1 else 0
+                array_stride = 16 * columns
+                size = array_stride * array_length
+            else:
+                align = 4 if rows == 1 else (8 if rows == 2 else 16)
+                matrix_stride = 0
+                array_stride = 0
+                size = 4 * rows
+
+            offset = -(-offset // align) * align
+            members.append(
+                UniformBlockMember(
+                    name, data_type, offset, array_length, array_stride, matrix_stride
+                )
+            )
+            offset += size
+
+        return cls(-(-offset // 16) * 16, members)
+
+    @property
+    def size(self) -> int:
+        """The size of the block in bytes"""
+        return self._size
+
+    @property
+    def members(self) -> Dict[str, UniformBlockMember]:
+        return self._members
+
+    @property
+    def data(self) -> bytearray:
+        """The packed block"""
+        return self._data
+
+    def pack(self, values: Mapping[str, object]) -> bytearray:
+        """
+        Write values into :py:attr:`data` and return it.
+
+        :param values: Member names mapped to their values
+        """
+        self.pack_into(self._data, 0, values)
+        return self._data
+
+    def pack_into(
+        self, data: bytearray, offset: int, values: Mapping[str, object]
+    ) -> None:
+        """
+        Write values into a block stored in ``data`` at ``offset``. Members
+        not in ``values`` are left untouched.
+
+        :param bytearray data: Writable memory holding the block
+        :param int offset: Byte offset of the block in ``data``
+        :param values: Member names mapped to their values
+        """
+        members = self._members
+        for name, value in values.items():
+            try:
+                member = members[name]
+            except KeyError:
+                raise KeyError(f"Uniform block member `{name}` was not found.")
+            member.pack_into(data, offset, value)
+
+
 class UniformBlock:
-    def __init__(self, ctx, glo, index: int, size: int, name: str):
+    def __init__(
+        self,
+        ctx,
+        glo,
+        index: int,
+        size: int,
+        name: str,
+        members: Optional[List[UniformBlockMember]] = None,
+    ):
         self._ctx = ctx
         self.glo = glo
         self.index = index
         self.size = size
         self.name = name
+        self.members: Dict[str, UniformBlockMember] = {m.name: m for m in members or ()}
 
     @property
     def binding(self):
-        return self._ctx.gl.getActiveUniformBlockParameter(
+        return self._ctx.dispatch.getActiveUniformBlockParameter(
             self.glo, self.index, constants.UNIFORM_BLOCK_BINDING
         )
 
     @binding.setter
     def binding(self, binding: int):
-        self._ctx.gl.uniformBlockBinding(self.glo, self.index, binding)
+        self._ctx.dispatch.uniformBlockBinding(self.glo, self.index, binding)
+
+    def writer(self) -> UniformBlockWriter:
+        """Create a :py:class:`UniformBlockWriter` for this block's layout"""
+        return UniformBlockWriter(self.size, self.members.values())
 
     def getter(self):
         return self
 
     def setter(self, value: int):
         self.binding = value
+
+    def invalidate(self) -> None:
+        """Block bindings are not cached, so there is nothing to forget"""
@@ -0,0 +1,156 @@
+from typing import TYPE_CHECKING, Mapping, Optional
+
+from arcade.arcade_types import BufferProtocol
+from arcade.gl import constants
+
+from .interop import as_bytes
+from .ring_buffer import RingBuffer
+from .uniform import UniformBlockWriter
+
+if TYPE_CHECKING:
+    from arcade.gl import Context
+
+
+class UniformSlice:
+    """
+    A uniform block allocated in a :py:class:`UniformArena`.
+    Only valid for the frame it was allocated in.
+
+    :param UniformArena arena: The arena the block lives in
+    :param int offset: Byte offset of the block in the arena's buffer
+    :param int size: Size of the block in bytes
+    :param int binding: The binding point used by :py:meth:`bind`
+    """
+
+    __slots__ = ("arena", "offset", "size", "binding")
+
+    def __init__(self, arena: "UniformArena", offset: int, size: int, binding: int):
+        self.arena = arena
+        self.offset = offset
+        self.size = size
+        self.binding = binding
+
+    def bind(self, binding: Optional[int] = None) -> None:
+        """
+        Bind the block to a uniform block binding point.
+
+        :param int binding: The binding point. Defaults to :py:attr:`binding`
+        """
+        self.arena._bind(self, self.binding if binding is None else binding)
+
+
+class UniformArena(RingBuffer):
+    """
+    Packs per-draw uniform blocks, like a model matrix and material
+    parameters, into one uniform buffer.
+
+    Blocks are packed into a Python side copy of the buffer at offsets
+    aligned to ``UNIFORM_BUFFER_OFFSET_ALIGNMENT``. All blocks packed since
+    the last upload are uploaded with a single ``bufferSubData`` call when
+    the first of them is bound. Each draw then only needs one
+    ``bindBufferRange`` call instead of one ``uniform*`` call per value.
+    Pass the slice to :py:meth:`Geometry.render` to bind it for a draw::
+
+        block = arena.pack(writer, {"model": model, "color": color})
+        geometry.render(program, uniform_block=block)
+
+    Like :py:class:`RingBuffer` the buffer is split into ``frames``
+    regions that are rotated by :py:meth:`Context.new_frame`.
+
+    :param Context ctx: The context this arena belongs to
+    :param int frame_size: Bytes available to each frame
+    :param int frames: Number of frame regions to rotate through
+    :param bool fence: Use fence sync objects to detect regions still in use
+    """
+
+    def __init__(
+        self, ctx: "Context", frame_size: int, *, frames: int = 3, fence: bool = True
+    ):
+        super().__init__(
+            ctx,
+            frame_size,
+            frames=frames,
+            buffer_type=constants.UNIFORM_BUFFER,
+            fence=fence,
+        )
+        self._alignment = max(ctx.limits.UNIFORM_BUFFER_OFFSET_ALIGNMENT, 1)
+        self._staging = bytearray(self._buffer.size)
+        # The range packed but not yet uploaded
+        self._pending_start = 0
+        self._pending_end = 0
+        self._uploads = 0
+
+    @property
+    def alignment(self) -> int:
+        """The alignment of every block offset"""
+        return self._alignment
+
+    @property
+    def uploads(self) -> int:
+        """Number of uploads made in the current frame"""
+        return self._uploads
+
+    def pack(
+        self,
+        writer: UniformBlockWriter,
+        values: Optional[Mapping[str, object]] = None,
+        *,
+        binding: int = 0,
+    ) -> UniformSlice:
+        """
+        Allocate a block and pack values into it. Members not in ``values``
+        are taken from ``writer.data``.
+
+        :param UniformBlockWriter writer: The layout of the block
+        :param values: Member names mapped to their values
+        :param int binding: The binding point the block is bound to
+        """
+        offset = self._allocate(writer.size)
+        self._staging[offset : offset + writer.size] = writer.data
+        if values:
+            writer.pack_into(self._staging, offset, values)
+        return UniformSlice(self, offset, writer.size, binding)
+
+    def write_block(self, data: BufferProtocol, *, binding: int = 0) -> UniformSlice:
+        """
+        Allocate a block holding already packed data.
+
+        :param data: The packed block
+        :param int binding: The binding point the block is bound to
+        """
+        view = as_bytes(data)
+        offset = self._allocate(view.nbytes)
+        self._staging[offset : offset + view.nbytes] = view
+        return UniformSlice(self, offset, view.nbytes, binding)
+
+    def flush(self) -> None:
+        """Upload all blocks packed since the last upload"""
+        start, end = self._pending_start, self._pending_end
+        if start == end:
+            return
+        self._buffer.write(memoryview(self._staging)[start:end], start)
+        self._pending_start = self._pending_end = end
+        self._uploads += 1
+
+    def new_frame(self) -> None:
+        super().new_frame()
+        self._pending_start = self._pending_end = 0
+        self._uploads = 0
+
+    def _allocate(self, size: int) -> int:
+        offset = self.alloc(size, self._alignment)
+        if self._pending_start == self._pending_end:
+            self._pending_start = offset
+        self._pending_end = offset + size
+        return offset
+
+    def _bind(self, block: UniformSlice, binding: int) -> None:
+        if block.offset + block.size > self._pending_start:
+            self.flush()
+        self._ctx.bind_buffer_range(
+            constants.UNIFORM_BUFFER,
+            binding,
+            self._buffer.glo,
+            block.offset,
+            block.size,
+        )
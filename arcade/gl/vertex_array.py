@@ -1,13 +1,15 @@
-from typing import TYPE_CHECKING, Optional, Sequence
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Union
 
 from arcade.gl import constants
 
-from .buffer import Buffer
+from .buffer import Buffer, GrowableBuffer
+from .interop import as_int32
 from .program import Program
 from .types import BufferDescription
 
 if TYPE_CHECKING:
     from arcade.gl import Context
+    from arcade.gl.uniform_arena import UniformSlice
 
 index_types = [
     None,
@@ -17,6 +19,9 @@ index_types = [
     constants.UNSIGNED_INT,
 ]
 
+# The primitive modes transform feedback can capture
+transform_modes = (constants.POINTS, constants.LINES, constants.TRIANGLES)
+
 
 class VertexArray:
     def __init__(
@@ -41,12 +46,13 @@ class VertexArray:
     def _build(
         self, program: Program, content: Sequence[BufferDescription], index_buffer
     ):
-        gl = self._ctx.gl
-        self._glo = gl.createVertexArray()
-        gl.bindVertexArray(self._glo)
+        # Binds may be recorded, so the context is fetched again after
+        # each of them to flush before issuing calls directly
+        self._glo = self._ctx.dispatch.createVertexArray()
+        self._ctx.bind_vertex_array(self._glo)
 
         if index_buffer is not None:
-            gl.bindBuffer(constants.ELEMENT_ARRAY_BUFFER, index_buffer.glo)
+            self._ctx.bind_buffer(constants.ELEMENT_ARRAY_BUFFER, index_buffer.glo)
 
         descr_attribs = {
             attr.name: (descr, attr) for descr in content for attr in descr.formats
@@ -73,8 +79,9 @@ class VertexArray:
                     )
                 )
 
+            self._ctx.bind_buffer(constants.ARRAY_BUFFER, buff_descr.buffer.glo)
+            gl = self._ctx.dispatch
             gl.enableVertexAttribArray(prog_attr.location)
-            gl.bindBuffer(constants.ARRAY_BUFFER, buff_descr.buffer.glo)
 
             normalized = True if attr_descr.name in buff_descr.normalized else False
             gl.vertexAttribPointer(
@@ -89,11 +96,23 @@ class VertexArray:
             if buff_descr.instanced:
                 gl.vertexAttribDivisor(prog_attr.location, 1)
 
+    @property
+    def glo(self):
+        return self._glo
+
+    def delete(self) -> None:
+        """Delete the underlying WebGL vertex array object"""
+        if self._glo is not None:
+            # Deleting a bound vertex array implicitly unbinds it
+            self._ctx.bind_vertex_array(None)
+            self._ctx.dispatch.deleteVertexArray(self._glo)
+            self._glo = None
+
     def render(self, mode: int, first: int = 0, vertices: int = 0, instances: int = 1):
-        self._ctx.gl.bindVertexArray(self._glo)
+        self._ctx.bind_vertex_array(self._glo)
         if self._ibo is not None:
-            self._ctx.bindBuffer(constants.ELEMENT_ARRAY_BUFFER, self._ibo.glo)
-            self._ctx.drawElementsInstanced(
+            # The index buffer is bound as part of the vertex array
+            self._ctx.draw_elements(
                 mode,
                 vertices,
                 self._index_element_type,
@@ -101,7 +120,95 @@ class VertexArray:
                 instances,
             )
         else:
-            self._ctx.gl.drawArraysInstanced(mode, first, vertices, instances)
+            self._ctx.draw_arrays(mode, first, vertices, instances)
+
+    def render_multi(self, mode: int, firsts, counts, instances=None):
+        """
+        Issue many draws of ranges in this vertex array with one call.
+        The inputs are 32 bit integer views, see :py:func:`as_int32`.
+        """
+        self._ctx.bind_vertex_array(self._glo)
+        if self._ibo is not None:
+            self._ctx.multi_draw_elements(
+                mode,
+                counts,
+                self._index_element_type,
+                firsts,
+                self._index_element_size,
+                instances,
+            )
+        else:
+            self._ctx.multi_draw_arrays(mode, firsts, counts, instances)
+
+    def transform(
+        self,
+        program: Program,
+        buffers: List[Buffer],
+        mode: int,
+        first: int = 0,
+        vertices: int = 0,
+        instances: int = 1,
+        buffer_offset: int = 0,
+    ):
+        """
+        Run the program with rasterization disabled, writing its varyings
+        into the buffers. One buffer is used for interleaved capture and
+        one buffer per varying for separate capture.
+
+        The program is passed in rather than taken from the vertex array,
+        since vertex arrays are shared by programs with the same attributes.
+        """
+        if not program.varyings:
+            raise ValueError("The program has no varyings to capture")
+        if self._ibo is not None:
+            raise ValueError("Transform feedback does not support indexed rendering")
+        if mode not in transform_modes:
+            raise ValueError(
+                "Transform feedback mode must be POINTS, LINES or TRIANGLES"
+            )
+        if vertices < 0:
+            raise ValueError(f"Cannot determine the number of vertices: {vertices}")
+
+        if program.varyings_capture_mode == "interleaved":
+            sizes = [sum(program.varying_sizes)]
+        else:
+            sizes = program.varying_sizes
+        if len(buffers) != len(sizes):
+            raise ValueError(
+                f"The program captures into {len(sizes)} buffer(s), "
+                f"but {len(buffers)} were given"
+            )
+
+        for index, (buffer, size) in enumerate(zip(buffers, sizes)):
+            needed = size * vertices * instances
+            if buffer_offset + needed > buffer.size:
+                raise ValueError(
+                    f"Transform feedback buffer {index} is too small. "
+                    f"{needed} bytes are written at offset {buffer_offset} "
+                    f"in a buffer of {buffer.size} bytes"
+                )
+
+        ctx = self._ctx
+        ctx.bind_vertex_array(self._glo)
+        for index, buffer in enumerate(buffers):
+            ctx.bind_buffer_range(
+                constants.TRANSFORM_FEEDBACK_BUFFER,
+                index,
+                buffer.glo,
+                buffer_offset,
+                buffer.size - buffer_offset,
+            )
+
+        ctx.enable(constants.RASTERIZER_DISCARD)
+        ctx.begin_transform_feedback(mode)
+        ctx.draw_arrays(mode, first, vertices, instances)
+        ctx.end_transform_feedback()
+        ctx.disable(constants.RASTERIZER_DISCARD)
+
+        # WebGL rejects draws reading from a buffer still bound for
+        # transform feedback, so the outputs are unbound right away
+        for index in range(len(buffers)):
+            ctx.bind_buffer_base(constants.TRANSFORM_FEEDBACK_BUFFER, index, None)
 
 
 class Geometry:
@@ -111,17 +218,33 @@ class Geometry:
         content: Optional[Sequence[BufferDescription]],
         index_buffer: Optional[Buffer] = None,
         mode: Optional[int] = None,
-        index_element_size: int = 4,
+        index_element_size: Optional[int] = None,
     ):
         self._ctx = ctx
         self._content = content or []
         self._index_buffer = index_buffer
+        if index_element_size is None:
+            index_element_size = (index_buffer and index_buffer.index_element_size) or 4
         self._index_element_size = index_element_size
         self._mode = mode if mode is not None else constants.TRIANGLES
         self._num_vertices: int = -1
+        self._vao_cache: Dict[str, VertexArray] = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        # Incremented when cached vertex arrays are deleted
+        self._version = 0
+        # Growable buffers flush the vertex arrays when they grow
+        for buffer in self._buffers():
+            if isinstance(buffer, GrowableBuffer):
+                buffer._geometries.add(self)
 
         if self._index_buffer and self._index_element_size not in (1, 2, 4):
             raise ValueError("index_element_size must be 1, 2, or 4")
+        if (
+            self._index_buffer
+            and self._index_buffer._buffer_type != constants.ELEMENT_ARRAY_BUFFER
+        ):
+            raise ValueError("Index buffers must be created with ctx.index_buffer()")
 
         if content:
             if self._index_buffer:
@@ -141,10 +264,26 @@ class Geometry:
         first: int = 0,
         vertices: Optional[int] = None,
         instances: int = 1,
+        uniform_block: Optional["UniformSlice"] = None,
     ) -> None:
+        """
+        Render the geometry.
+
+        :param Program program: The program to render with
+        :param int mode: Override the primitive mode of the geometry
+        :param int first: The first vertex, or the first index when indexed
+        :param int vertices: Number of vertices to render. Defaults to all
+        :param int instances: Number of instances to render
+        :param UniformSlice uniform_block: A block from a
+                                           :py:class:`~arcade.gl.UniformArena`
+                                           to bind for this draw
+        """
+        self._track(program)
         program.use()
         vao = self.instance(program)
         mode = self._mode if mode is None else mode
+        if uniform_block is not None:
+            uniform_block.bind()
 
         vao.render(
             mode=mode,
@@ -153,9 +292,163 @@ class Geometry:
             instances=instances,
         )
 
+    def render_multi(
+        self,
+        program: Program,
+        firsts,
+        counts,
+        instances=None,
+        *,
+        mode: Optional[int] = None,
+    ) -> None:
+        """
+        Render many ranges of this geometry with a single draw call using the
+        ``WEBGL_multi_draw`` extension. This is useful when many small meshes
+        are packed into the same buffers. When the extension is not available
+        one draw call is issued per range instead.
+
+        The inputs are ideally ``array("i")`` or memoryviews of 32 bit integers.
+        These are passed to WebGL without copying, so the same arrays can be
+        reused every frame. Other sequences of integers are converted first.
+
+        :param Program program: The program to render with
+        :param firsts: The first vertex of each range. For indexed geometry,
+                       the first index
+        :param counts: The number of vertices or indices in each range
+        :param instances: The number of instances to render of each range
+        :param int mode: Override the primitive mode of the geometry
+        """
+        firsts = as_int32(firsts)
+        counts = as_int32(counts)
+        if instances is not None:
+            instances = as_int32(instances)
+        if len(firsts) != len(counts) or (
+            instances is not None and len(instances) != len(firsts)
+        ):
+            raise ValueError("firsts, counts and instances must have the same length")
+        if len(firsts) == 0:
+            return
+
+        self._track(program)
+        program.use()
+        vao = self.instance(program)
+        vao.render_multi(
+            self._mode if mode is None else mode, firsts, counts, instances
+        )
+
+    def transform(
+        self,
+        program: Program,
+        buffer: Union[Buffer, Sequence[Buffer]],
+        *,
+        mode: Optional[int] = None,
+        first: int = 0,
+        vertices: Optional[int] = None,
+        instances: int = 1,
+        buffer_offset: int = 0,
+    ) -> None:
+        """
+        Run a program with transform feedback, writing the varyings of every
+        processed vertex into buffers instead of rendering anything.
+
+        The output buffers can be used as input to the next transform, so
+        simulations like particles can run entirely on the GPU by swapping
+        two geometries every frame. A buffer cannot be both an input of this
+        geometry and an output of the same transform.
+
+        :param Program program: A program created with ``varyings``
+        :param buffer: The buffer to write interleaved varyings to, or
+                       a list with one buffer per varying when the program
+                       uses the ``"separate"`` capture mode
+        :param int mode: POINTS, LINES or TRIANGLES.
+                         Defaults to the mode of the geometry
+        :param int first: The first vertex to process
+        :param int vertices: Number of vertices to process
+        :param int instances: Number of instances to process
+        :param int buffer_offset: Byte offset in the buffers to start writing at
+        """
+        buffers = [buffer] if isinstance(buffer, Buffer) else list(buffer)
+        self._track(program)
+        bundle = self._ctx._bundle
+        if bundle is not None:
+            for out in buffers:
+                bundle.track(out)
+
+        program.use()
+        vao = self.instance(program)
+        vao.transform(
+            program,
+            buffers,
+            self._mode if mode is None else mode,
+            first=first,
+            vertices=vertices or self._num_vertices,
+            instances=instances,
+            buffer_offset=buffer_offset,
+        )
+
+    def _track(self, program: Program) -> None:
+        """Register the objects used by a draw with a capturing render bundle"""
+        bundle = self._ctx._bundle
+        if bundle is None:
+            return
+        bundle.track(self)
+        bundle.track(program)
+        for descr in self._content:
+            bundle.track(descr.buffer)
+        if self._index_buffer is not None:
+            bundle.track(self._index_buffer)
+
+    @property
+    def vao_cache_hits(self) -> int:
+        """Number of times a cached vertex array was reused"""
+        return self._cache_hits
+
+    @property
+    def vao_cache_misses(self) -> int:
+        """Number of vertex arrays created because none was cached"""
+        return self._cache_misses
+
+    @property
+    def vao_cache_size(self) -> int:
+        """Number of vertex arrays currently cached"""
+        return len(self._vao_cache)
+
     def instance(self, program: Program) -> VertexArray:
+        """
+        Get the vertex array for a program, creating it the first time a
+        program with this attribute layout is used.
+
+        :param Program program: The program to get a vertex array for
+        """
+        vao = self._vao_cache.get(program.attribute_key)
+        if vao is not None:
+            self._cache_hits += 1
+            return vao
+
+        self._cache_misses += 1
         return self._generate_vao(program)
 
+    def flush(self) -> None:
+        """
+        Delete all cached vertex arrays. This must be called when the
+        content of the geometry changes so vertex arrays are rebuilt
+        on the next render.
+        """
+        for vao in self._vao_cache.values():
+            vao.delete()
+        self._vao_cache = {}
+        self._version += 1
+
+    def _buffers(self) -> List[Buffer]:
+        buffers = [descr.buffer for descr in self._content]
+        if self._index_buffer is not None:
+            buffers.append(self._index_buffer)
+        return buffers
+
+    def release(self) -> None:
+        """Free the WebGL objects owned by this geometry"""
+        self.flush()
+
     def _generate_vao(self, program: Program) -> VertexArray:
         vao = VertexArray(
             self._ctx,
@@ -164,4 +457,5 @@ class Geometry:
             index_buffer=self._index_buffer,
             index_element_size=self._index_element_size,
         )
+        self._vao_cache[program.attribute_key] = vao
         return vao
@@ -86,7 +86,10 @@ class Window:
         delta_time = now - self._then
         self._then = now
 
+        self.ctx.new_frame()
+        self.ctx.update_frame_globals(now)
         self.on_draw()
+        self.ctx.flush()
         self.on_update(delta_time)
 
         js.requestAnimationFrame(self.run_proxy)
@@ -0,0 +1,90 @@
+#! /usr/bin/env python
+"""
+Compare calling WebGL functions through the context against GLDispatch.
+
+A mock ``gl`` object stands in for the WebGL context's ``JsProxy``. Like the
+proxy, it resolves every attribute dynamically in ``__getattr__``, so each
+``gl.bindBuffer(...)`` pays for a lookup before the call. The mock's lookup
+is much cheaper than a real trip across the Pyodide FFI, so the savings
+measured here are a lower bound.
+
+The dispatch module has no dependencies, so it is loaded directly from its
+file. This lets the benchmark run in a regular Python interpreter.
+"""
+
+import argparse
+import importlib.util
+import timeit
+from pathlib import Path
+
+DISPATCH_PATH = Path(__file__).parent.parent / "arcade" / "gl" / "dispatch.py"
+
+
+def load_dispatch():
+    spec = importlib.util.spec_from_file_location("dispatch", DISPATCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class MockGL:
+    """Resolves every WebGL function on each lookup, like a JsProxy"""
+
+    ARRAY_BUFFER = 34962
+
+    def __init__(self, names):
+        self._names = frozenset(names)
+
+    def __getattr__(self, name: str):
+        if name not in self._names:
+            raise AttributeError(name)
+        return self._noop
+
+    @staticmethod
+    def _noop(*args):
+        pass
+
+
+def make_parser(parser):
+    parser.description = "Benchmark GLDispatch against direct context lookups"
+    parser.add_argument(
+        "--calls",
+        type=int,
+        default=1_000_000,
+        help="Number of calls to time for each variant",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of timing runs. The best run is reported",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    make_parser(parser)
+    args = parser.parse_args()
+
+    dispatch = load_dispatch()
+    gl = MockGL(dispatch.ENTRY_POINTS)
+    table = dispatch.GLDispatch(gl)
+
+    variants = {
+        "gl": "gl.bindBuffer(gl.ARRAY_BUFFER, None)",
+        "dispatch": "table.bindBuffer(gl.ARRAY_BUFFER, None)",
+    }
+    namespace = {"gl": gl, "table": table}
+    results = {}
+    for name, stmt in variants.items():
+        timer = timeit.Timer(stmt, globals=namespace)
+        best = min(timer.repeat(repeat=args.repeat, number=args.calls))
+        results[name] = best / args.calls * 1e9
+        print(f"{name:>10}: {results[name]:8.1f} ns/call")
+
+    saved = results["gl"] - results["dispatch"]
+    print(f"{'saved':>10}: {saved:8.1f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,14 @@ class MyGame(arcade.Window):
         self.program = self.ctx.program(
             vertex_shader="""#version 300 es
             precision highp float;
-            uniform mat4 projection;
+            // Set once per frame by the context
+            layout(std140) uniform FrameGlobals {
+                mat4 projection;
+                mat4 view;
+                vec2 viewport_size;
+                float time;
+                int frame;
+            };
             uniform mat4 modelview;
             in vec3 in_position;
             in vec3 in_normal;
@@ -61,7 +68,7 @@ class MyGame(arcade.Window):
     def on_resize(self, width, height):
         """Set up viewport and projection"""
         self.ctx.viewport = 0, 0, width, height
-        self.program["projection"] = Mat4.perspective_projection(
+        self.ctx.projection_matrix = Mat4.perspective_projection(
             self.aspect_ratio, 0.1, 100, fov=60
         )
 
@@ -0,0 +1,119 @@
+"""
+GPU particles using transform feedback.
+
+Particle positions and velocities are kept in two buffers on the GPU.
+Every frame a transform reads the particles from one buffer and writes
+the updated particles into the other, then the buffers swap roles.
+No particle data is uploaded after the first frame.
+"""
+import random
+from array import array
+
+import arcade
+from arcade.gl import BufferDescription
+
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 800
+SCREEN_TITLE = "GPU Particles"
+
+PARTICLE_COUNT = 50_000
+
+
+class MyGame(arcade.Window):
+    def __init__(self, width, height, title):
+        super().__init__(width, height, title)
+
+        # Moves the particles and bounces them off the screen edges.
+        # No fragment shader is needed since nothing is rendered.
+        self.transform_program = self.ctx.program(
+            vertex_shader="""#version 300 es
+            precision highp float;
+
+            uniform float dt;
+
+            in vec2 in_pos;
+            in vec2 in_vel;
+
+            out vec2 out_pos;
+            out vec2 out_vel;
+
+            void main() {
+                vec2 vel = in_vel - vec2(0.0, 0.5 * dt);
+                vec2 pos = in_pos + vel * dt;
+                if (abs(pos.x) > 1.0) {
+                    vel.x = -vel.x;
+                }
+                if (pos.y < -1.0) {
+                    vel.y = abs(vel.y) * 0.9;
+                }
+                out_pos = clamp(pos, -1.0, 1.0);
+                out_vel = vel;
+            }
+            """,
+            varyings=["out_pos", "out_vel"],
+        )
+        self.render_program = self.ctx.program(
+            vertex_shader="""#version 300 es
+            precision highp float;
+
+            in vec2 in_pos;
+            in vec2 in_vel;
+
+            out vec3 v_color;
+
+            void main() {
+                gl_PointSize = 2.0;
+                gl_Position = vec4(in_pos, 0.0, 1.0);
+                v_color = vec3(0.5 + abs(in_vel) * 2.0, 1.0);
+            }
+            """,
+            fragment_shader="""#version 300 es
+            precision highp float;
+
+            in vec3 v_color;
+            out vec4 out_color;
+
+            void main() {
+                out_color = vec4(v_color, 1.0);
+            }
+            """,
+        )
+
+        def gen_particles(count):
+            random.seed(123456)
+            for _ in range(count):
+                # position
+                yield random.uniform(-1.0, 1.0)
+                yield random.uniform(-1.0, 1.0)
+                # velocity
+                yield random.uniform(-0.5, 0.5)
+                yield random.uniform(-0.5, 0.5)
+
+        data = array("f", gen_particles(PARTICLE_COUNT))
+        self.buffer_1 = self.ctx.buffer(data=data, usage="dynamic")
+        self.buffer_2 = self.ctx.buffer(data=bytes(len(data) * 4), usage="dynamic")
+
+        self.geometry_1 = self.ctx.geometry(
+            [BufferDescription(self.buffer_1, "2f 2f", ["in_pos", "in_vel"])],
+            mode=self.ctx.gl.POINTS,
+        )
+        self.geometry_2 = self.ctx.geometry(
+            [BufferDescription(self.buffer_2, "2f 2f", ["in_pos", "in_vel"])],
+            mode=self.ctx.gl.POINTS,
+        )
+
+    def on_draw(self):
+        self.clear()
+        self.geometry_1.render(self.render_program)
+
+    def on_update(self, dt):
+        self.transform_program["dt"] = min(dt, 0.1)
+        self.geometry_1.transform(self.transform_program, self.buffer_2)
+        # The updated particles are now in buffer 2
+        self.geometry_1, self.geometry_2 = self.geometry_2, self.geometry_1
+        self.buffer_1, self.buffer_2 = self.buffer_2, self.buffer_1
+
+
+def run():
+    MyGame(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
+    arcade.run()
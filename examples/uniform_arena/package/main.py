@@ -0,0 +1,163 @@
+"""
+Per-draw uniforms compared to a uniform arena.
+
+A grid of quads is drawn with one draw call per quad. Each quad has its
+own model matrix, color and parameters. The example switches between two
+ways of passing them every few seconds:
+
+* uniforms: three ``uniform*`` calls per draw
+* arena: the values are packed into a UniformArena, uploaded once per
+  frame and each draw binds its block with one ``bindBufferRange`` call
+
+The WebGL calls and the CPU time spent drawing are printed to the console.
+"""
+from array import array
+
+import js
+
+import arcade
+from arcade.gl import BufferDescription, UniformBlockWriter
+from arcade.math import Mat4
+
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 800
+SCREEN_TITLE = "Uniform Arena"
+
+GRID = 20
+FRAMES_PER_MODE = 300
+
+UNIFORMS_SHADER = """#version 300 es
+precision highp float;
+
+uniform mat4 model;
+uniform vec4 color;
+uniform vec4 params;
+
+in vec2 in_vert;
+out vec4 v_color;
+
+void main() {
+    gl_Position = model * vec4(in_vert * params.x, 0.0, 1.0);
+    v_color = color;
+}
+"""
+
+BLOCK_SHADER = """#version 300 es
+precision highp float;
+
+layout(std140) uniform Object {
+    mat4 model;
+    vec4 color;
+    vec4 params;
+};
+
+in vec2 in_vert;
+out vec4 v_color;
+
+void main() {
+    gl_Position = model * vec4(in_vert * params.x, 0.0, 1.0);
+    v_color = color;
+}
+"""
+
+FRAGMENT_SHADER = """#version 300 es
+precision highp float;
+
+in vec4 v_color;
+out vec4 out_color;
+
+void main() {
+    out_color = v_color;
+}
+"""
+
+
+class MyGame(arcade.Window):
+    def __init__(self, width, height, title):
+        self.time = 0
+        super().__init__(width, height, title)
+        self.uniforms_program = self.ctx.program(
+            vertex_shader=UNIFORMS_SHADER, fragment_shader=FRAGMENT_SHADER
+        )
+        self.block_program = self.ctx.program(
+            vertex_shader=BLOCK_SHADER, fragment_shader=FRAGMENT_SHADER
+        )
+        self.block_program["Object"] = 0
+
+        self.writer = UniformBlockWriter.std140(
+            [("model", "mat4"), ("color", "vec4"), ("params", "vec4")]
+        )
+        # Every block starts at a multiple of the offset alignment
+        alignment = self.ctx.limits.UNIFORM_BUFFER_OFFSET_ALIGNMENT
+        block_size = -(-self.writer.size // alignment) * alignment
+        self.arena = self.ctx.uniform_arena(GRID * GRID * block_size)
+
+        vertices = array("f", [-1, -1, 1, -1, -1, 1, 1, 1])
+        self.geometry = self.ctx.geometry(
+            [BufferDescription(self.ctx.buffer(data=vertices), "2f", ["in_vert"])],
+            mode=self.ctx.gl.TRIANGLE_STRIP,
+        )
+
+        self.objects = []
+        for y in range(GRID):
+            for x in range(GRID):
+                position = (
+                    (x + 0.5) / GRID * 2.0 - 1.0,
+                    (y + 0.5) / GRID * 2.0 - 1.0,
+                )
+                color = (x / GRID, y / GRID, 0.5, 1.0)
+                self.objects.append((position, color))
+
+        self.use_arena = False
+        self.frames = 0
+        self.draw_time = 0.0
+        self.calls = 0
+
+    def on_draw(self):
+        self.clear()
+        start = js.performance.now()
+
+        scale = 0.4 / GRID
+        for i, (position, color) in enumerate(self.objects):
+            angle = self.time + i * 0.1
+            model = Mat4.from_translation((*position, 0.0)) @ Mat4.from_rotation(
+                angle, (0.0, 0.0, 1.0)
+            )
+            params = (scale, 0.0, 0.0, 0.0)
+
+            if self.use_arena:
+                block = self.arena.pack(
+                    self.writer, {"model": model, "color": color, "params": params}
+                )
+                self.geometry.render(self.block_program, uniform_block=block)
+            else:
+                program = self.uniforms_program
+                program["model"] = model
+                program["color"] = color
+                program["params"] = params
+                self.geometry.render(program)
+
+        self.draw_time += js.performance.now() - start
+        stats = self.ctx.stats
+        self.calls += stats.issued + stats.uniform_uploads + self.arena.uploads
+
+    def on_update(self, dt):
+        self.time += dt
+        self.frames += 1
+        if self.frames < FRAMES_PER_MODE:
+            return
+
+        mode = "arena" if self.use_arena else "uniforms"
+        print(
+            f"{mode:>8}: {self.calls / self.frames:8.1f} WebGL calls/frame, "
+            f"{self.draw_time / self.frames:6.2f} ms/frame"
+        )
+        self.use_arena = not self.use_arena
+        self.frames = 0
+        self.draw_time = 0.0
+        self.calls = 0
+
+
+def run():
+    MyGame(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE)
+    arcade.run()